@@ -0,0 +1,84 @@
+"""
+Benchmark DrowningDetector inference backends: PyTorch vs ONNX Runtime vs OpenVINO.
+
+Exports the model once per backend into the model cache (later runs reuse the
+artifacts), then reports predict_frame FPS on a repeated frame and how closely
+each backend's detections match the PyTorch ones: boxes are paired by IoU and
+the worst box IoU and largest confidence difference are listed.
+
+Usage:
+    python benchmarks/bench_backends.py --model yolov8n.pt --image bus.jpg --backends pytorch onnx openvino
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.drowning_detector_advanced import DrowningDetector
+from src.models import BACKENDS
+from src.tracking import pairwise_iou, solve_assignment
+
+
+def compare(reference, detections):
+    """Return (matched pairs, unmatched boxes, min IoU, max confidence difference)."""
+    if len(reference) == 0 or len(detections) == 0:
+        return 0, len(reference) + len(detections), 1.0, 0.0
+    iou = pairwise_iou(reference.boxes, detections.boxes)
+    cost = np.where(iou >= 0.5, 1.0 - iou, 1e6)
+    matches, unmatched_dets, unmatched_refs = solve_assignment(cost)
+    if not matches:
+        return 0, len(reference) + len(detections), 0.0, 1.0
+    rows, cols = np.array(matches).T
+    conf_diff = np.abs(reference.confidences[rows] - detections.confidences[cols]).max()
+    return len(matches), len(unmatched_dets) + len(unmatched_refs), iou[rows, cols].min(), conf_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference backend benchmark")
+    parser.add_argument('--model', '-m', default='yolov8n.pt', help='PyTorch YOLO model')
+    parser.add_argument('--image', '-i', default='bus.jpg', help='Test image (repeated as a video)')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--imgsz', type=int, default=640, help='Inference input size')
+    parser.add_argument('--frames', type=int, default=100, help='Timed frames per backend')
+    parser.add_argument('--cache-dir', default=None, help='Model export cache directory')
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image)
+    if frame is None:
+        print(f"❌ Could not read {args.image}")
+        return
+
+    print(f"📊 Backend benchmark: {args.model} @ {args.imgsz}px on {args.image}")
+    print("=" * 72)
+    print(f"{'backend':>9} {'load s':>7} {'FPS':>8} {'speedup':>8} {'boxes':>6} {'unmatched':>10} "
+          f"{'min IoU':>8} {'max Δconf':>10}")
+    reference = baseline = None
+    for backend in args.backends:
+        detector = DrowningDetector(device='cpu')
+        t0 = time.perf_counter()
+        detector.load_model(args.model, backend=backend, imgsz=args.imgsz, cache_dir=args.cache_dir, shared=False)
+        load_time = time.perf_counter() - t0
+
+        try:
+            detections, _ = detector.predict_frame(frame)  # warm-up
+            t0 = time.perf_counter()
+            for _ in range(args.frames):
+                detector.predict_frame(frame)
+            fps = args.frames / (time.perf_counter() - t0)
+        finally:
+            detector.close()  # one backend in memory at a time
+
+        reference = reference if reference is not None else detections
+        baseline = baseline or fps
+        _, unmatched, min_iou, conf_diff = compare(reference, detections)
+        print(f"{backend:>9} {load_time:>7.1f} {fps:>8.1f} {fps / baseline:>7.2f}x {len(detections):>6} "
+              f"{unmatched:>10} {min_iou:>8.3f} {conf_diff:>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark detector start-up with and without the shared model registry.
+
+Creates N DrowningDetector instances (one per camera) in one process, first
+with private models (shared=False, the old behaviour) and then from the
+process-wide registry, and reports the load time of the first and of the
+later detectors plus the resident memory added.
+
+Usage:
+    python benchmarks/bench_model_registry.py --model yolov8n.pt --detectors 4
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.drowning_detector_advanced import DrowningDetector
+from src.models import model_registry
+
+
+def rss_mb() -> float:
+    """Resident set size of this process (Linux)."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+def start_detectors(model: str, count: int, shared: bool, device=None):
+    """Return (detectors, per-detector load seconds, MB added)."""
+    gc.collect()
+    before = rss_mb()
+    detectors, times = [], []
+    for _ in range(count):
+        detector = DrowningDetector(device=device)
+        t0 = time.perf_counter()
+        detector.load_model(model, shared=shared)
+        times.append(time.perf_counter() - t0)
+        detectors.append(detector)
+    return detectors, times, rss_mb() - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared model registry benchmark")
+    parser.add_argument('--model', '-m', default='yolov8n.pt', help='YOLO model')
+    parser.add_argument('--detectors', type=int, default=4, help='Detectors (cameras) in the process')
+    parser.add_argument('--device', default=None, help="torch device, e.g. 'cpu' or 'cuda:0'")
+    args = parser.parse_args()
+
+    print(f"📊 Model registry benchmark: {args.detectors} x {args.model}")
+    print("=" * 56)
+    print(f"{'mode':>9} {'first load s':>13} {'later loads s':>14} {'RSS added MB':>13}")
+    for label, shared in (('private', False), ('shared', True)):
+        detectors, times, added = start_detectors(args.model, args.detectors, shared, args.device)
+        later = sum(times[1:]) / max(1, len(times) - 1)
+        print(f"{label:>9} {times[0]:>13.3f} {later:>14.4f} {added:>13.1f}")
+        for detector in detectors:
+            detector.close()
+        del detectors
+        model_registry.clear()
+
+
+if __name__ == '__main__':
+    main()
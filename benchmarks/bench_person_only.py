@@ -0,0 +1,79 @@
+"""
+Benchmark person-only inference against the all-classes detector path.
+
+Runs DrowningDetector.predict_frame on the same frame with
+  1. the stock COCO model, all 80 classes (current default),
+  2. the stock model with the person class filter passed to YOLO,
+  3. a single-class head sliced from the same weights (scripts/export_person_head.py),
+and reports frames per second and the number of boxes handed to the pipeline.
+
+Usage:
+    python benchmarks/bench_person_only.py --model yolov8n.pt --image bus.jpg --frames 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.drowning_detector_advanced import DrowningDetector
+from src.models import slice_detection_head
+
+
+def time_detector(detector: DrowningDetector, frame, frames: int, warmup: int = 5):
+    """Return (fps, boxes per frame) of predict_frame on a repeated frame."""
+    for _ in range(warmup):
+        detector.predict_frame(frame)
+    boxes = 0
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        detections, _ = detector.predict_frame(frame)
+        boxes += len(detections)
+    elapsed = time.perf_counter() - t0
+    return frames / elapsed, boxes / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Person-only inference benchmark")
+    parser.add_argument('--model', '-m', default='yolov8n.pt', help='COCO YOLO model')
+    parser.add_argument('--image', '-i', default='bus.jpg', help='Test image (repeated as a video)')
+    parser.add_argument('--frames', type=int, default=100, help='Timed frames per mode')
+    parser.add_argument('--device', default=None, help="torch device, e.g. 'cpu' or 'cuda:0'")
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image)
+    if frame is None:
+        print(f"❌ Could not read {args.image}")
+        return
+
+    modes = []
+    detector = DrowningDetector(device=args.device)
+    detector.load_model(args.model)
+    modes.append(('all classes', detector))
+
+    detector = DrowningDetector(device=args.device)
+    detector.load_model(args.model)
+    detector.drowning_config['person_only'] = True
+    modes.append(('classes=[0]', detector))
+
+    detector = DrowningDetector(device=args.device)
+    detector.load_model(args.model, shared=False)  # sliced in place, keep it out of the registry
+    slice_detection_head(detector.model)
+    detector.drowning_config['person_only'] = True
+    modes.append(('1-class head', detector))
+
+    print(f"📊 Person-only benchmark: {args.model} on {args.image} ({frame.shape[1]}x{frame.shape[0]})")
+    print("=" * 50)
+    print(f"{'mode':>14} {'FPS':>8} {'boxes/frame':>12} {'speedup':>9}")
+    baseline = None
+    for label, detector in modes:
+        fps, boxes = time_detector(detector, frame, args.frames)
+        baseline = baseline or fps
+        print(f"{label:>14} {fps:>8.1f} {boxes:>12.1f} {fps / baseline:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark pose-to-detection association.
+
+Places N people in a row, gives each a noisy 17-keypoint skeleton (listed in
+random order, as the pose model returns them) and reports the time to assign
+skeletons to detections with the per-detection search over all skeletons
+versus DrowningDetector._match_poses (one vectorized pass plus a global
+assignment).
+
+Usage:
+    python benchmarks/bench_pose_association.py --people 5 20 50 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.drowning_detector import DrowningDetector
+
+
+def crowd(num_people: int, seed: int = 0):
+    """Return (detection centres, skeletons) for a row of people."""
+    rng = np.random.default_rng(seed)
+    centers = np.stack([np.arange(num_people) * 80.0 + 40, np.full(num_people, 300.0)], axis=1)
+    skeletons = np.zeros((num_people, 17, 3), dtype=np.float32)
+    skeletons[:, :, :2] = centers[rng.permutation(num_people), None, :] + rng.normal(0, 5, (num_people, 17, 2))
+    skeletons[:, :, 2] = rng.uniform(0.2, 1.0, (num_people, 17))
+    return centers, skeletons
+
+
+def per_detection_search(skeletons: np.ndarray, centers: np.ndarray) -> list:
+    """First skeleton within 50 px of each detection, searched detection by detection."""
+    assigned = []
+    for center in centers:
+        match = -1
+        for index, skeleton in enumerate(skeletons):
+            visible = skeleton[skeleton[:, 2] > 0.3]
+            if len(visible) and np.linalg.norm(center - np.mean(visible[:, :2], axis=0)) < 50:
+                match = index
+                break
+        assigned.append(match)
+    return assigned
+
+
+def time_ms(fn, repeats: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - t0) / repeats * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pose association benchmark")
+    parser.add_argument('--people', type=int, nargs='+', default=[5, 20, 50, 200], help='People per frame')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed runs per size')
+    args = parser.parse_args()
+
+    detector = DrowningDetector()
+    print("📊 Pose association benchmark (ms per frame)")
+    print("=" * 50)
+    print(f"{'people':>8} {'per-detection':>14} {'vectorized':>11} {'speedup':>9}")
+    for num_people in args.people:
+        centers, skeletons = crowd(num_people)
+        loop = time_ms(lambda: per_detection_search(skeletons, centers), args.repeats)
+        vectorized = time_ms(lambda: detector._match_poses(skeletons, centers), args.repeats)
+        print(f"{num_people:>8} {loop:>14.2f} {vectorized:>11.2f} {loop / vectorized:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark per-track against vectorized risk scoring.
+
+Simulates N swimmers (a third of them sinking with a narrowing box and fading
+confidence) until every track holds a full history, then times the risk
+analysis of one frame for all tracks:
+  1. per track: _analyze_person_comprehensive() in a Python loop (previous path),
+  2. vectorized: _score_tracks() once for all tracks, then
+     _scored_person_analysis() per track (current path),
+and checks that both give the same risk levels.
+
+Usage:
+    python benchmarks/bench_risk_scoring.py --tracks 1 10 50 100 200 500 --repeats 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.detections import DetectionBatch
+from src.drowning_detector import DrowningDetector
+
+
+def populated_detector(num_people: int, num_frames: int = 60, fps: float = 25.0, seed: int = 0):
+    """Detector whose tracker holds `num_people` tracks with `num_frames` samples each."""
+    rng = np.random.default_rng(seed)
+    detector = DrowningDetector()
+    side = np.sqrt(num_people) * 120.0  # ~120x120 px of water per swimmer
+    centers = rng.uniform(0, side, size=(num_people, 2))
+    sinking = np.arange(num_people) % 3 == 0
+    for frame in range(num_frames):
+        centers += np.where(sinking[:, None], [0.0, 2.0], 0.0) + rng.normal(0, 3.0, size=centers.shape)
+        half = np.stack([np.where(sinking, 8.0, 15.0), np.full(num_people, 30.0)], axis=1)
+        confidences = np.clip(0.85 - sinking * 0.01 * frame, 0.1, 1.0)
+        detections = DetectionBatch(np.concatenate([centers - half, centers + half], axis=1), confidences,
+                                    np.zeros(num_people, dtype=np.int64), frame / fps)
+        detector.person_tracker.update_tracks(detections, timestamp=frame / fps)
+    return detector
+
+
+def time_scoring(detector, repeats: int):
+    """Return (per-track ms, vectorized ms, levels agree) for one frame of analysis."""
+    tracks = list(detector.person_tracker.tracks.items())
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        per_track = [detector._analyze_person_comprehensive(track, track_id) for track_id, track in tracks]
+    loop_ms = (time.perf_counter() - t0) / repeats * 1000
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        scores = detector._score_tracks([track for _, track in tracks])
+        vectorized = [detector._scored_person_analysis(track, track_id, scores, index)
+                      for index, (track_id, track) in enumerate(tracks)]
+    batch_ms = (time.perf_counter() - t0) / repeats * 1000
+
+    agree = [a['risk_level'] for a in per_track] == [a['risk_level'] for a in vectorized]
+    return loop_ms, batch_ms, agree
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized risk scoring benchmark")
+    parser.add_argument('--tracks', type=int, nargs='+', default=[1, 10, 50, 100, 200, 500],
+                        help='Numbers of simultaneous tracks to benchmark')
+    parser.add_argument('--repeats', type=int, default=20, help='Timed analyses per track count')
+    args = parser.parse_args()
+
+    print("📊 Risk scoring benchmark (ms per frame)")
+    print("=" * 58)
+    print(f"{'tracks':>8} {'per-track':>12} {'vectorized':>12} {'speedup':>9} {'same':>8}")
+    for num_tracks in args.tracks:
+        detector = populated_detector(num_tracks)
+        loop_ms, batch_ms, agree = time_scoring(detector, args.repeats)
+        print(f"{num_tracks:>8} {loop_ms:>12.3f} {batch_ms:>12.3f} {loop_ms / batch_ms:>8.1f}x "
+              f"{'✅' if agree else '❌':>7}")
+
+
+if __name__ == '__main__':
+    main()
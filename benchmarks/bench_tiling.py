@@ -0,0 +1,112 @@
+"""
+Benchmark tiled inference against whole-frame inference on a 4K pool scene.
+
+Person crops from the test image are scaled down to distant-swimmer sizes and
+pasted into a synthetic 4K pool (see bench_water_segmentation.py). The same
+frame is run through DrowningDetector.predict_frame
+  1. whole frame, letterboxed to the model input size (current default),
+  2. tiled over the water region ('tiled_inference'),
+and the benchmark reports person recall (IoU >= 0.5 with a pasted person),
+frames per second and the number of tiles per frame.
+
+Usage:
+    python benchmarks/bench_tiling.py --model yolov8n.pt --image bus.jpg --frames 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_water_segmentation import pool_scene
+from src.drowning_detector_advanced import DrowningDetector
+
+
+def person_crops(model: str, image: str, device=None) -> list:
+    """Person crops of the test image, found with the detector itself."""
+    frame = cv2.imread(image)
+    if frame is None:
+        raise SystemExit(f"❌ Could not read {image}")
+    detector = DrowningDetector(device=device)
+    detector.load_model(model)
+    detector.drowning_config.update(person_only=True, water_detection_enabled=False)
+    detections, _ = detector.predict_frame(frame)
+    return [frame[int(y0):int(y1), int(x0):int(x1)] for x0, y0, x1, y1 in detections.boxes.tolist()]
+
+
+def synthetic_scene(crops: list, heights, count: int, seed: int = 0):
+    """4K pool frame with `count` pasted persons and their (N, 4) ground-truth boxes."""
+    rng = np.random.default_rng(seed)
+    frame = pool_scene(3840, 2160, seed)
+    boxes = []
+    while len(boxes) < count:
+        crop = crops[rng.integers(len(crops))]
+        height = int(rng.uniform(*heights))
+        width = max(1, int(crop.shape[1] * height / crop.shape[0]))
+        x0, y0 = int(rng.uniform(0.15, 0.85) * 3840), int(rng.uniform(0.3, 0.88) * 2160)
+        box = np.array([x0, y0, x0 + width, y0 + height])
+        if any(_iou(box, other) > 0 for other in boxes):
+            continue
+        frame[y0:y0 + height, x0:x0 + width] = cv2.resize(crop, (width, height), interpolation=cv2.INTER_AREA)
+        boxes.append(box)
+    return frame, np.array(boxes, dtype=np.float64)
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - w * h
+    return w * h / union if union > 0 else 0.0
+
+
+def recall(predicted: np.ndarray, truth: np.ndarray, threshold: float = 0.5) -> float:
+    found = sum(any(_iou(t, p) >= threshold for p in predicted) for t in truth)
+    return found / len(truth)
+
+
+def run(detector: DrowningDetector, frame: np.ndarray, truth: np.ndarray, frames: int):
+    """Return (recall, fps) of predict_frame on a repeated frame."""
+    detections, _ = detector.predict_frame(frame)  # warm-up, builds the tile layout
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        detections, _ = detector.predict_frame(frame)
+    elapsed = time.perf_counter() - t0
+    return recall(detections.boxes, truth), frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiled vs. whole-frame inference benchmark (synthetic 4K)")
+    parser.add_argument('--model', '-m', default='yolov8n.pt', help='YOLO model')
+    parser.add_argument('--image', '-i', default='bus.jpg', help='Image to take person crops from')
+    parser.add_argument('--persons', type=int, default=20, help='Persons pasted into the scene')
+    parser.add_argument('--heights', type=int, nargs=2, default=[40, 140], help='Person height range in pixels')
+    parser.add_argument('--imgsz', type=int, default=640, help='Model input size (and tile size)')
+    parser.add_argument('--overlap', type=float, default=0.2, help='Tile overlap fraction')
+    parser.add_argument('--frames', type=int, default=20, help='Timed frames per mode')
+    parser.add_argument('--device', default=None, help="torch device, e.g. 'cpu' or 'cuda:0'")
+    args = parser.parse_args()
+
+    frame, truth = synthetic_scene(person_crops(args.model, args.image, args.device), args.heights, args.persons)
+
+    print(f"📊 Tiled inference benchmark: {args.model} @ {args.imgsz}px, "
+          f"{len(truth)} persons {args.heights[0]}-{args.heights[1]}px in a 3840x2160 pool")
+    print("=" * 54)
+    print(f"{'mode':>14} {'tiles':>6} {'recall':>8} {'FPS':>8} {'speedup':>9}")
+    baseline = None
+    for label, tiled in (('whole frame', False), ('tiled', True)):
+        detector = DrowningDetector(device=args.device)
+        detector.load_model(args.model, imgsz=args.imgsz)
+        detector.drowning_config.update(person_only=True, tiled_inference=tiled, tile_overlap=args.overlap)
+        found, fps = run(detector, frame, truth, args.frames)
+        layout = detector.camera().tile_layout
+        tiles = len(layout) if layout is not None else 1
+        baseline = baseline or fps
+        print(f"{label:>14} {tiles:>6} {found:>8.2f} {fps:>8.1f} {fps / baseline:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
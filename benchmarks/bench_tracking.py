@@ -0,0 +1,66 @@
+"""
+Benchmark PersonTracker matching with and without the uniform-grid spatial index.
+
+Simulates N swimmers moving through a scene whose area grows with N (constant
+crowd density, like a wide-angle beach or waterpark camera) and reports the
+mean per-frame update_tracks() time for the indexed and brute-force paths.
+
+Usage:
+    python benchmarks/bench_tracking.py --tracks 10 50 200 1000 --frames 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.tracking import PersonTracker
+
+
+def simulate_frames(num_people: int, num_frames: int, seed: int = 0):
+    """Yield per-frame detection lists for randomly walking swimmers."""
+    rng = np.random.default_rng(seed)
+    side = np.sqrt(num_people) * 120.0  # ~120x120 px of water per swimmer
+    centers = rng.uniform(0, side, size=(num_people, 2))
+    for _ in range(num_frames):
+        centers += rng.normal(0, 3.0, size=centers.shape)
+        boxes = np.concatenate([centers - [15, 30], centers + [15, 30]], axis=1)
+        yield [
+            {'class_id': 0, 'confidence': 0.8, 'center': c.tolist(), 'bbox': b.tolist()}
+            for c, b in zip(centers, boxes)
+        ]
+
+
+def time_tracker(frames, use_spatial_index: bool, fps: float = 25.0) -> float:
+    """Return mean milliseconds per update_tracks() call."""
+    tracker = PersonTracker(use_spatial_index=use_spatial_index, spatial_index_min_pairs=0, fps=fps)
+    elapsed = 0.0
+    for i, detections in enumerate(frames):
+        t0 = time.perf_counter()
+        tracker.update_tracks(detections, timestamp=i / fps)
+        elapsed += time.perf_counter() - t0
+    return elapsed / len(frames) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PersonTracker spatial index benchmark")
+    parser.add_argument('--tracks', type=int, nargs='+', default=[10, 50, 200, 1000],
+                        help='Numbers of simultaneous tracks to benchmark')
+    parser.add_argument('--frames', type=int, default=100, help='Frames per run')
+    args = parser.parse_args()
+
+    print("📊 PersonTracker matching benchmark (ms per frame)")
+    print("=" * 50)
+    print(f"{'tracks':>8} {'brute-force':>12} {'grid index':>12} {'speedup':>9}")
+    for num_tracks in args.tracks:
+        frames = list(simulate_frames(num_tracks, args.frames))
+        brute = time_tracker(frames, use_spatial_index=False)
+        indexed = time_tracker(frames, use_spatial_index=True)
+        print(f"{num_tracks:>8} {brute:>12.3f} {indexed:>12.3f} {brute / indexed:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
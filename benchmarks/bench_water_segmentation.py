@@ -0,0 +1,83 @@
+"""
+Benchmark WaterDetector segmentation at full and reduced segmentation scale.
+
+Renders a synthetic pool scene (blue water with lane ropes, noise and a
+lighter deck) at 720p, 1080p and 4K and reports the mean time of the colour
+classification step alone and of a full mask update (classification,
+morphology, contour), plus the IoU of each mask with the reference.
+
+Usage:
+    python benchmarks/bench_water_segmentation.py --repeats 20 --scale 0.5
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.water_detection import WaterDetector
+
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080), '4K': (3840, 2160)}
+
+
+def pool_scene(width: int, height: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), (150, 170, 180), dtype=np.uint8)  # deck
+    corners = np.array([[0.12, 0.25], [0.88, 0.22], [0.95, 0.92], [0.05, 0.95]]) * [width, height]
+    cv2.fillPoly(frame, [corners.astype(np.int32)], (200, 130, 40))
+    for y in np.linspace(0.3, 0.9, 6):
+        cv2.line(frame, (0, int(y * height)), (width, int(y * height)), (60, 200, 230), max(1, height // 360))
+    noise = rng.normal(0, 6, size=frame.shape)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+
+def time_ms(fn, frame, repeats: int) -> float:
+    fn(frame)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        fn(frame)
+    return (time.perf_counter() - t0) / repeats * 1000
+
+
+def iou(a: np.ndarray, b: np.ndarray) -> float:
+    union = np.count_nonzero(a | b)
+    return np.count_nonzero(a & b) / union if union else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Water segmentation benchmark")
+    parser.add_argument('--resolutions', nargs='+', default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument('--repeats', type=int, default=20, help='Timed runs per configuration')
+    parser.add_argument('--scale', type=float, default=0.5, help='segmentation_scale of the downscaled variant')
+    args = parser.parse_args()
+
+    variants = [
+        ('full frame', WaterDetector()),
+        (f'{args.scale:g}x', WaterDetector(segmentation_scale=args.scale)),
+    ]
+
+    print("📊 Water segmentation benchmark (ms per frame)")
+    print("=" * 68)
+    print(f"{'res':>6} {'variant':>14} {'classify':>10} {'mask update':>12} {'speedup':>9} {'IoU':>7}")
+    for name in args.resolutions:
+        frame = pool_scene(*RESOLUTIONS[name])
+        reference = None
+        baseline = None
+        for label, detector in variants:
+            classify = '-'
+            if detector.segmentation_scale == 1.0:
+                classify = f"{time_ms(detector._classify_colours, frame, args.repeats):.2f}"
+            update = time_ms(detector._segment, frame, args.repeats)
+            mask = detector._segment(frame) > 0
+            if reference is None:
+                reference, baseline = mask, update
+            print(f"{name:>6} {label:>14} {classify:>10} {update:>12.2f} "
+                  f"{baseline / update:>8.1f}x {iou(mask, reference):>7.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Create a person-only (single-class) YOLO checkpoint from a COCO model.
+
+The classification head is sliced down to the person channel, so person
+boxes and scores are unchanged while the head and NMS only handle one class.
+Load the result with DrowningDetector.load_model(); single-class models run
+in person-only mode automatically.
+
+Usage:
+    python scripts/export_person_head.py --model yolov8n.pt --output yolov8n-person.pt
+    python scripts/export_person_head.py --model yolov8n-pose.pt --output yolov8n-pose-person.pt
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import PERSON_CLASS_ID, model_class_names, slice_detection_head
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slice a YOLO model down to a person-only head")
+    parser.add_argument('--model', '-m', default='yolov8n.pt', help='Source YOLO .pt model')
+    parser.add_argument('--output', '-o', default=None, help='Output .pt path (default: <model>-person.pt)')
+    parser.add_argument('--class-id', type=int, default=PERSON_CLASS_ID, help='Class to keep')
+    args = parser.parse_args()
+
+    try:
+        from ultralytics import YOLO
+    except Exception as e:
+        raise RuntimeError("ultralytics package is required. Install with pip install ultralytics") from e
+
+    output = args.output or f"{os.path.splitext(args.model)[0]}-person.pt"
+    model = YOLO(args.model)
+    before = len(model_class_names(model))
+    slice_detection_head(model, [args.class_id])
+    model.save(output)
+
+    print(f"✅ {args.model}: {before} classes -> {model_class_names(model)}")
+    print(f"💾 Saved person-only model to {output}")
+
+
+if __name__ == '__main__':
+    main()
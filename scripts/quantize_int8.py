@@ -0,0 +1,114 @@
+"""
+Quantize the person detector to INT8 for CPU inference and report the cost.
+
+For every requested input size the PyTorch weights are exported to ONNX
+(through the model cache), calibrated on a folder of our own pool frames and
+quantized to INT8. The FP32 and INT8 models are then compared on a held-out
+set: mAP via ultralytics val() when a labelled dataset YAML is given, and
+DrowningDetector.predict_frame latency on the held-out (or calibration)
+frames. The INT8 model loads with DrowningDetector.load_model() directly.
+
+Usage:
+    python scripts/quantize_int8.py --model yolov8n.pt --calibration frames/calib \\
+        --val-data pool_val.yaml --imgsz 640 480 --output-dir models/int8
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.drowning_detector_advanced import DrowningDetector
+from src.models import export_model, quantize_onnx_int8
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def image_files(folder: str, limit: int = None) -> list:
+    files = sorted(f for f in glob.glob(os.path.join(folder, '**', '*'), recursive=True)
+                   if f.lower().endswith(IMAGE_EXTENSIONS))
+    return files[:limit] if limit else files
+
+
+def read_frames(files):
+    for path in files:
+        frame = cv2.imread(path)
+        if frame is not None:
+            yield frame
+
+
+def latency_ms(model_path: str, imgsz: int, frames: list, repeats: int) -> float:
+    """Mean predict_frame time in milliseconds on CPU."""
+    detector = DrowningDetector(device='cpu')
+    detector.load_model(model_path, imgsz=imgsz, shared=False)  # private copy, freed once timed
+    try:
+        detector.predict_frame(frames[0])  # warm-up
+        t0 = time.perf_counter()
+        for i in range(repeats):
+            detector.predict_frame(frames[i % len(frames)])
+        return (time.perf_counter() - t0) / repeats * 1000
+    finally:
+        detector.close()
+
+
+def box_map(model_path: str, data: str, imgsz: int):
+    """(mAP50-95, mAP50) of a model on a labelled ultralytics dataset YAML."""
+    from ultralytics import YOLO
+    metrics = YOLO(model_path, task='detect').val(data=data, imgsz=imgsz, batch=1, device='cpu',
+                                                  plots=False, verbose=False)
+    return metrics.box.map, metrics.box.map50
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 post-training quantization of the detector")
+    parser.add_argument('--model', '-m', default='yolov8n.pt', help='PyTorch YOLO weights')
+    parser.add_argument('--calibration', '-c', required=True, help='Folder of calibration frames')
+    parser.add_argument('--max-calibration', type=int, default=300, help='Calibration frames to use')
+    parser.add_argument('--val-data', default=None, help='Held-out dataset YAML (ultralytics format) for mAP')
+    parser.add_argument('--latency-frames', default=None,
+                        help='Folder of held-out frames for latency (default: calibration frames)')
+    parser.add_argument('--imgsz', type=int, nargs='+', default=[640], help='Input sizes to quantize')
+    parser.add_argument('--repeats', type=int, default=50, help='Timed predict_frame calls per model')
+    parser.add_argument('--output-dir', '-o', default='.', help='Where to write the INT8 models')
+    parser.add_argument('--cache-dir', default=None, help='Model export cache directory')
+    parser.add_argument('--quantize-head', action='store_true',
+                        help='Also quantize the detection head (faster, usually less accurate)')
+    args = parser.parse_args()
+
+    calibration = image_files(args.calibration, args.max_calibration)
+    if not calibration:
+        print(f"❌ No images found in {args.calibration}")
+        return
+    latency_files = image_files(args.latency_frames, 100) if args.latency_frames else calibration[:100]
+    latency_frames = list(read_frames(latency_files))
+
+    rows = []
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+    for imgsz in args.imgsz:
+        fp32 = export_model(args.model, 'onnx', imgsz, args.cache_dir)
+        int8 = os.path.join(args.output_dir, f"{stem}-{imgsz}-int8.onnx")
+        print(f"⚙️  Calibrating {stem} @ {imgsz}px on {len(calibration)} frames...")
+        quantize_onnx_int8(fp32, read_frames(calibration), int8, imgsz, exclude_head=not args.quantize_head)
+        print(f"💾 Saved {int8}")
+
+        for label, path in (('fp32', fp32), ('int8', int8)):
+            maps = box_map(path, args.val_data, imgsz) if args.val_data else (None, None)
+            rows.append((imgsz, label, latency_ms(path, imgsz, latency_frames, args.repeats),
+                         os.path.getsize(path) / 1e6) + maps)
+
+    print("\n📊 INT8 quantization report (CPU)")
+    print("=" * 66)
+    print(f"{'imgsz':>6} {'model':>6} {'latency ms':>11} {'speedup':>8} {'size MB':>8} {'mAP50-95':>9} {'mAP50':>7}")
+    fp32_latency = {}
+    for imgsz, label, latency, size, map5095, map50 in rows:
+        baseline = fp32_latency.setdefault(imgsz, latency)
+        maps = f"{map5095:>9.4f} {map50:>7.4f}" if map5095 is not None else f"{'-':>9} {'-':>7}"
+        print(f"{imgsz:>6} {label:>6} {latency:>11.1f} {baseline / latency:>7.2f}x {size:>8.1f} {maps}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Per-camera stream state for detectors that serve several cameras.
+
+Everything that depends on the history of one video stream (frame clock,
+detection stride counter, tracks, the cached water mask, the adaptive
+input size, the tile layout and the pose schedule) lives in a
+CameraState, so frames from different cameras can share one detector and one
+batched model call without their tracks or masks mixing.
+"""
+from typing import Optional
+
+from src.frame_clock import FrameClock
+from src.pose_scheduler import PoseScheduler
+from src.resolution import ResolutionController
+from src.tiling import TileLayout
+from src.tracking import PersonTracker
+from src.water_detection import WaterDetector
+
+
+class CameraState:
+    """Stream state of a single camera."""
+
+    def __init__(self, fps: float = 25.0, water_detector: Optional[WaterDetector] = None,
+                 person_tracker: Optional[PersonTracker] = None):
+        """
+        Args:
+            fps: Nominal frame rate of the camera.
+            water_detector: Water detector for this camera; a default one if None.
+            person_tracker: Tracker for this camera; a default one if None.
+        """
+        self.clock = FrameClock(fps)  # stream time, used when callers don't pass timestamps
+        self.frames_processed = 0     # drives the detection stride
+        self.person_tracker = person_tracker or PersonTracker(fps=fps)
+        self.water_detector = water_detector or WaterDetector()
+        self.resolution: Optional[ResolutionController] = None  # set when adaptive resolution is on
+        self.tile_layout: Optional[TileLayout] = None            # cached tiles for tiled inference
+        self.pose_scheduler: Optional[PoseScheduler] = None      # set when pose is risk-gated
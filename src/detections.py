@@ -0,0 +1,280 @@
+"""
+Columnar per-frame detections.
+
+A DetectionBatch keeps the detections of one frame as parallel NumPy arrays
+(boxes, confidences, class ids, water context...) with the derived geometry
+(centre, size, area, aspect ratio) computed for all rows at once. The tracker
+and the risk analysis read the columns directly; code that still wants one
+dict per detection (JSON APIs, drawing, the legacy detector methods) gets a
+lazy DetectionView per row that only builds the values it is asked for.
+"""
+from typing import Any, Dict, Iterator, List, Mapping, MutableMapping, Optional, Sequence
+import numpy as np
+
+
+class DetectionBatch:
+    """Detections of one frame as parallel arrays."""
+
+    def __init__(self, boxes, confidences, class_ids, timestamp: Optional[float] = None,
+                 names: Optional[Mapping[int, str]] = None, **columns):
+        """
+        Args:
+            boxes: (N, 4) xyxy boxes in frame pixels.
+            confidences: (N,) detection scores.
+            class_ids: (N,) class indices.
+            timestamp: Stream time of the frame in seconds.
+            names: Class index -> name mapping of the model.
+            **columns: Extra per-row columns, e.g. in_water=..., pose=[...]. NumPy
+                arrays for numeric data, lists for objects (None = field absent).
+        """
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        n = len(self.boxes)
+        self.confidences = np.asarray(confidences, dtype=np.float64).reshape(n)
+        self.class_ids = np.asarray(class_ids, dtype=np.int64).reshape(n)
+        self.timestamp = timestamp
+        self.names = names or {}
+
+        # Derived geometry, vectorized once per frame
+        self.centers = (self.boxes[:, :2] + self.boxes[:, 2:]) / 2
+        self.widths = self.boxes[:, 2] - self.boxes[:, 0]
+        self.heights = self.boxes[:, 3] - self.boxes[:, 1]
+        self.areas = self.widths * self.heights
+        self.aspect_ratios = np.divide(self.widths, self.heights, out=np.zeros(n), where=self.heights > 0)
+
+        self.in_water = np.ones(n, dtype=bool)
+        self.distance_to_pool_edge = np.zeros(n)
+        self.visibility_scores = self.confidences.copy()
+        self.predicted = np.zeros(n, dtype=bool)   # synthesized from a track's Kalman filter
+        self.track_ids = np.full(n, -1, dtype=np.int64)  # owning track of predicted rows
+        self.columns: Dict[str, Any] = {}          # extra per-row columns (pose, ...)
+        self._overrides: Dict[int, Dict[str, Any]] = {}  # values set through row views
+
+        for name, values in columns.items():
+            self.set_column(name, values)
+
+    @classmethod
+    def empty(cls, timestamp: Optional[float] = None, names: Optional[Mapping[int, str]] = None) -> 'DetectionBatch':
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=np.int64), timestamp, names)
+
+    @classmethod
+    def from_yolo(cls, data: np.ndarray, timestamp: Optional[float] = None,
+                  names: Optional[Mapping[int, str]] = None) -> 'DetectionBatch':
+        """Build from an ultralytics ``Boxes.data`` array, shape (N, 6): xyxy, score, class."""
+        data = np.asarray(data, dtype=np.float64).reshape(-1, 6)
+        return cls(data[:, :4], data[:, 4], data[:, 5].astype(np.int64), timestamp, names)
+
+    @classmethod
+    def from_dicts(cls, detections: Sequence[Mapping], timestamp: Optional[float] = None) -> 'DetectionBatch':
+        """Build from detection dicts (legacy callers, tests). Unknown keys become columns."""
+        if isinstance(detections, DetectionBatch):
+            return detections
+        if timestamp is None and detections:
+            timestamp = detections[0].get('timestamp')
+        if not detections:
+            return cls.empty(timestamp)
+
+        batch = cls([d['bbox'] for d in detections],
+                     [d.get('confidence', 0.0) for d in detections],
+                     [d.get('class_id', 0) for d in detections], timestamp,
+                     {int(d['class_id']): d['name'] for d in detections if 'name' in d and 'class_id' in d})
+        # Keep caller-provided centres (they may not be the box centre for synthetic input)
+        batch.centers = np.array([d.get('center', c) for d, c in zip(detections, batch.centers.tolist())],
+                                 dtype=np.float64).reshape(-1, 2)
+        batch.in_water = np.array([d.get('in_water', True) for d in detections], dtype=bool)
+        batch.distance_to_pool_edge = np.array([d.get('distance_to_pool_edge', 0.0) for d in detections],
+                                               dtype=np.float64)
+        batch.visibility_scores = np.array([d.get('visibility_score', d.get('confidence', 0.0))
+                                            for d in detections], dtype=np.float64)
+        batch.predicted = np.array([bool(d.get('predicted', False)) for d in detections])
+        batch.track_ids = np.array([d.get('track_id', -1) if d.get('predicted') else -1
+                                    for d in detections], dtype=np.int64)
+
+        known = set(DetectionView.CORE_FIELDS)
+        for key in {k for d in detections for k in d} - known:
+            batch.columns[key] = [d.get(key) for d in detections]
+        return batch
+
+    @classmethod
+    def concatenate(cls, batches: Sequence['DetectionBatch']) -> 'DetectionBatch':
+        """Rows of several batches of the same frame, in order (timestamp and names of the first).
+
+        Extra columns missing from some batches are filled with None (zeros for arrays).
+        """
+        batches = list(batches)
+        if not batches:
+            return cls.empty()
+        combined = DetectionBatch.__new__(DetectionBatch)
+        combined.timestamp = batches[0].timestamp
+        combined.names = dict(batches[0].names)
+        for attribute in ('boxes', 'confidences', 'class_ids', 'centers', 'widths', 'heights', 'areas',
+                          'aspect_ratios', 'in_water', 'distance_to_pool_edge', 'visibility_scores',
+                          'predicted', 'track_ids'):
+            setattr(combined, attribute, np.concatenate([getattr(b, attribute) for b in batches]))
+        combined.columns = {}
+        for name in dict.fromkeys(name for b in batches for name in b.columns):
+            parts = [b.columns.get(name) for b in batches]
+            if all(isinstance(p, np.ndarray) or (p is None and not len(b)) for p, b in zip(parts, batches)):
+                template = next(p for p in parts if p is not None)
+                combined.columns[name] = np.concatenate(
+                    [p if p is not None else np.zeros((0,) + template.shape[1:], template.dtype) for p in parts])
+            else:
+                combined.columns[name] = [value for p, b in zip(parts, batches)
+                                          for value in (list(p) if p is not None else [None] * len(b))]
+        combined._overrides = {}
+        start = 0
+        for b in batches:
+            combined._overrides.update({start + row: dict(values) for row, values in b._overrides.items()})
+            start += len(b)
+        return combined
+
+    def set_column(self, name: str, values) -> None:
+        """Set a per-row column; core columns are assigned in place."""
+        attribute = {'in_water': 'in_water', 'distance_to_pool_edge': 'distance_to_pool_edge',
+                     'visibility_score': 'visibility_scores', 'predicted': 'predicted',
+                     'track_id': 'track_ids'}.get(name)
+        if attribute is not None:
+            current = getattr(self, attribute)
+            setattr(self, attribute, np.asarray(values, dtype=current.dtype).reshape(len(self)))
+        else:
+            self.columns[name] = values if isinstance(values, np.ndarray) else list(values)
+
+    def select(self, index) -> 'DetectionBatch':
+        """Rows selected by a boolean mask or integer index array, as a new batch."""
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        subset = DetectionBatch.__new__(DetectionBatch)
+        subset.timestamp = self.timestamp
+        subset.names = self.names
+        for attribute in ('boxes', 'confidences', 'class_ids', 'centers', 'widths', 'heights', 'areas',
+                          'aspect_ratios', 'in_water', 'distance_to_pool_edge', 'visibility_scores',
+                          'predicted', 'track_ids'):
+            setattr(subset, attribute, getattr(self, attribute)[index])
+        subset.columns = {name: (values[index] if isinstance(values, np.ndarray)
+                                 else [values[i] for i in index.tolist()])
+                          for name, values in self.columns.items()}
+        subset._overrides = {new: dict(self._overrides[old]) for new, old in enumerate(index.tolist())
+                             if old in self._overrides}
+        return subset
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def __getitem__(self, index: int) -> 'DetectionView':
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"detection index {index} out of range for {len(self)} detections")
+        return DetectionView(self, index)
+
+    def __iter__(self) -> Iterator['DetectionView']:
+        return (DetectionView(self, i) for i in range(len(self)))
+
+    def to_dicts(self) -> List[Dict]:
+        """Materialize every row as a plain dict (JSON-serializable)."""
+        return [view.to_dict() for view in self]
+
+
+class DetectionView(MutableMapping):
+    """Lazy dict-like view of one row of a DetectionBatch.
+
+    Reading a key computes the plain Python value from the batch columns;
+    writing a key stores an override for that row only.
+    """
+
+    __slots__ = ('batch', 'index')
+
+    CORE_FIELDS = ('class_id', 'name', 'confidence', 'bbox', 'timestamp', 'center', 'width', 'height',
+                   'area', 'aspect_ratio', 'in_water', 'distance_to_pool_edge', 'visibility_score',
+                   'predicted', 'track_id')
+
+    def __init__(self, batch: DetectionBatch, index: int):
+        self.batch = batch
+        self.index = index
+
+    def _core(self, key: str):
+        b, i = self.batch, self.index
+        if key == 'class_id':
+            return int(b.class_ids[i])
+        if key == 'name':
+            class_id = int(b.class_ids[i])
+            return b.names.get(class_id, str(class_id))
+        if key == 'confidence':
+            return float(b.confidences[i])
+        if key == 'bbox':
+            return b.boxes[i].tolist()
+        if key == 'timestamp':
+            return b.timestamp
+        if key == 'center':
+            return b.centers[i].tolist()
+        if key == 'width':
+            return float(b.widths[i])
+        if key == 'height':
+            return float(b.heights[i])
+        if key == 'area':
+            return float(b.areas[i])
+        if key == 'aspect_ratio':
+            return float(b.aspect_ratios[i])
+        if key == 'in_water':
+            return bool(b.in_water[i])
+        if key == 'distance_to_pool_edge':
+            return float(b.distance_to_pool_edge[i])
+        if key == 'visibility_score':
+            return float(b.visibility_scores[i])
+        if key == 'predicted':
+            return True
+        if key == 'track_id':
+            return int(b.track_ids[i])
+        raise KeyError(key)
+
+    def _has_core(self, key: str) -> bool:
+        # Measured detections carry no 'predicted'/'track_id' keys, like the old dicts
+        if key in ('predicted', 'track_id'):
+            return bool(self.batch.predicted[self.index])
+        return True
+
+    def __getitem__(self, key: str):
+        overrides = self.batch._overrides.get(self.index)
+        if overrides and key in overrides:
+            return overrides[key]
+        if key in self.CORE_FIELDS and self._has_core(key):
+            return self._core(key)
+        column = self.batch.columns.get(key)
+        if column is not None:
+            value = column[self.index]
+            if value is not None:
+                return value.item() if isinstance(value, np.generic) else value
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        self.batch._overrides.setdefault(self.index, {})[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        overrides = self.batch._overrides.get(self.index, {})
+        if key not in overrides:
+            raise KeyError(key)
+        del overrides[key]
+
+    def _keys(self) -> List[str]:
+        keys = [key for key in self.CORE_FIELDS if self._has_core(key)]
+        keys += [name for name, column in self.batch.columns.items() if column[self.index] is not None]
+        keys += [key for key in self.batch._overrides.get(self.index, ()) if key not in keys]
+        return keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys()
+
+    def to_dict(self) -> Dict:
+        return {key: self[key] for key in self._keys()}
+
+    def copy(self) -> Dict:
+        return self.to_dict()
+
+    def __repr__(self) -> str:
+        return f"DetectionView({self.to_dict()!r})"
@@ -0,0 +1,855 @@
+"""
+Model loading, per-camera state and batched inference shared by the drowning detectors.
+
+Both detectors (src/drowning_detector.py and src/drowning_detector_advanced.py)
+differ only in how they analyse the tracked persons. Everything between a
+camera frame and the DetectionBatch handed to that analysis lives here: model
+loading through the shared registry and warm-up, per-camera CameraState,
+detection stride with Kalman-predicted frames, water context, adaptive input
+size, tiled inference, track-crop re-detection, pose (whole-frame, as the
+detector, or on crops of risky tracks) and predict_batch for several cameras.
+"""
+from typing import Optional, List, Dict, Tuple, Hashable, Sequence
+import numpy as np
+import time
+
+from src.camera_state import CameraState
+from src.detections import DetectionBatch
+from src.models import (exported_imgsz, is_single_class, load_yolo, model_class_names, model_registry,
+                        person_classes)
+from src.frame_clock import FrameClock
+from src.pose_scheduler import PoseScheduler
+from src.resolution import ResolutionController
+from src.tiling import TileLayout, merge_tile_detections, track_crops
+from src.tracking import PersonTracker, match_detections, pairwise_iou
+from src.water_detection import WaterDetector
+
+
+class DetectorBase:
+    """Inference pipeline of a drowning detector; subclasses add the risk analysis."""
+
+    # Whether the analysis reads keypoints; detectors without pose analysis never run the pose model
+    analyzes_pose = True
+
+    def __init__(self, device: Optional[str] = None, fps: float = 25.0):
+        """Create detector object. Model is not loaded until load_model() is called.
+
+        Args:
+            device: torch device string, e.g. 'cpu' or 'cuda:0'. If None, let ultralytics pick.
+            fps: Expected frames per second of the video stream for temporal analysis.
+        """
+        self.model = None
+        self.pose_model = None
+        self.device = device
+        self.fps = fps
+
+        # Per-camera stream state (clock, stride counter, tracks, water mask).
+        # The None entry is the default camera used by single-stream callers.
+        self.cameras: Dict[Optional[Hashable], CameraState] = {None: CameraState(fps)}
+
+        # Inference settings; the detectors add their analysis thresholds to the same dict
+        self.drowning_config = {
+            'person_class_id': 0,
+            'water_detection_enabled': True,
+            'pose_estimation_enabled': False,        # Will enable when pose model is loaded
+            'pose_as_detector': False,               # pose model supplies boxes + keypoints in one pass
+            'pose_match_distance': 50.0,             # max pixels between detection and skeleton centres
+            'pose_risk_gated': False,                # pose on crops of risky tracks instead of whole frames
+            'pose_risk_threshold': 0.3,              # movement/position risk at which a track gets pose
+            'pose_interval': 0.5,                    # seconds between pose passes of one track
+            'pose_max_age': 1.0,                     # seconds a track's crop pose is reused
+            'pose_crop_scale': 1.5,                  # pose crop side as a multiple of the box's larger side
+            'pose_crop_imgsz': 256,                  # pose model input size for the crops
+            'detection_stride': 1,                   # run YOLO every Nth frame, Kalman-predict the rest
+            'imgsz': 640,                            # detector input size (fixed for exported backends)
+            'imgsz_fixed': False,                    # set by load_model for exported models
+            'adaptive_resolution': False,            # per-camera input size from person sizes and latency
+            'resolution_sizes': (320, 416, 512, 640, 768, 960),
+            'latency_budget_ms': None,               # per detector run; None = stride / fps
+            'tiled_inference': False,                # detect on imgsz-sized tiles of the water region
+            'tile_overlap': 0.2,                     # fraction of a tile shared with its neighbours
+            'tile_full_frame': True,                 # add a whole-frame pass for swimmers larger than a tile
+            'tile_nms_iou': 0.5,                     # IoU above which boxes from different tiles are merged
+            'track_crop_redetection': False,         # between strided frames, re-detect tracks in crops
+            'track_crop_scale': 2.5,                 # crop side as a multiple of the track box's larger side
+            'track_crop_min_size': 96,               # smallest crop side in pixels
+            'track_crop_imgsz': 256,                 # detector input size of the crop batch
+            'track_crop_min_iou': 0.3,               # IoU with the prediction that counts a track as re-found
+            'person_only': False,                    # ask YOLO for persons only, drop other classes early
+            'water_roi_crop': False,                 # run YOLO only on the (padded) water bounding box
+            'water_roi_margin': 0.1,                 # padding as a fraction of the water box size
+            'water_roi_max_fraction': 0.8,           # skip cropping if the box covers more of the frame
+        }
+
+    # The default camera's state stays reachable as plain attributes for single-stream callers
+    @property
+    def clock(self) -> FrameClock:
+        return self.cameras[None].clock
+
+    @property
+    def frames_processed(self) -> int:
+        return self.cameras[None].frames_processed
+
+    @property
+    def person_tracker(self) -> PersonTracker:
+        return self.cameras[None].person_tracker
+
+    @person_tracker.setter
+    def person_tracker(self, tracker: PersonTracker) -> None:
+        self.cameras[None].person_tracker = tracker
+
+    @property
+    def water_detector(self) -> WaterDetector:
+        return self.cameras[None].water_detector
+
+    @water_detector.setter
+    def water_detector(self, detector: WaterDetector) -> None:
+        self.cameras[None].water_detector = detector
+
+    def camera(self, camera_id: Optional[Hashable] = None) -> CameraState:
+        """State of `camera_id`, created on first use with the default camera's water settings."""
+        state = self.cameras.get(camera_id)
+        if state is None:
+            state = CameraState(self.fps, water_detector=self.cameras[None].water_detector.clone_settings())
+            self.cameras[camera_id] = state
+        return state
+
+    def load_model(self, model_path: str = "yolov8n.pt", enable_pose: bool = False,
+                   pose_as_detector: bool = False, pose_model_path: str = "yolov8n-pose.pt",
+                   backend: str = 'pytorch', imgsz: int = 640, cache_dir: Optional[str] = None,
+                   shared: bool = True, warmup: bool = False) -> None:
+        """Load a YOLO model from a local path or one of the Ultralytics short names.
+        This call may download the model if not present locally.
+
+        Args:
+            model_path: Path to YOLO model or ultralytics model name. Exported models
+                (.onnx, *_openvino_model, including INT8 ones) are loaded as is.
+            enable_pose: Whether to also load pose estimation model
+            pose_as_detector: Use the pose model alone as the person detector. Its boxes
+                come with keypoints attached, so each frame needs a single forward pass;
+                model_path is not loaded.
+            pose_model_path: Pose model to use for enable_pose / pose_as_detector
+            backend: 'pytorch', 'onnx' or 'openvino'. Exported backends are built once
+                for `imgsz` and cached on disk (see src.models.load_yolo).
+            imgsz: Inference input size (exported models use their compiled size)
+            cache_dir: Export cache directory
+            shared: Take the models from the process-wide registry, so detectors loading
+                the same model share one copy. Pass False for private models that may be
+                modified in place (e.g. by slice_detection_head).
+            warmup: Run warmup() with its defaults before returning, so the first real
+                frame does not pay the lazy initialization of the models.
+        """
+        self.close()
+        # Exported models (e.g. INT8 from scripts/quantize_int8.py) only run at their compiled size
+        exported = exported_imgsz(pose_model_path if pose_as_detector else model_path)
+        self.drowning_config['imgsz'] = exported or imgsz
+        self.drowning_config['imgsz_fixed'] = exported is not None or backend != 'pytorch'
+        self.drowning_config['pose_as_detector'] = pose_as_detector
+        if pose_as_detector:
+            self.model = self._acquire_model(shared, pose_model_path, backend, imgsz, cache_dir, 'pose')
+            self.pose_model = None
+            enable_pose = False
+            self.drowning_config['pose_estimation_enabled'] = True
+        else:
+            self.model = self._acquire_model(shared, model_path, backend, imgsz, cache_dir)
+        if is_single_class(self.model):
+            # Person-only head (see scripts/export_person_head.py): class 0 is the person
+            self.drowning_config['person_only'] = True
+            self.drowning_config['person_class_id'] = 0
+
+        # Load pose estimation model if requested
+        if enable_pose:
+            try:
+                self.pose_model = self._acquire_model(shared, pose_model_path, backend, imgsz, cache_dir, 'pose')
+                self.drowning_config['pose_estimation_enabled'] = True
+                print("✅ Pose estimation model loaded successfully")
+            except Exception as e:
+                print(f"⚠️ Could not load pose model: {e}")
+                self.drowning_config['pose_estimation_enabled'] = False
+
+        if warmup:
+            report = self.warmup()
+            print(f"🔥 Warm-up: {report['warmup_s']:.2f}s, steady-state "
+                  f"{report['steady_ms'][1]:.1f} ms/frame (first call {report['first_ms'][1]:.0f} ms)")
+
+    def warmup(self, frame_size: Tuple[int, int] = (1280, 720), batch_sizes: Sequence[int] = (1,),
+               runs: int = 3) -> Dict:
+        """Run inference on synthetic frames so real frames skip the lazy initialization.
+
+        The first predict() of a model builds and fuses the graph and grows the
+        allocators, which delays the first alerts after a restart. Each batch size
+        is warmed up at the configured input size (and, with adaptive resolution,
+        at every size the controller may pick), with frames of `frame_size` (w, h)
+        so the letterboxed tensor shape matches the stream. Every other input the
+        config can reach is run once: a tile batch, a track crop at
+        'track_crop_imgsz', the pose model on whole frames or, when risk-gated, on
+        a crop at 'pose_crop_imgsz'.
+
+        Args:
+            frame_size: Camera resolution as (width, height).
+            batch_sizes: Batch sizes to prepare, e.g. (1, 4) when predict_batch
+                serves four cameras.
+            runs: Inferences per batch size; all but the first give the steady state.
+
+        Returns:
+            Report with 'warmup_s' (total seconds), 'sizes' and 'pose_sizes' (input
+            sizes warmed up) and, per batch size at the configured input size,
+            'first_ms' and 'steady_ms' (median of the later runs) in milliseconds
+            per call.
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+
+        width, height = frame_size
+        frame = np.random.default_rng(0).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        imgsz = self.drowning_config['imgsz']
+        sizes = [imgsz]
+        if self._adaptive_resolution():
+            sizes += [size for size in self.drowning_config['resolution_sizes'] if size != imgsz]
+        whole_frame_pose = self._whole_frame_pose()
+        report = {'warmup_s': 0.0, 'sizes': list(sizes), 'pose_sizes': list(sizes) if whole_frame_pose else [],
+                  'first_ms': {}, 'steady_ms': {}}
+        start = time.perf_counter()
+        for size in sizes:
+            for batch_size in batch_sizes:
+                source = frame if batch_size == 1 else [frame] * batch_size
+                times = []
+                for _ in range(max(2, runs) if size == imgsz else 1):
+                    t0 = time.perf_counter()
+                    self.model.predict(source=source, **self._detector_args(size))
+                    if whole_frame_pose:
+                        self.pose_model.predict(source=source, **self._pose_args(size))
+                    times.append((time.perf_counter() - t0) * 1000)
+                if size == imgsz:
+                    report['first_ms'][batch_size] = times[0]
+                    report['steady_ms'][batch_size] = float(np.median(times[1:]))
+
+        # Inputs of other shapes, once each: a tile batch and square track or pose crops
+        crop = np.ascontiguousarray(frame[:min(height, width), :min(height, width)])
+        if self.drowning_config['tiled_inference']:
+            tile = np.ascontiguousarray(frame[:min(height, imgsz), :min(width, imgsz)])
+            self.model.predict(source=[tile, frame], **self._detector_args(imgsz))
+        if self.drowning_config['track_crop_redetection']:
+            args = self._crop_args()
+            self.model.predict(source=[crop], **args)
+            report['sizes'].append(args['imgsz'])
+        if self._risk_gated_pose():
+            args = self._pose_crop_args()
+            self.pose_model.predict(source=[crop], **args)
+            report['pose_sizes'].append(args['imgsz'])
+        report['warmup_s'] = time.perf_counter() - start
+        return report
+
+    def _acquire_model(self, shared: bool, model_path: str, backend: str, imgsz: int,
+                       cache_dir: Optional[str], task: Optional[str] = None):
+        if shared:
+            return model_registry.acquire(model_path, backend, self.device, imgsz, cache_dir, task)
+        return load_yolo(model_path, backend, imgsz, cache_dir, task, self.device)
+
+    def close(self) -> None:
+        """Release the models; shared ones stay loaded while other detectors use them."""
+        for attribute in ('model', 'pose_model'):
+            model_registry.release(getattr(self, attribute, None))
+            setattr(self, attribute, None)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def load_pool_roi(self, path: str, camera_id: Optional[Hashable] = None) -> None:
+        """Use a fixed per-camera pool polygon (JSON/YAML) instead of automatic water detection.
+
+        Args:
+            path: ROI file, see src.water_detection.load_pool_roi_config for the format.
+            camera_id: Camera entry to use when the file defines several cameras; the
+                ROI is applied to the state of that camera.
+        """
+        self.camera(camera_id).water_detector.load_pool_roi(path, camera_id)
+
+    def predict_frame(self, frame, timestamp: Optional[float] = None,
+                      camera_id: Optional[Hashable] = None) -> Tuple[DetectionBatch, Optional[np.ndarray]]:
+        """Run inference on a single frame and return detections with environmental context.
+
+        Args:
+            frame: BGR image.
+            timestamp: Stream time of the frame in seconds. If None, the camera's
+                frame clock is advanced by one frame.
+            camera_id: Camera the frame comes from (None for single-stream use).
+
+        Returns:
+            Tuple of (detections, water_mask). Detections are a DetectionBatch;
+            iterating it yields dict-like rows.
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        state = self.camera(camera_id)
+        timestamp, run_detector = self._start_frame(state, timestamp)
+        if run_detector:
+            detections, water_mask = self._detect_frame(frame, state, timestamp)
+        else:
+            detections, items = self._track_crop_sources(frame, state, timestamp)
+            water_mask = state.water_detector.water_mask
+            if items:
+                results = self.model.predict(source=[image for image, _, _ in items], **self._crop_args())
+                detections = self._crop_detections(results, items, detections, state, timestamp)
+
+        # Crop poses of risky tracks, placed on this frame's detections
+        requests = self._crop_pose_requests(frame, state, timestamp, detections)
+        if requests:
+            self._store_crop_poses(state, timestamp, requests, self.pose_model.predict(
+                source=[image for _, _, image, _ in requests], **self._pose_crop_args()))
+        return detections, water_mask
+
+    def _detect_frame(self, frame: np.ndarray, state: CameraState, timestamp: float
+                      ) -> Tuple[DetectionBatch, Optional[np.ndarray]]:
+        """Full detector pass of predict_frame(): (detections, water_mask)."""
+        # Detect water areas for context
+        water_mask = None
+        if self.drowning_config['water_detection_enabled']:
+            water_mask = state.water_detector.detect_water_areas(frame)
+
+        # Run YOLO detection on the frame, the part that holds the pool, or its water tiles
+        items = self._inference_sources(frame, state)
+        imgsz = self._input_size(state)
+        t0 = time.perf_counter()
+        results = self.model.predict(source=[image for image, _, _ in items] if len(items) > 1 else items[0][0],
+                                     **self._detector_args(imgsz))
+        latency_ms = (time.perf_counter() - t0) * 1000  # detector only; the budget is for the detector run
+
+        # Run pose estimation if enabled
+        pose_results = None
+        if self._whole_frame_pose():
+            pose_results = self.pose_model.predict(source=self._pose_source(frame, items), **self._pose_args(imgsz))
+
+        if not results:
+            return DetectionBatch.empty(timestamp), water_mask
+        r, offset, keypoints = self._combine_results(results, items)
+        detections = self._build_detections(r, state, timestamp, offset, pose_results, keypoints)
+        self._update_resolution(state, latency_ms, detections, items[0][0].shape)
+        return detections, water_mask
+
+    def predict_batch(self, frames: Sequence[np.ndarray], camera_ids: Optional[Sequence[Hashable]] = None,
+                      timestamps: Optional[Sequence[Optional[float]]] = None
+                      ) -> Dict[Hashable, Tuple[DetectionBatch, Optional[np.ndarray]]]:
+        """Run inference on one frame from each of several cameras with batched model calls.
+
+        The detector (and pose model, if enabled) sees all frames that are due for
+        inference as one batch per input size; cameras only differ in size with
+        adaptive resolution. Each camera's resolution controller is charged its
+        share of the detector call, so the latency budget stays per camera.
+        Clocks, detection strides, water masks and tracks are kept per camera, so
+        the results can be passed to advanced_drowning_detection(..., camera_id=...).
+
+        Args:
+            frames: BGR images, at most one per camera.
+            camera_ids: Camera of each frame; defaults to the frame indices.
+            timestamps: Stream time of each frame in seconds (None entries tick the
+                camera's clock).
+
+        Returns:
+            Dict camera_id -> (DetectionBatch, water_mask), in input order.
+        """
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        camera_ids = list(range(len(frames))) if camera_ids is None else list(camera_ids)
+        timestamps = [None] * len(frames) if timestamps is None else list(timestamps)
+        if not len(camera_ids) == len(timestamps) == len(frames):
+            raise ValueError("frames, camera_ids and timestamps must have the same length")
+        if len(set(camera_ids)) != len(camera_ids):
+            raise ValueError("predict_batch takes at most one frame per camera")
+
+        outputs = {}
+        pending = []  # cameras whose frame goes through the model; a tiled camera has several inputs
+        cropped, crop_sources = [], []  # cameras between full-frame passes that re-detect their tracks in crops
+        started = []  # (frame, camera_id, state, timestamp) of every camera, in input order
+        for frame, camera_id, timestamp in zip(frames, camera_ids, timestamps):
+            state = self.camera(camera_id)
+            timestamp, run_detector = self._start_frame(state, timestamp)
+            started.append((frame, camera_id, state, timestamp))
+            if not run_detector:
+                predicted, items = self._track_crop_sources(frame, state, timestamp)
+                if items:
+                    cropped.append((camera_id, state, timestamp, predicted, items))
+                    crop_sources.extend(image for image, _, _ in items)
+                else:
+                    outputs[camera_id] = (predicted, state.water_detector.water_mask)
+                continue
+
+            water_mask = None
+            if self.drowning_config['water_detection_enabled']:
+                water_mask = state.water_detector.detect_water_areas(frame)
+            items = self._inference_sources(frame, state)
+            pending.append((camera_id, state, timestamp, water_mask, items, self._pose_source(frame, items)))
+
+        # One model call per input size, so no camera is letterboxed to a size it did not ask for
+        groups = {}
+        for entry in pending:
+            groups.setdefault(self._input_size(entry[1]), []).append(entry)
+        for imgsz, group in groups.items():
+            sources = [image for *_, items, _ in group for image, _, _ in items]
+            t0 = time.perf_counter()
+            results = self.model.predict(source=sources, **self._detector_args(imgsz))
+            latency_ms = (time.perf_counter() - t0) * 1000
+            pose_results = None
+            if self._whole_frame_pose():
+                pose_results = self.pose_model.predict(source=[pose_source for *_, pose_source in group],
+                                                       **self._pose_args(imgsz))
+            start = 0
+            for i, (camera_id, state, timestamp, water_mask, items, _) in enumerate(group):
+                r, offset, keypoints = self._combine_results(results[start:start + len(items)], items)
+                start += len(items)
+                poses = [pose_results[i]] if pose_results else None
+                detections = self._build_detections(r, state, timestamp, offset, poses, keypoints)
+                # The budget is per camera: charge each camera its share of the call
+                self._update_resolution(state, latency_ms * len(items) / len(sources), detections,
+                                        items[0][0].shape)
+                outputs[camera_id] = (detections, water_mask)
+
+        if crop_sources:
+            results = self.model.predict(source=crop_sources, **self._crop_args())
+            start = 0
+            for camera_id, state, timestamp, predicted, items in cropped:
+                detections = self._crop_detections(results[start:start + len(items)], items, predicted, state,
+                                                   timestamp)
+                start += len(items)
+                outputs[camera_id] = (detections, state.water_detector.water_mask)
+
+        # Crop poses of risky tracks after detection, as in predict_frame(); all cameras in one call
+        pose_requests = []  # (state, timestamp, requests) of cameras with tracks due for a crop pose
+        for frame, camera_id, state, timestamp in started:
+            requests = self._crop_pose_requests(frame, state, timestamp, outputs[camera_id][0])
+            if requests:
+                pose_requests.append((state, timestamp, requests))
+        if pose_requests:
+            results = self.pose_model.predict(source=[image for _, _, requests in pose_requests
+                                                      for _, _, image, _ in requests], **self._pose_crop_args())
+            start = 0
+            for state, timestamp, requests in pose_requests:
+                self._store_crop_poses(state, timestamp, requests, results[start:start + len(requests)])
+                start += len(requests)
+
+        return {camera_id: outputs[camera_id] for camera_id in camera_ids}
+
+    def _detector_args(self, imgsz: Optional[int] = None) -> Dict:
+        """Keyword arguments of the YOLO detector call (at `imgsz`, default the configured size)."""
+        args = {'imgsz': imgsz or self.drowning_config['imgsz'], 'conf': 0.25, 'verbose': False}
+        if self.drowning_config['person_only']:
+            # Filter inside the model call so NMS and post-processing never see other classes
+            classes = person_classes(self.model, self.drowning_config['person_class_id'])
+            if classes is not None:
+                args['classes'] = classes
+        return args
+
+    def _adaptive_resolution(self) -> bool:
+        # Exported models run at their compiled size; tiles are always imgsz
+        return (self.drowning_config['adaptive_resolution'] and not self.drowning_config['imgsz_fixed']
+                and not self.drowning_config['tiled_inference'])
+
+    def _resolution_controller(self, state: CameraState) -> Optional[ResolutionController]:
+        """The camera's adaptive resolution controller, or None if the input size is fixed."""
+        if not self._adaptive_resolution():
+            return None
+        if state.resolution is None:
+            budget = self.drowning_config['latency_budget_ms'] or \
+                1000.0 * max(1, self.drowning_config['detection_stride']) / state.clock.fps
+            state.resolution = ResolutionController(self.drowning_config['resolution_sizes'],
+                                                    self.drowning_config['imgsz'], budget)
+        return state.resolution
+
+    def _input_size(self, state: CameraState) -> int:
+        controller = self._resolution_controller(state)
+        return controller.imgsz if controller is not None else self.drowning_config['imgsz']
+
+    def _update_resolution(self, state: CameraState, latency_ms: float, detections: DetectionBatch,
+                           source_shape: Tuple[int, ...]) -> None:
+        controller = self._resolution_controller(state)
+        if controller is not None:
+            persons = detections.class_ids == self.drowning_config['person_class_id']
+            controller.update(latency_ms, detections.heights[persons], source_shape[:2])
+
+    def resolution_metrics(self, camera_id: Optional[Hashable] = None) -> Optional[Dict]:
+        """Adaptive resolution metrics of a camera (see ResolutionController.metrics), None if off."""
+        controller = self._resolution_controller(self.camera(camera_id))
+        return controller.metrics() if controller is not None else None
+
+    def _start_frame(self, state: CameraState, timestamp: Optional[float]) -> Tuple[float, bool]:
+        """Advance a camera by one frame; returns (timestamp, whether to run the detector).
+
+        Between strided inference frames the tracks are advanced by prediction instead.
+        """
+        if timestamp is None:
+            timestamp = state.clock.tick()
+        stride = self.drowning_config['detection_stride']
+        run_detector = stride <= 1 or state.frames_processed % stride == 0
+        state.frames_processed += 1
+        return timestamp, run_detector
+
+    def _pose_args(self, imgsz: Optional[int] = None) -> Dict:
+        """Keyword arguments of the pose model call."""
+        return {'imgsz': imgsz or self.drowning_config['imgsz'], 'conf': 0.3, 'verbose': False}
+
+    def _whole_frame_pose(self) -> bool:
+        return (self.analyzes_pose and self.drowning_config['pose_estimation_enabled']
+                and self.pose_model is not None and not self.drowning_config['pose_risk_gated'])
+
+    def _risk_gated_pose(self) -> bool:
+        return (self.analyzes_pose and self.drowning_config['pose_estimation_enabled']
+                and self.pose_model is not None and self.drowning_config['pose_risk_gated'])
+
+    def _pose_scheduler(self, state: CameraState) -> Optional[PoseScheduler]:
+        """The camera's crop pose schedule, or None unless pose is risk-gated."""
+        if not self._risk_gated_pose():
+            return None
+        if state.pose_scheduler is None:
+            state.pose_scheduler = PoseScheduler(self.drowning_config['pose_risk_threshold'],
+                                                 self.drowning_config['pose_interval'],
+                                                 self.drowning_config['pose_max_age'])
+        return state.pose_scheduler
+
+    def _pose_crop_args(self) -> Dict:
+        """Pose model call arguments for track crops (exported models keep their compiled size)."""
+        if self.drowning_config['imgsz_fixed']:
+            return self._pose_args()
+        return self._pose_args(self.drowning_config['pose_crop_imgsz'])
+
+    def _crop_pose_requests(self, frame: np.ndarray, state: CameraState, timestamp: float,
+                            detections: DetectionBatch) -> List[Tuple[int, np.ndarray, np.ndarray, Tuple[int, int]]]:
+        """(track id, centre, crop, crop offset) of every track due for a crop pose pass.
+
+        Runs after detection: a track is placed on the person detection of this
+        frame that overlaps its predicted box best (see 'track_crop_min_iou'), or
+        on the prediction when none does.
+        """
+        scheduler = self._pose_scheduler(state)
+        if scheduler is None:
+            return []
+        track_ids = scheduler.due(timestamp)
+        if not track_ids:
+            return []
+        predicted = state.person_tracker.predict_detections(timestamp)
+        rows = np.flatnonzero(np.isin(predicted.track_ids, track_ids))
+        boxes, centers = predicted.boxes[rows], predicted.centers[rows]
+        persons = np.flatnonzero(detections.class_ids == self.drowning_config['person_class_id'])
+        if len(rows) and len(persons):
+            iou = pairwise_iou(boxes, detections.boxes[persons])
+            best = iou.argmax(axis=1)
+            found = iou[np.arange(len(rows)), best] >= self.drowning_config['track_crop_min_iou']
+            boxes[found] = detections.boxes[persons[best[found]]]
+            centers[found] = detections.centers[persons[best[found]]]
+        crops = track_crops(boxes, frame.shape, self.drowning_config['pose_crop_scale'],
+                            self.drowning_config['track_crop_min_size'])
+        return [(int(predicted.track_ids[row]), center, np.ascontiguousarray(frame[y0:y1, x0:x1]), (x0, y0))
+                for row, center, (x0, y0, x1, y1) in zip(rows.tolist(), centers, crops.tolist())]
+
+    def _store_crop_poses(self, state: CameraState, timestamp: float, requests, pose_results) -> None:
+        """Give each requested track the skeleton of its crop closest to its centre."""
+        for (track_id, center, _, offset), r in zip(requests, pose_results):
+            skeletons = None
+            if getattr(r, 'keypoints', None) is not None and len(r.keypoints.data):
+                skeletons = self._keypoints_array(r.keypoints.data, offset)
+            skeleton = self._match_poses(skeletons, center[None])[0]
+            state.pose_scheduler.store(track_id, timestamp, self._pose_data(skeletons[skeleton]) if skeleton >= 0
+                                       else None)
+
+    def _build_detections(self, r, state: CameraState, timestamp: float, offset: Tuple[int, int] = (0, 0),
+                          pose_results=None, keypoints: Optional[np.ndarray] = None) -> DetectionBatch:
+        """Columnar detections with environmental context from one YOLO (and pose) result.
+
+        `keypoints` are those of an already merged (N, 6) result, in frame pixels.
+        """
+        x0, y0 = offset
+        boxes = self._result_boxes(r)
+        # keypoints: (N, K, 3), row-aligned with the boxes when the detector is a pose model
+        if keypoints is None and self.drowning_config['pose_as_detector'] and getattr(r, 'keypoints', None) is not None:
+            keypoints = self._keypoints_array(r.keypoints.data, offset)
+        names = model_class_names(self.model) if isinstance(r, np.ndarray) else getattr(r, 'names', None)
+        detections = DetectionBatch.from_yolo(boxes, timestamp, names)
+        if self.drowning_config['person_only']:
+            # Backends that ignore `classes` (some exported models) are filtered here
+            keep = detections.class_ids == self.drowning_config['person_class_id']
+            detections = detections.select(keep)
+            if keypoints is not None:
+                keypoints = keypoints[keep]
+        if x0 or y0:
+            detections.boxes[:, [0, 2]] += x0
+            detections.boxes[:, [1, 3]] += y0
+            detections.centers += (x0, y0)
+
+        # Environmental context for all detections at once (O(1) lookups per person)
+        detections.in_water = state.water_detector.points_in_water(detections.centers)
+        detections.distance_to_pool_edge = state.water_detector.distance_to_edge(detections.centers)
+        self._add_detection_context(detections)
+
+        # Add pose information if available
+        if keypoints is not None:
+            poses = [None] * len(detections)
+            for i in np.flatnonzero(detections.class_ids == 0).tolist():  # Person class
+                poses[i] = self._pose_data(keypoints[i])
+            detections.set_column('pose', poses)
+        elif pose_results:
+            persons = np.flatnonzero(detections.class_ids == 0)  # Person class
+            skeletons = None
+            if pose_results[0].keypoints:
+                skeletons = self._keypoints_array(pose_results[0].keypoints.data, offset)
+            poses = [None] * len(detections)
+            for i, skeleton in zip(persons.tolist(), self._match_poses(skeletons, detections.centers[persons])):
+                poses[i] = self._pose_data(skeletons[skeleton] if skeleton >= 0 else None)
+            detections.set_column('pose', poses)
+
+        return detections
+
+    def _add_detection_context(self, detections: DetectionBatch) -> None:
+        """Hook for detector-specific per-detection columns; visibility_score defaults to the confidence."""
+
+    def _inference_sources(self, frame: np.ndarray, state: CameraState
+                           ) -> List[Tuple[np.ndarray, Tuple[int, int], Optional[Tuple[int, int]]]]:
+        """Detector inputs for one frame as (image, (x, y) offset in the frame, tile shape).
+
+        A single image (the frame or its water crop, tile shape None), or with
+        'tiled_inference' the tiles of the camera's cached layout, plus the whole
+        frame if 'tile_full_frame' is set.
+        """
+        if not self.drowning_config['tiled_inference']:
+            x0, y0, source = self._inference_crop(frame, state.water_detector)
+            return [(source, (x0, y0), None)]
+        layout = self._tile_layout(frame, state)
+        items = [(tile, (x0, y0), tile.shape[:2])
+                 for tile, (x0, y0) in zip(layout.crops(frame), layout.tiles[:, :2].tolist())]
+        if self.drowning_config['tile_full_frame']:
+            items.append((frame, (0, 0), None))
+        return items
+
+    def _pose_source(self, frame: np.ndarray, items) -> np.ndarray:
+        """Pose model input: the detector's single input, or the whole frame when tiled
+        (keypoints are not merged across tiles)."""
+        return frame if self.drowning_config['tiled_inference'] else items[0][0]
+
+    def _tile_layout(self, frame: np.ndarray, state: CameraState) -> TileLayout:
+        """The camera's tiles over the padded water box, recomputed only when frame size or water box change."""
+        region, water_mask = None, None
+        if self.drowning_config['water_detection_enabled']:
+            region = state.water_detector.water_rect(self.drowning_config['water_roi_margin'])
+            water_mask = state.water_detector.water_mask
+        layout = state.tile_layout
+        if layout is None or not layout.matches(frame.shape, region, self.drowning_config['imgsz'],
+                                                self.drowning_config['tile_overlap']):
+            layout = TileLayout(frame.shape, region, self.drowning_config['imgsz'],
+                                self.drowning_config['tile_overlap'], water_mask)
+            state.tile_layout = layout
+        return layout
+
+    def _combine_results(self, results, items) -> Tuple:
+        """(result, offset, keypoints) for _build_detections from the results of one frame's inputs.
+
+        Tiled results are merged into an (N, 6) array in frame pixels (see _merge_results).
+        """
+        if len(items) == 1 and items[0][2] is None:
+            return results[0], items[0][1], None
+        merged, keypoints = self._merge_results(results, items)
+        return merged, (0, 0), keypoints
+
+    def _merge_results(self, results, items) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Tile or crop results merged into (N, 6) frame boxes, plus their (N, K, 3)
+        frame keypoints when the detector is a pose model (else None)."""
+        merged, rows = merge_tile_detections([self._result_boxes(r) for r in results],
+                                             [offset for _, offset, _ in items], [shape for _, _, shape in items],
+                                             self.drowning_config['tile_nms_iou'], return_index=True)
+        if not self.drowning_config['pose_as_detector']:
+            return merged, None
+        # Same order as the concatenated boxes; results without boxes add no rows
+        parts = [self._keypoints_array(r.keypoints.data, offset) for r, (_, offset, _) in zip(results, items)
+                 if getattr(r, 'keypoints', None) is not None and len(r.keypoints.data)]
+        if sum(map(len, parts)) != sum(len(self._result_boxes(r)) for r in results):
+            return merged, None
+        return merged, np.concatenate(parts)[rows] if parts else None
+
+    @staticmethod
+    def _result_boxes(r) -> np.ndarray:
+        """(N, 6) xyxy, score, class of a YOLO result (or an already merged array)."""
+        if isinstance(r, np.ndarray):
+            return r
+        return r.boxes.cpu().numpy().data if hasattr(r.boxes, 'data') else np.zeros((0, 6))
+
+    def _inference_crop(self, frame: np.ndarray, water_detector: WaterDetector) -> Tuple[int, int, np.ndarray]:
+        """Region of the frame to run YOLO on, as (x_offset, y_offset, image).
+
+        With 'water_roi_crop' enabled the frame is cropped to the padded bounding box
+        of the water mask, so the 640px input budget is spent on the pool instead of
+        deck and stands. Falls back to the full frame when there is no water mask or
+        the box covers most of the frame anyway.
+        """
+        if not (self.drowning_config['water_roi_crop'] and self.drowning_config['water_detection_enabled']):
+            return 0, 0, frame
+        rect = water_detector.water_rect(self.drowning_config['water_roi_margin'])
+        if rect is None:
+            return 0, 0, frame
+        x0, y0, x1, y1 = rect
+        if (x1 - x0) * (y1 - y0) > self.drowning_config['water_roi_max_fraction'] * frame.shape[0] * frame.shape[1]:
+            return 0, 0, frame
+        return x0, y0, np.ascontiguousarray(frame[y0:y1, x0:x1])
+
+    def _track_crop_sources(self, frame: np.ndarray, state: CameraState, timestamp: float
+                            ) -> Tuple[DetectionBatch, List[Tuple[np.ndarray, Tuple[int, int], Tuple[int, int]]]]:
+        """Kalman-predicted detections of a camera's tracks and the crops to re-detect them in.
+
+        The crops are (image, (x, y) offset, crop shape) like _inference_sources()
+        items; there are none unless 'track_crop_redetection' is on and the camera
+        has tracks.
+        """
+        predicted = self._predicted_detections(state, timestamp)
+        if not (self.drowning_config['track_crop_redetection'] and len(predicted)):
+            return predicted, []
+        crops = track_crops(predicted.boxes, frame.shape, self.drowning_config['track_crop_scale'],
+                            self.drowning_config['track_crop_min_size'])
+        return predicted, [(np.ascontiguousarray(frame[y0:y1, x0:x1]), (x0, y0), (y1 - y0, x1 - x0))
+                           for x0, y0, x1, y1 in crops.tolist()]
+
+    def _crop_args(self) -> Dict:
+        """Detector call arguments for track crops (exported models keep their compiled size)."""
+        if self.drowning_config['imgsz_fixed']:
+            return self._detector_args()
+        return self._detector_args(self.drowning_config['track_crop_imgsz'])
+
+    def _crop_detections(self, results, items, predicted: DetectionBatch, state: CameraState,
+                         timestamp: float) -> DetectionBatch:
+        """Detections re-found in the track crops, plus the predictions of tracks no crop found.
+
+        Boxes of people seen in several overlapping crops are merged like tile seams.
+        """
+        merged, keypoints = self._merge_results(results, items)
+        detections = self._build_detections(merged, state, timestamp, keypoints=keypoints)
+        persons = detections.boxes[detections.class_ids == self.drowning_config['person_class_id']]
+        found = np.zeros(len(predicted), dtype=bool)
+        if len(persons):
+            found = pairwise_iou(predicted.boxes, persons).max(axis=1) >= self.drowning_config['track_crop_min_iou']
+        return DetectionBatch.concatenate([detections, predicted.select(~found)])
+
+    def _predicted_detections(self, state: CameraState, timestamp: float) -> DetectionBatch:
+        """Kalman-predicted detections for all tracks of a camera, with refreshed water context."""
+        detections = state.person_tracker.predict_detections(timestamp)
+        detections.in_water = state.water_detector.points_in_water(detections.centers)
+        detections.distance_to_pool_edge = state.water_detector.distance_to_edge(detections.centers)
+        return detections
+
+    def _calculate_pool_distance(self, center_point: Tuple[float, float]) -> float:
+        """Calculate distance from person to pool edge."""
+        return float(self.water_detector.distance_to_edge([center_point])[0])
+
+    def _match_poses(self, skeletons: Optional[np.ndarray], centers: np.ndarray) -> np.ndarray:
+        """Index of the skeleton assigned to each detection centre, -1 where none.
+
+        Skeleton centres (mean of the keypoints with confidence > 0.3) are computed
+        for the whole frame at once and matched to the detections with one global
+        assignment, so every person gets at most one skeleton and vice versa.
+        """
+        assigned = np.full(len(centers), -1, dtype=np.int64)
+        if skeletons is None or len(skeletons) == 0 or len(centers) == 0:
+            return assigned
+        if skeletons.shape[1] < 17:  # Standard COCO pose format
+            return assigned
+
+        visible = skeletons[:, :, 2] > 0.3
+        counts = visible.sum(axis=1)
+        usable = np.flatnonzero(counts > 0)
+        pose_centers = (np.einsum('nk,nkc->nc', visible[usable], skeletons[usable, :, :2], dtype=np.float64)
+                        / counts[usable, None])
+
+        matches, _, _ = match_detections(pose_centers, np.asarray(centers, dtype=np.float64),
+                                         max_distance=self.drowning_config['pose_match_distance'],
+                                         use_spatial_index=(len(usable) * len(centers) >=
+                                                            self.person_tracker.spatial_index_min_pairs))
+        for pose, detection in matches:
+            assigned[detection] = usable[pose]
+        return assigned
+
+    def _keypoints_array(self, keypoints_data, offset: Tuple[int, int] = (0, 0)) -> np.ndarray:
+        """Keypoints (tensor or array) as a float32 (N, K, 3) array in full-frame coordinates."""
+        if hasattr(keypoints_data, 'cpu'):
+            keypoints_data = keypoints_data.cpu().numpy()
+        keypoints = np.array(keypoints_data, dtype=np.float32).reshape(len(keypoints_data), -1, 3)
+        keypoints[..., 0] += offset[0]
+        keypoints[..., 1] += offset[1]
+        return keypoints
+
+    def _pose_data(self, keypoints: Optional[np.ndarray]) -> Dict:
+        """Pose entry of a detection from its (K, 3) keypoints, or the defaults if None."""
+        pose_data = {
+            "keypoints": [],
+            "pose_confidence": 0.0,
+            "head_above_water": True,
+            "body_orientation": "vertical",  # vertical, horizontal, unknown
+            "arm_position": "normal",        # normal, raised, struggling
+            "stability_score": 1.0
+        }
+        if keypoints is None:
+            return pose_data
+
+        pose_data["keypoints"] = keypoints.tolist()
+        pose_data["pose_confidence"] = float(np.mean(keypoints[:, 2]))
+
+        # Analyze body orientation
+        pose_data.update(self._analyze_body_orientation(keypoints))
+        return pose_data
+
+    def _analyze_body_orientation(self, keypoints: np.ndarray) -> Dict:
+        """Analyze body orientation from pose keypoints."""
+        analysis = {
+            "head_above_water": True,
+            "body_orientation": "vertical",
+            "arm_position": "normal",
+            "stability_score": 1.0
+        }
+
+        # Key point indices (COCO format)
+        nose_idx, left_shoulder_idx, right_shoulder_idx = 0, 5, 6
+        left_hip_idx, right_hip_idx = 11, 12
+        left_wrist_idx, right_wrist_idx = 9, 10
+
+        try:
+            # Check if key points are visible
+            if (keypoints[nose_idx, 2] > 0.3 and
+                keypoints[left_shoulder_idx, 2] > 0.3 and
+                keypoints[right_shoulder_idx, 2] > 0.3):
+
+                # Calculate body orientation
+                shoulder_line = keypoints[right_shoulder_idx, :2] - keypoints[left_shoulder_idx, :2]
+                shoulder_angle = np.arctan2(shoulder_line[1], shoulder_line[0]) * 180 / np.pi
+
+                if abs(shoulder_angle) > 45:  # More horizontal than vertical
+                    analysis["body_orientation"] = "horizontal"
+                    analysis["stability_score"] *= 0.5  # Horizontal position is concerning
+
+                # Check arm positions (struggling indicator)
+                if (keypoints[left_wrist_idx, 2] > 0.3 and keypoints[right_wrist_idx, 2] > 0.3):
+                    left_arm_y = keypoints[left_wrist_idx, 1]
+                    right_arm_y = keypoints[right_wrist_idx, 1]
+                    shoulder_y = (keypoints[left_shoulder_idx, 1] + keypoints[right_shoulder_idx, 1]) / 2
+
+                    if left_arm_y < shoulder_y - 20 or right_arm_y < shoulder_y - 20:
+                        analysis["arm_position"] = "raised"
+                        analysis["stability_score"] *= 0.7  # Raised arms can indicate distress
+
+                # Head position analysis
+                nose_y = keypoints[nose_idx, 1]
+                if keypoints[left_shoulder_idx, 2] > 0.3:
+                    shoulder_y = keypoints[left_shoulder_idx, 1]
+                    if nose_y > shoulder_y + 10:  # Head below shoulders
+                        analysis["head_above_water"] = False
+                        analysis["stability_score"] *= 0.3
+
+        except (IndexError, TypeError):
+            pass  # Use default values if pose analysis fails
+
+        return analysis
+
+    def _risk_level(self, risk_score: float) -> str:
+        """'critical', 'high', 'medium' or 'low' for a (0-1) risk score."""
+        if risk_score >= self.drowning_config['critical_risk_threshold']:
+            return 'critical'
+        if risk_score >= self.drowning_config['high_risk_threshold']:
+            return 'high'
+        if risk_score >= self.drowning_config['medium_risk_threshold']:
+            return 'medium'
+        return 'low'
@@ -2,16 +2,16 @@
 Advanced wrapper around Ultralytics YOLO for person detection with comprehensive
 drowning detection algorithms including pose estimation and environmental analysis.
 """
-from typing import Optional, List, Dict, Tuple, Union
+from typing import Optional, List, Dict, Union, Hashable, Sequence
 import numpy as np
-import time
-import cv2
-from scipy import ndimage
-from collections import defaultdict, deque
-import math
 
+from src.detections import DetectionBatch
+from src.detector_base import DetectorBase
+from src.risk_scoring import TrackWindows, masked_mean_std, trend
+from src.tracking import Track
 
-class PersonTracker:
+
+class DrowningDetector(DetectorBase):
     def __init__(self, device: Optional[str] = None, fps: float = 25.0):
         """Create detector object. Model is not loaded until load_model() is called.
 
@@ -19,24 +19,16 @@ class PersonTracker:
             device: torch device string, e.g. 'cpu' or 'cuda:0'. If None, let ultralytics pick.
             fps: Expected frames per second of the video stream for temporal analysis.
         """
-        self.model = None
-        self.pose_model = None
-        self.device = device
-        self.fps = fps
-        
-        # Advanced tracking and detection components
-        self.person_tracker = PersonTracker()
-        self.water_detector = WaterDetector()
+        super().__init__(device, fps)
         
         # Detection history for temporal analysis
         self.detection_history = []
         self.max_history_frames = int(fps * 15)  # Keep 15 seconds of history
         
         # Enhanced drowning detection parameters
-        self.drowning_config = {
+        self.drowning_config.update({
             # Basic detection
             'min_detection_confidence': 0.4,
-            'person_class_id': 0,
             
             # Movement thresholds
             'vertical_movement_threshold': 3.0,      # pixels per frame
@@ -55,8 +47,6 @@ class PersonTracker:
             'normal_person_ratio': 2.0,              # normal height/width ratio
             
             # Advanced features
-            'water_detection_enabled': True,
-            'pose_estimation_enabled': False,        # Will enable when pose model is loaded
             'multi_person_tracking': True,
             
             # Alert thresholds
@@ -67,539 +57,55 @@ class PersonTracker:
             # Environmental factors
             'pool_edge_safety_margin': 20,           # pixels from pool edge
             'minimum_person_size': 400,              # minimum bbox area for valid detection
-        }mport Optional, List, Dict, Tuple, Union
-import numpy as np
-import time
-import cv2
-from scipy import ndimage
-from collections import defaultdict, deque
-import math
-
-
-class PersonTracker:
-    """Advanced person tracking for multi-person drowning detection."""
-    
-    def __init__(self, max_tracking_distance: float = 50.0, max_tracking_frames: int = 30):
-        self.tracks = {}  # track_id -> track_data
-        self.next_track_id = 1
-        self.max_tracking_distance = max_tracking_distance
-        self.max_tracking_frames = max_tracking_frames
-        
-    def update_tracks(self, detections: List[Dict]) -> Dict[int, Dict]:
-        """Update person tracks with new detections."""
-        current_time = time.time()
-        
-        # Remove old tracks
-        tracks_to_remove = []
-        for track_id, track_data in self.tracks.items():
-            if current_time - track_data['last_seen'] > self.max_tracking_frames / 25.0:  # Assume 25 FPS
-                tracks_to_remove.append(track_id)
-        
-        for track_id in tracks_to_remove:
-            del self.tracks[track_id]
-        
-        # Match detections to existing tracks
-        matched_tracks = set()
-        unmatched_detections = []
-        
-        for detection in detections:
-            if detection['class_id'] != 0:  # Only track persons
-                continue
-                
-            best_track_id = None
-            best_distance = float('inf')
-            
-            detection_center = np.array(detection['center'])
-            
-            for track_id, track_data in self.tracks.items():
-                if track_id in matched_tracks:
-                    continue
-                    
-                last_center = np.array(track_data['positions'][-1])
-                distance = np.linalg.norm(detection_center - last_center)
-                
-                if distance < self.max_tracking_distance and distance < best_distance:
-                    best_distance = distance
-                    best_track_id = track_id
-            
-            if best_track_id is not None:
-                # Update existing track
-                track_data = self.tracks[best_track_id]
-                track_data['positions'].append(detection['center'])
-                track_data['detections'].append(detection)
-                track_data['last_seen'] = current_time
-                track_data['velocities'] = self._calculate_velocities(track_data['positions'])
-                track_data['accelerations'] = self._calculate_accelerations(track_data['velocities'])
-                
-                # Keep only recent data
-                max_history = 50
-                if len(track_data['positions']) > max_history:
-                    track_data['positions'] = track_data['positions'][-max_history:]
-                    track_data['detections'] = track_data['detections'][-max_history:]
-                    
-                matched_tracks.add(best_track_id)
-            else:
-                unmatched_detections.append(detection)
-        
-        # Create new tracks for unmatched detections
-        for detection in unmatched_detections:
-            track_id = self.next_track_id
-            self.next_track_id += 1
-            
-            self.tracks[track_id] = {
-                'positions': deque([detection['center']], maxlen=50),
-                'detections': deque([detection], maxlen=50),
-                'velocities': deque(maxlen=49),
-                'accelerations': deque(maxlen=48),
-                'last_seen': current_time,
-                'created_at': current_time
-            }
-        
-        return self.tracks
-    
-    def _calculate_velocities(self, positions: deque) -> deque:
-        """Calculate velocities from position history."""
-        velocities = deque(maxlen=len(positions)-1)
-        for i in range(1, len(positions)):
-            pos_diff = np.array(positions[i]) - np.array(positions[i-1])
-            velocity = np.linalg.norm(pos_diff)
-            velocities.append(velocity)
-        return velocities
-    
-    def _calculate_accelerations(self, velocities: deque) -> deque:
-        """Calculate accelerations from velocity history."""
-        accelerations = deque(maxlen=len(velocities)-1)
-        for i in range(1, len(velocities)):
-            accel = velocities[i] - velocities[i-1]
-            accelerations.append(accel)
-        return accelerations
+        })
 
-
-class WaterDetector:
-    """Detect water areas in the frame for better context awareness."""
-    
-    def __init__(self):
-        self.water_mask = None
-        self.pool_boundaries = None
-        
-    def detect_water_areas(self, frame: np.ndarray) -> np.ndarray:
-        """Detect water/pool areas in the frame using color and texture analysis."""
-        # Convert to HSV for better water detection
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        
-        # Define water color ranges (blue/cyan tones)
-        # Lower blue range
-        lower_blue1 = np.array([100, 50, 50])
-        upper_blue1 = np.array([130, 255, 255])
-        
-        # Upper blue range (for different lighting)
-        lower_blue2 = np.array([80, 30, 30])
-        upper_blue2 = np.array([120, 200, 200])
-        
-        # Create masks for water detection
-        mask1 = cv2.inRange(hsv, lower_blue1, upper_blue1)
-        mask2 = cv2.inRange(hsv, lower_blue2, upper_blue2)
-        water_mask = cv2.bitwise_or(mask1, mask2)
-        
-        # Apply morphological operations to clean up the mask
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        water_mask = cv2.morphologyEx(water_mask, cv2.MORPH_CLOSE, kernel)
-        water_mask = cv2.morphologyEx(water_mask, cv2.MORPH_OPEN, kernel)
-        
-        # Find the largest connected component (likely the pool)
-        contours, _ = cv2.findContours(water_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if contours:
-            largest_contour = max(contours, key=cv2.contourArea)
-            if cv2.contourArea(largest_contour) > 1000:  # Minimum pool size
-                self.pool_boundaries = largest_contour
-                water_mask = np.zeros_like(water_mask)
-                cv2.fillPoly(water_mask, [largest_contour], 255)
-        
-        self.water_mask = water_mask
-        return water_mask
+    def _add_detection_context(self, detections: DetectionBatch) -> None:
+        detections.visibility_scores = self._calculate_visibility_scores(detections)
+        detections.set_column('bbox_stability', np.ones(len(detections)))  # Will be calculated in tracking
     
-    def is_in_water(self, center_point: Tuple[float, float]) -> bool:
-        """Check if a point is within the detected water area."""
-        if self.water_mask is None:
-            return True  # Assume in water if no detection
-            
-        x, y = int(center_point[0]), int(center_point[1])
-        if 0 <= x < self.water_mask.shape[1] and 0 <= y < self.water_mask.shape[0]:
-            return self.water_mask[y, x] > 0
-        return False
-    def __init__(self, device: Optional[str] = None, fps: float = 25.0):
-        """Create detector object. Model is not loaded until load_model() is called.
-
-        Args:
-            device: torch device string, e.g. 'cpu' or 'cuda:0'. If None, let ultralytics pick.
-            fps: Expected frames per second of the video stream for temporal analysis.
-        """
-        self.model = None
-        self.device = device
-        self.fps = fps
-        
-        # Detection history for temporal analysis
-        self.detection_history = []
-        self.max_history_frames = int(fps * 10)  # Keep 10 seconds of history
-        
-        # Drowning detection parameters
-        self.drowning_config = {
-            'min_detection_confidence': 0.5,
-            'person_class_id': 0,  # COCO class ID for person
-            'vertical_movement_threshold': 5.0,  # pixels per frame
-            'horizontal_movement_threshold': 10.0,
-            'struggling_motion_variance': 15.0,
-            'immobile_time_threshold': 3.0,  # seconds
-            'rapid_sinking_threshold': 20.0,  # pixels per frame downward
-            'aspect_ratio_threshold': 0.3,  # width/height ratio indicating horizontal position
-        }
-
-    def load_model(self, model_path: str = "yolov8n.pt", enable_pose: bool = False) -> None:
-        """Load a YOLO model from a local path or one of the Ultralytics short names.
-        This call may download the model if not present locally.
-        
-        Args:
-            model_path: Path to YOLO model or ultralytics model name
-            enable_pose: Whether to also load pose estimation model
-        """
-        try:
-            from ultralytics import YOLO
-        except Exception as e:
-            raise RuntimeError("ultralytics package is required. Install with pip install ultralytics") from e
-
-        self.model = YOLO(model_path)
-        if self.device:
-            try:
-                self.model.to(self.device)
-            except Exception:
-                # ultralytics will usually handle device selection; ignore on failure
-                pass
-        
-        # Load pose estimation model if requested
-        if enable_pose:
-            try:
-                self.pose_model = YOLO('yolov8n-pose.pt')
-                if self.device:
-                    self.pose_model.to(self.device)
-                self.drowning_config['pose_estimation_enabled'] = True
-                print("✅ Pose estimation model loaded successfully")
-            except Exception as e:
-                print(f"⚠️ Could not load pose model: {e}")
-                self.drowning_config['pose_estimation_enabled'] = False
-
-    def predict_frame(self, frame) -> Tuple[List[Dict], np.ndarray]:
-        """Run inference on a single frame and return detections with environmental context.
-
-        Returns:
-            Tuple of (detections_list, water_mask)
-        """
-        if self.model is None:
-            raise RuntimeError("Model not loaded. Call load_model() first.")
-
-        # Detect water areas for context
-        water_mask = None
-        if self.drowning_config['water_detection_enabled']:
-            water_mask = self.water_detector.detect_water_areas(frame)
-
-        # Run YOLO detection
-        results = self.model.predict(source=frame, imgsz=640, conf=0.25, verbose=False)
-        
-        # Run pose estimation if enabled
-        pose_results = None
-        if self.drowning_config['pose_estimation_enabled'] and self.pose_model:
-            pose_results = self.pose_model.predict(source=frame, imgsz=640, conf=0.3, verbose=False)
-
-        if not results:
-            return [], water_mask
-            
-        r = results[0]
-        detections = []
-        
-        for det in r.boxes.data.tolist() if hasattr(r.boxes, 'data') else []:
-            xmin, ymin, xmax, ymax, score, cls = det[:6]
-            
-            # Enhanced detection data
-            detection = {
-                "class_id": int(cls),
-                "name": r.names[int(cls)] if hasattr(r, 'names') else str(int(cls)),
-                "confidence": float(score),
-                "bbox": [float(xmin), float(ymin), float(xmax), float(ymax)],
-                "timestamp": time.time(),
-                "center": [(xmin + xmax) / 2, (ymin + ymax) / 2],
-                "width": xmax - xmin,
-                "height": ymax - ymin,
-                "area": (xmax - xmin) * (ymax - ymin),
-                "aspect_ratio": (xmax - xmin) / (ymax - ymin) if (ymax - ymin) > 0 else 0,
-                
-                # Environmental context
-                "in_water": self.water_detector.is_in_water([(xmin + xmax) / 2, (ymin + ymax) / 2]),
-                "distance_to_pool_edge": self._calculate_pool_distance([(xmin + xmax) / 2, (ymin + ymax) / 2]),
-                
-                # Additional metrics
-                "bbox_stability": 1.0,  # Will be calculated in tracking
-                "visibility_score": self._calculate_visibility_score(detection),
-            }
-            
-            # Add pose information if available
-            if pose_results and detection['class_id'] == 0:  # Person class
-                pose_data = self._extract_pose_data(pose_results, detection)
-                detection["pose"] = pose_data
-            
-            detections.append(detection)
-        
-        return detections, water_mask
-    
-    def _calculate_pool_distance(self, center_point: Tuple[float, float]) -> float:
-        """Calculate distance from person to pool edge."""
-        if self.water_detector.pool_boundaries is None:
-            return 0.0
-            
-        point = np.array([[center_point[0], center_point[1]]], dtype=np.float32)
-        distance = cv2.pointPolygonTest(self.water_detector.pool_boundaries, 
-                                      (center_point[0], center_point[1]), True)
-        return abs(distance)
-    
-    def _calculate_visibility_score(self, detection: Dict) -> float:
-        """Calculate how visible/clear the person detection is."""
+    def _calculate_visibility_scores(self, detections: DetectionBatch) -> np.ndarray:
+        """Calculate how visible/clear each person detection is."""
         # Based on confidence, size, and aspect ratio
-        conf_score = detection['confidence']
+        conf_score = detections.confidences
         
         # Size factor (larger detections are generally more reliable)
-        area = detection['area']
-        size_score = min(area / 10000, 1.0)  # Normalize to reasonable person size
+        size_score = np.minimum(detections.areas / 10000, 1.0)  # Normalize to reasonable person size
         
         # Aspect ratio factor (normal person ratios are more reliable)
-        aspect_ratio = detection['aspect_ratio']
+        aspect_ratio = detections.aspect_ratios
         normal_ratio_range = (0.3, 0.8)  # Typical person aspect ratios
-        if normal_ratio_range[0] <= aspect_ratio <= normal_ratio_range[1]:
-            ratio_score = 1.0
-        else:
-            ratio_score = max(0.3, 1.0 - abs(aspect_ratio - 0.5) * 2)
+        ratio_score = np.where((aspect_ratio >= normal_ratio_range[0]) & (aspect_ratio <= normal_ratio_range[1]),
+                               1.0, np.maximum(0.3, 1.0 - np.abs(aspect_ratio - 0.5) * 2))
         
-        return (conf_score * 0.5 + size_score * 0.3 + ratio_score * 0.2)
-    
-    def _extract_pose_data(self, pose_results, detection: Dict) -> Dict:
-        """Extract pose keypoints and analyze body position."""
-        pose_data = {
-            "keypoints": [],
-            "pose_confidence": 0.0,
-            "head_above_water": True,
-            "body_orientation": "vertical",  # vertical, horizontal, unknown
-            "arm_position": "normal",        # normal, raised, struggling
-            "stability_score": 1.0
-        }
-        
-        if not pose_results or not pose_results[0].keypoints:
-            return pose_data
-            
-        # Find pose data that corresponds to this detection
-        det_center = np.array(detection['center'])
-        
-        for pose_result in pose_results[0].keypoints.data:
-            if len(pose_result) >= 17:  # Standard COCO pose format
-                # Calculate pose center from keypoints
-                visible_points = pose_result[pose_result[:, 2] > 0.3]  # confidence > 0.3
-                if len(visible_points) > 0:
-                    pose_center = np.mean(visible_points[:, :2], axis=0)
-                    distance = np.linalg.norm(det_center - pose_center)
-                    
-                    if distance < 50:  # Match pose to detection
-                        pose_data["keypoints"] = pose_result.tolist()
-                        pose_data["pose_confidence"] = float(np.mean(pose_result[:, 2]))
-                        
-                        # Analyze body orientation
-                        pose_data.update(self._analyze_body_orientation(pose_result))
-                        break
-        
-        return pose_data
+        return conf_score * 0.5 + size_score * 0.3 + ratio_score * 0.2
     
-    def _analyze_body_orientation(self, keypoints: np.ndarray) -> Dict:
-        """Analyze body orientation from pose keypoints."""
-        analysis = {
-            "head_above_water": True,
-            "body_orientation": "vertical",
-            "arm_position": "normal",
-            "stability_score": 1.0
-        }
-        
-        # Key point indices (COCO format)
-        nose_idx, left_shoulder_idx, right_shoulder_idx = 0, 5, 6
-        left_hip_idx, right_hip_idx = 11, 12
-        left_wrist_idx, right_wrist_idx = 9, 10
-        
-        try:
-            # Check if key points are visible
-            if (keypoints[nose_idx, 2] > 0.3 and 
-                keypoints[left_shoulder_idx, 2] > 0.3 and 
-                keypoints[right_shoulder_idx, 2] > 0.3):
-                
-                # Calculate body orientation
-                shoulder_line = keypoints[right_shoulder_idx, :2] - keypoints[left_shoulder_idx, :2]
-                shoulder_angle = np.arctan2(shoulder_line[1], shoulder_line[0]) * 180 / np.pi
-                
-                if abs(shoulder_angle) > 45:  # More horizontal than vertical
-                    analysis["body_orientation"] = "horizontal"
-                    analysis["stability_score"] *= 0.5  # Horizontal position is concerning
-                
-                # Check arm positions (struggling indicator)
-                if (keypoints[left_wrist_idx, 2] > 0.3 and keypoints[right_wrist_idx, 2] > 0.3):
-                    left_arm_y = keypoints[left_wrist_idx, 1]
-                    right_arm_y = keypoints[right_wrist_idx, 1]
-                    shoulder_y = (keypoints[left_shoulder_idx, 1] + keypoints[right_shoulder_idx, 1]) / 2
-                    
-                    if left_arm_y < shoulder_y - 20 or right_arm_y < shoulder_y - 20:
-                        analysis["arm_position"] = "raised"
-                        analysis["stability_score"] *= 0.7  # Raised arms can indicate distress
-                
-                # Head position analysis
-                nose_y = keypoints[nose_idx, 1]
-                if keypoints[left_shoulder_idx, 2] > 0.3:
-                    shoulder_y = keypoints[left_shoulder_idx, 1]
-                    if nose_y > shoulder_y + 10:  # Head below shoulders
-                        analysis["head_above_water"] = False
-                        analysis["stability_score"] *= 0.3
-                        
-        except (IndexError, TypeError):
-            pass  # Use default values if pose analysis fails
-            
-        return analysis
-
-    def update_detection_history(self, detections: List[Dict]) -> None:
-        """Update the detection history with current frame detections."""
-        # Filter for person detections with sufficient confidence
-        person_detections = [
-            d for d in detections 
-            if d['class_id'] == self.drowning_config['person_class_id'] 
-            and d['confidence'] >= self.drowning_config['min_detection_confidence']
-        ]
-        
-        frame_data = {
-            'timestamp': time.time(),
-            'detections': person_detections,
-            'person_count': len(person_detections)
-        }
-        
-        self.detection_history.append(frame_data)
-        
-        # Maintain history size
-        if len(self.detection_history) > self.max_history_frames:
-            self.detection_history.pop(0)
-
-    def track_person_movement(self, current_detection: Dict) -> Dict:
-        """Track movement patterns of a person across frames."""
-        movement_data = {
-            'vertical_velocity': 0.0,
-            'horizontal_velocity': 0.0,
-            'acceleration': 0.0,
-            'movement_variance': 0.0,
-            'is_struggling': False,
-            'is_sinking': False,
-            'is_immobile': False
-        }
-        
-        if len(self.detection_history) < 3:
-            return movement_data
-            
-        # Find similar detections in recent history for tracking
-        recent_frames = self.detection_history[-10:]  # Last 10 frames
-        current_center = current_detection['center']
-        
-        # Find closest detection in previous frames (simple tracking)
-        tracked_positions = []
-        for frame in recent_frames:
-            if frame['detections']:
-                closest_detection = min(
-                    frame['detections'],
-                    key=lambda d: np.sqrt(
-                        (d['center'][0] - current_center[0])**2 + 
-                        (d['center'][1] - current_center[1])**2
-                    )
-                )
-                distance = np.sqrt(
-                    (closest_detection['center'][0] - current_center[0])**2 + 
-                    (closest_detection['center'][1] - current_center[1])**2
-                )
-                if distance < 100:  # Only track if reasonably close
-                    tracked_positions.append({
-                        'center': closest_detection['center'],
-                        'timestamp': frame['timestamp'],
-                        'bbox': closest_detection['bbox']
-                    })
-        
-        if len(tracked_positions) >= 2:
-            # Calculate velocities
-            positions = np.array([pos['center'] for pos in tracked_positions])
-            times = np.array([pos['timestamp'] for pos in tracked_positions])
-            
-            # Vertical movement (positive = downward)
-            vertical_positions = positions[:, 1]
-            if len(vertical_positions) > 1:
-                vertical_diff = np.diff(vertical_positions)
-                time_diff = np.diff(times)
-                vertical_velocities = vertical_diff / time_diff
-                movement_data['vertical_velocity'] = np.mean(vertical_velocities)
-                
-                # Horizontal movement
-                horizontal_positions = positions[:, 0]
-                horizontal_diff = np.diff(horizontal_positions)
-                horizontal_velocities = horizontal_diff / time_diff
-                movement_data['horizontal_velocity'] = np.mean(horizontal_velocities)
-                
-                # Movement variance (indicates struggling)
-                movement_data['movement_variance'] = np.var(vertical_velocities) + np.var(horizontal_velocities)
-                
-                # Detection flags
-                movement_data['is_sinking'] = movement_data['vertical_velocity'] > self.drowning_config['rapid_sinking_threshold']
-                movement_data['is_struggling'] = movement_data['movement_variance'] > self.drowning_config['struggling_motion_variance']
-                movement_data['is_immobile'] = (
-                    abs(movement_data['vertical_velocity']) < self.drowning_config['vertical_movement_threshold'] and
-                    abs(movement_data['horizontal_velocity']) < self.drowning_config['horizontal_movement_threshold']
-                )
-        
-        return movement_data
-
-    def detect_body_position(self, detection: Dict) -> Dict:
-        """Analyze body position from bounding box characteristics."""
-        position_data = {
-            'is_horizontal': False,
-            'is_partially_submerged': False,
-            'body_position_score': 0.0
-        }
-        
-        # Horizontal position indicator (drowning persons often float horizontally)
-        aspect_ratio = detection['aspect_ratio']
-        position_data['is_horizontal'] = aspect_ratio < self.drowning_config['aspect_ratio_threshold']
-        
-        # Estimate submersion based on bbox height relative to normal standing person
-        # This is a rough heuristic - in real scenarios you'd need water level detection
-        normal_height_ratio = 1.5  # Typical standing person aspect ratio
-        current_height_ratio = detection['height'] / detection['width']
-        
-        if current_height_ratio < normal_height_ratio * 0.6:
-            position_data['is_partially_submerged'] = True
-            
-        # Calculate overall body position score (0 = normal, 1 = high drowning risk)
-        score = 0.0
-        if position_data['is_horizontal']:
-            score += 0.4
-        if position_data['is_partially_submerged']:
-            score += 0.3
-        if detection['confidence'] < 0.7:  # Lower confidence might indicate partial occlusion
-            score += 0.2
-            
-        position_data['body_position_score'] = min(score, 1.0)
-        
-        return position_data
-
-    def advanced_drowning_detection(self, current_detections: List[Dict], water_mask: np.ndarray = None) -> Dict:
+    def advanced_drowning_detection(self, current_detections: Union[DetectionBatch, List[Dict]], water_mask: np.ndarray = None,
+                                    timestamp: Optional[float] = None,
+                                    camera_id: Optional[Hashable] = None) -> Dict:
         """
         State-of-the-art drowning detection using multiple AI techniques.
         
+        Args:
+            current_detections: Detections of the current frame from predict_frame()
+                (a DetectionBatch, or a list of detection dicts).
+            water_mask: Water mask of the current frame, if available.
+            timestamp: Stream time of the frame in seconds. Defaults to the timestamp
+                of the detections, or one frame after the previous call.
+            camera_id: Camera the detections come from; each camera has its own tracks.
+        
         Returns:
             Comprehensive detection results with confidence scores and analysis
         """
+        current_detections = DetectionBatch.from_dicts(current_detections)
+        if timestamp is None:
+            timestamp = current_detections.timestamp
+        
         # Update tracking
-        tracks = self.person_tracker.update_tracks(current_detections)
+        state = self.camera(camera_id)
+        tracks = state.person_tracker.update_tracks(current_detections, timestamp)
+        pose_scheduler = self._pose_scheduler(state)
+        if pose_scheduler is not None:
+            pose_scheduler.prune(tracks)
         
         result = {
             'drowning_detected': False,
@@ -610,7 +116,7 @@ class WaterDetector:
             'environmental_context': {
                 'water_detected': water_mask is not None,
                 'pool_area': np.sum(water_mask > 0) if water_mask is not None else 0,
-                'total_persons': len([d for d in current_detections if d['class_id'] == 0])
+                'total_persons': int(np.count_nonzero(current_detections.class_ids == 0))
             },
             'tracking_info': {
                 'active_tracks': len(tracks),
@@ -623,16 +129,30 @@ class WaterDetector:
             return result
         
         # Analyze each tracked person
-        for track_id, track_data in tracks.items():
-            if len(track_data['detections']) == 0:
+        persons = []
+        for track_id, track in tracks.items():
+            if len(track) == 0:
                 continue
                 
-            current_detection = track_data['detections'][-1]
+            current_detection = track.detection
             if current_detection['class_id'] != 0:  # Only analyze persons
                 continue
             
-            person_analysis = self._analyze_person_comprehensive(track_data, track_id)
+            if pose_scheduler is not None:
+                # Risk-gated pose: the track's latest crop pose, while fresh
+                pose = pose_scheduler.pose(track_id, state.person_tracker.current_time)
+                if pose is not None or current_detection.get('pose') is not None:
+                    current_detection['pose'] = pose
+            persons.append((track_id, track))
+        
+        # Risk components of all persons in one vectorized pass
+        scores = self._score_tracks([track for _, track in persons]) if persons else None
+        for index, (track_id, track) in enumerate(persons):
+            person_analysis = self._scored_person_analysis(track, track_id, scores, index)
             result['person_analyses'].append(person_analysis)
+            if pose_scheduler is not None:
+                pose_scheduler.update_risk(track_id, max(person_analysis['movement_analysis'].get('risk_score', 0.0),
+                                                         person_analysis['position_analysis'].get('risk_score', 0.0)))
             
             # Update overall result based on highest risk person
             if person_analysis['risk_score'] > result['confidence']:
@@ -648,9 +168,9 @@ class WaterDetector:
         
         return result
     
-    def _analyze_person_comprehensive(self, track_data: Dict, track_id: int) -> Dict:
+    def _analyze_person_comprehensive(self, track: Track, track_id: int) -> Dict:
         """Comprehensive analysis of a single person's behavior."""
-        current_detection = track_data['detections'][-1]
+        current_detection = track.detection
         
         analysis = {
             'track_id': track_id,
@@ -666,15 +186,15 @@ class WaterDetector:
         }
         
         # 1. Movement Analysis (Enhanced)
-        movement = self._advanced_movement_analysis(track_data)
+        movement = self._advanced_movement_analysis(track)
         analysis['movement_analysis'] = movement
         
         # 2. Position Analysis (Enhanced)
-        position = self._advanced_position_analysis(current_detection, track_data)
+        position = self._advanced_position_analysis(current_detection, track)
         analysis['position_analysis'] = position
         
         # 3. Temporal Analysis (New)
-        temporal = self._temporal_pattern_analysis(track_data)
+        temporal = self._temporal_pattern_analysis(track)
         analysis['temporal_analysis'] = temporal
         
         # 4. Pose Analysis (New)
@@ -702,7 +222,146 @@ class WaterDetector:
         
         return analysis
     
-    def _advanced_movement_analysis(self, track_data: Dict) -> Dict:
+    def _score_tracks(self, track_list: Sequence[Track]) -> Dict[str, np.ndarray]:
+        """Movement, position, temporal and environmental risk of many person tracks at once.
+
+        Vectorized over TrackWindows; gives the same values as running
+        _advanced_movement_analysis(), _advanced_position_analysis(),
+        _temporal_pattern_analysis() and _environmental_context_analysis() per track
+        (trends up to rounding, see risk_scoring.trend).
+        """
+        config = self.drowning_config
+        windows = TrackWindows.from_tracks(track_list)
+        lengths = windows.lengths
+        rows = np.arange(len(windows))
+        last = windows.history - 1
+        scores = {}
+
+        # Movement: velocity spread, sinking trend of the last 5 positions, immobility
+        moving = lengths >= 3
+        velocity_mean, velocity_std = masked_mean_std(windows.velocities, windows.newest(windows.history, offset=1))
+        scores['movement_consistency'] = np.where(
+            moving, np.maximum(0.0, 1.0 - velocity_std / np.maximum(velocity_mean, 1.0)), 1.0)
+        scores['high_velocity_variance'] = moving & (velocity_std > config['struggling_motion_variance'])
+        vertical_trend = trend(windows.centers[:, -5:, 1])
+        scores['sinking_rate'] = np.where(lengths >= 5, np.maximum(0.0, vertical_trend), 0.0)
+        scores['rapid_sinking'] = (lengths >= 5) & (vertical_trend > config['rapid_sinking_threshold'])
+        recent = windows.newest(10, offset=1)
+        still = moving & np.all(~recent | (windows.velocities < config['vertical_movement_threshold']), axis=1)
+        first = np.clip(last - np.minimum(10, lengths - 1), 0, last)
+        scores['immobility_duration'] = np.where(
+            still, windows.timestamps[:, last] - windows.timestamps[rows, first], 0.0)
+        scores['prolonged_immobility'] = still & (scores['immobility_duration'] > config['immobile_time_threshold'])
+        risk = np.zeros(len(windows))
+        risk = np.where(scores['high_velocity_variance'], risk + 0.3, risk)
+        risk = np.where(scores['rapid_sinking'], risk + 0.4, risk)
+        scores['movement_risk'] = np.where(scores['prolonged_immobility'], risk + 0.35, risk)
+
+        # Position: orientation, size consistency of the last 5 boxes, confidence trend of the last 3
+        scores['horizontal_orientation'] = windows.aspect_ratio < config['aspect_ratio_threshold']
+        area_mean, area_std = masked_mean_std(windows.areas(), windows.newest(5))
+        scores['size_consistency'] = np.where(
+            lengths > 5, np.maximum(0.0, 1.0 - area_std / np.maximum(area_mean, 1.0)), 1.0)
+        scores['unstable_detection_size'] = (lengths > 5) & (scores['size_consistency'] < 0.5)
+        scores['decreasing_visibility'] = (lengths > 3) & (
+            trend(windows.confidences[:, -3:]) < -config['submersion_confidence_drop'])
+        risk = np.where(scores['horizontal_orientation'], 0.4, 0.0)
+        risk = np.where(scores['unstable_detection_size'], risk + 0.2, risk)
+        scores['position_risk'] = np.where(scores['decreasing_visibility'], risk + 0.3, risk)
+
+        # Temporal: stability and distress over the last 20 samples
+        temporal = lengths >= 10
+        window = windows.newest(20)
+        confidence_mean, confidence_std = masked_mean_std(windows.confidences, window)
+        y_mean, y_std = masked_mean_std(windows.centers[..., 1], window)
+        scores['consistency_score'] = np.where(
+            temporal, ((1.0 - confidence_std / np.maximum(confidence_mean, 0.1)) +
+                       (1.0 - y_std / np.maximum(y_mean, 1.0))) / 2, 1.0)
+        scores['erratic_behavior'] = temporal & (scores['consistency_score'] < 0.6)
+        distress_frames = np.count_nonzero(
+            window & ((windows.confidences < 0.5) | (windows.aspect_ratios() < config['aspect_ratio_threshold'])),
+            axis=1)
+        count = np.minimum(20, lengths)
+        frame_interval = ((windows.timestamps[:, last] - windows.timestamps[rows, windows.history - count])
+                          / np.maximum(count - 1, 1))
+        scores['distress_duration'] = np.where(temporal, distress_frames * frame_interval, 0.0)
+        scores['sustained_distress'] = temporal & (scores['distress_duration'] > config['distress_time_threshold'])
+        risk = np.where(scores['erratic_behavior'], 0.25, 0.0)
+        scores['temporal_risk'] = np.where(scores['sustained_distress'], risk + 0.3, risk)
+
+        # Environment: only people in the water are at risk
+        scores['in_water'] = windows.in_water
+        scores['near_pool_edge'] = windows.in_water & (windows.distance_to_pool_edge < config['pool_edge_safety_margin'])
+        scores['small_detection_size'] = windows.in_water & (windows.area < config['minimum_person_size'])
+        risk = np.where(scores['near_pool_edge'], 0.1, 0.0)
+        scores['environmental_risk'] = np.where(scores['small_detection_size'], risk + 0.2, risk)
+        return scores
+
+    def _scored_person_analysis(self, track: Track, track_id: int, scores: Dict[str, np.ndarray],
+                                index: int) -> Dict:
+        """_analyze_person_comprehensive() result of one track from its row of _score_tracks()."""
+        current_detection = track.detection
+
+        def flags(*names) -> List[str]:
+            return [name for name in names if scores[name][index]]
+
+        movement = {
+            'risk_score': float(scores['movement_risk'][index]),
+            'velocity_patterns': [],
+            'acceleration_patterns': [],
+            'movement_consistency': float(scores['movement_consistency'][index]),
+            'struggling_indicators': flags('high_velocity_variance', 'rapid_sinking', 'prolonged_immobility'),
+            'sinking_rate': float(scores['sinking_rate'][index]),
+            'immobility_duration': float(scores['immobility_duration'][index]),
+        }
+        position = {
+            'risk_score': float(scores['position_risk'][index]),
+            'orientation': 'horizontal' if scores['horizontal_orientation'][index] else 'vertical',
+            'submersion_indicators': flags('horizontal_orientation', 'unstable_detection_size',
+                                           'decreasing_visibility'),
+            'size_consistency': float(scores['size_consistency'][index]),
+            'visibility_trend': 1.0,
+        }
+        temporal = {
+            'risk_score': float(scores['temporal_risk'][index]),
+            'behavior_patterns': flags('erratic_behavior', 'sustained_distress'),
+            'consistency_score': float(scores['consistency_score'][index]),
+            'distress_duration': float(scores['distress_duration'][index]),
+        }
+        environmental = {
+            'risk_score': float(scores['environmental_risk'][index]),
+            'context_factors': flags('near_pool_edge', 'small_detection_size'),
+            'water_proximity': bool(scores['in_water'][index]),
+        }
+        pose = {}
+        if current_detection.get('pose') and self.drowning_config['pose_estimation_enabled']:
+            pose = self._pose_based_analysis(current_detection['pose'])
+
+        analysis = {
+            'track_id': track_id,
+            'detection': current_detection,
+            'risk_score': 0.0,
+            'risk_level': 'low',
+            'alerts': [],
+            'movement_analysis': movement,
+            'position_analysis': position,
+            'temporal_analysis': temporal,
+            'pose_analysis': pose,
+            'environmental_analysis': environmental,
+        }
+        # Same weighting (and summation order) as _analyze_person_comprehensive; pose adds no risk there
+        risk_components = {
+            'movement_risk': movement['risk_score'] * 0.25,
+            'position_risk': position['risk_score'] * 0.20,
+            'temporal_risk': temporal['risk_score'] * 0.20,
+            'pose_risk': 0.0,
+            'environmental_risk': environmental['risk_score'] * 0.15
+        }
+        analysis['risk_score'] = min(sum(risk_components.values()), 1.0)
+        self._determine_risk_level_and_alerts(analysis, risk_components)
+        return analysis
+
+    def _advanced_movement_analysis(self, track: Track) -> Dict:
         """Advanced movement pattern analysis."""
         movement = {
             'risk_score': 0.0,
@@ -714,11 +373,11 @@ class WaterDetector:
             'immobility_duration': 0.0
         }
         
-        if len(track_data['positions']) < 3:
+        if len(track) < 3:
             return movement
         
-        positions = np.array(list(track_data['positions']))
-        velocities = list(track_data['velocities'])
+        positions = track.positions
+        velocities = track.velocities
         
         # Calculate movement statistics
         if len(velocities) > 1:
@@ -742,16 +401,17 @@ class WaterDetector:
                     movement['risk_score'] += 0.4
             
             # Detect immobility
-            recent_velocities = velocities[-10:] if len(velocities) >= 10 else velocities
-            if all(v < self.drowning_config['vertical_movement_threshold'] for v in recent_velocities):
-                movement['immobility_duration'] = len(recent_velocities) / self.fps
+            recent_velocities = velocities[-10:]
+            if np.all(recent_velocities < self.drowning_config['vertical_movement_threshold']):
+                timestamps = track.timestamps
+                movement['immobility_duration'] = timestamps[-1] - timestamps[-1 - len(recent_velocities)]
                 if movement['immobility_duration'] > self.drowning_config['immobile_time_threshold']:
                     movement['struggling_indicators'].append('prolonged_immobility')
                     movement['risk_score'] += 0.35
         
         return movement
     
-    def _advanced_position_analysis(self, detection: Dict, track_data: Dict) -> Dict:
+    def _advanced_position_analysis(self, detection: Dict, track: Track) -> Dict:
         """Enhanced body position analysis."""
         position = {
             'risk_score': 0.0,
@@ -769,8 +429,8 @@ class WaterDetector:
             position['risk_score'] += 0.4
         
         # Size consistency analysis
-        if len(track_data['detections']) > 5:
-            recent_areas = [d['area'] for d in list(track_data['detections'])[-5:]]
+        if len(track) > 5:
+            recent_areas = track.areas[-5:]
             area_std = np.std(recent_areas)
             area_mean = np.mean(recent_areas)
             position['size_consistency'] = max(0.0, 1.0 - area_std / max(area_mean, 1.0))
@@ -780,8 +440,8 @@ class WaterDetector:
                 position['risk_score'] += 0.2
         
         # Visibility trend analysis
-        if len(track_data['detections']) > 3:
-            recent_confidences = [d['confidence'] for d in list(track_data['detections'])[-3:]]
+        if len(track) > 3:
+            recent_confidences = track.confidences[-3:]
             confidence_trend = np.polyfit(range(len(recent_confidences)), recent_confidences, 1)[0]
             
             if confidence_trend < -self.drowning_config['submersion_confidence_drop']:
@@ -790,7 +450,7 @@ class WaterDetector:
         
         return position
     
-    def _temporal_pattern_analysis(self, track_data: Dict) -> Dict:
+    def _temporal_pattern_analysis(self, track: Track) -> Dict:
         """Analyze temporal patterns in behavior."""
         temporal = {
             'risk_score': 0.0,
@@ -799,15 +459,12 @@ class WaterDetector:
             'distress_duration': 0.0
         }
         
-        if len(track_data['detections']) < 10:
+        if len(track) < 10:
             return temporal
         
-        # Analyze behavior consistency over time
-        recent_detections = list(track_data['detections'])[-20:]  # Last 20 frames
-        
-        # Calculate pattern stability
-        confidence_pattern = [d['confidence'] for d in recent_detections]
-        position_pattern = [d['center'][1] for d in recent_detections]  # Y-coordinates
+        # Analyze behavior consistency over time (last 20 frames)
+        confidence_pattern = track.confidences[-20:]
+        position_pattern = track.positions[-20:, 1]  # Y-coordinates
         
         confidence_stability = 1.0 - np.std(confidence_pattern) / max(np.mean(confidence_pattern), 0.1)
         position_stability = 1.0 - np.std(position_pattern) / max(np.mean(position_pattern), 1.0)
@@ -819,13 +476,14 @@ class WaterDetector:
             temporal['risk_score'] += 0.25
         
         # Calculate duration of distress indicators
-        distress_frames = 0
-        for detection in recent_detections:
-            if (detection['confidence'] < 0.5 or 
-                detection['aspect_ratio'] < self.drowning_config['aspect_ratio_threshold']):
-                distress_frames += 1
-        
-        temporal['distress_duration'] = distress_frames / self.fps
+        distress_frames = int(np.count_nonzero(
+            (confidence_pattern < 0.5) |
+            (track.aspect_ratios[-20:] < self.drowning_config['aspect_ratio_threshold'])
+        ))
+        
+        window_times = track.timestamps[-20:]
+        frame_interval = (window_times[-1] - window_times[0]) / (len(window_times) - 1)
+        temporal['distress_duration'] = distress_frames * frame_interval
         if temporal['distress_duration'] > self.drowning_config['distress_time_threshold']:
             temporal['behavior_patterns'].append('sustained_distress')
             temporal['risk_score'] += 0.3
@@ -950,14 +608,8 @@ class WaterDetector:
     
     def track_person_movement(self, current_detection: Dict) -> Dict:
         """Legacy method - redirects to advanced movement analysis."""
-        # Create minimal track data for compatibility
-        track_data = {
-            'positions': deque([current_detection['center']], maxlen=50),
-            'detections': deque([current_detection], maxlen=50),
-            'velocities': deque(maxlen=49),
-        }
-        
-        movement = self._advanced_movement_analysis(track_data)
+        # Create minimal track for compatibility
+        movement = self._advanced_movement_analysis(Track.from_detection(current_detection))
         
         # Convert to legacy format
         return {
@@ -972,8 +624,7 @@ class WaterDetector:
     
     def detect_body_position(self, detection: Dict) -> Dict:
         """Legacy method - redirects to advanced position analysis."""
-        track_data = {'detections': deque([detection], maxlen=50)}
-        position = self._advanced_position_analysis(detection, track_data)
+        position = self._advanced_position_analysis(detection, Track.from_detection(detection))
         
         # Convert to legacy format
         return {
@@ -990,8 +641,6 @@ class WaterDetector:
         """Legacy method - redirects to advanced detection system."""
         # Convert detections to new format if needed
         for detection in current_detections:
-            if 'timestamp' not in detection:
-                detection['timestamp'] = time.time()
             if 'center' not in detection:
                 bbox = detection['bbox']
                 detection['center'] = [(bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2]
@@ -2,156 +2,19 @@
 Advanced wrapper around Ultralytics YOLO for person detection with comprehensive
 drowning detection algorithms including pose estimation and environmental analysis.
 """
-from typing import Optional, List, Dict, Tuple, Union
+from typing import Optional, List, Dict, Union, Hashable, Sequence
 import numpy as np
-import time
-import cv2
-from collections import defaultdict, deque
-import math
 
+from src.detections import DetectionBatch
+from src.detector_base import DetectorBase
+from src.risk_scoring import TrackWindows, masked_mean_std, trend
+from src.tracking import Track
 
-class PersonTracker:
-    """Advanced person tracking for multi-person drowning detection."""
-    
-    def __init__(self, max_tracking_distance: float = 50.0, max_tracking_frames: int = 30):
-        self.tracks = {}  # track_id -> track_data
-        self.next_track_id = 1
-        self.max_tracking_distance = max_tracking_distance
-        self.max_tracking_frames = max_tracking_frames
-        
-    def update_tracks(self, detections: List[Dict]) -> Dict[int, Dict]:
-        """Update person tracks with new detections."""
-        current_time = time.time()
-        
-        # Remove old tracks
-        tracks_to_remove = []
-        for track_id, track_data in self.tracks.items():
-            if current_time - track_data['last_seen'] > self.max_tracking_frames / 25.0:  # Assume 25 FPS
-                tracks_to_remove.append(track_id)
-        
-        for track_id in tracks_to_remove:
-            del self.tracks[track_id]
-        
-        # Match detections to existing tracks
-        matched_tracks = set()
-        unmatched_detections = []
-        
-        for detection in detections:
-            if detection['class_id'] != 0:  # Only track persons
-                continue
-                
-            best_track_id = None
-            best_distance = float('inf')
-            
-            detection_center = np.array(detection['center'])
-            
-            for track_id, track_data in self.tracks.items():
-                if track_id in matched_tracks:
-                    continue
-                    
-                last_center = np.array(track_data['positions'][-1])
-                distance = np.linalg.norm(detection_center - last_center)
-                
-                if distance < self.max_tracking_distance and distance < best_distance:
-                    best_distance = distance
-                    best_track_id = track_id
-            
-            if best_track_id is not None:
-                # Update existing track
-                track_data = self.tracks[best_track_id]
-                track_data['positions'].append(detection['center'])
-                track_data['detections'].append(detection)
-                track_data['last_seen'] = current_time
-                track_data['velocities'] = self._calculate_velocities(track_data['positions'])
-                
-                # Keep only recent data
-                max_history = 50
-                if len(track_data['positions']) > max_history:
-                    track_data['positions'] = track_data['positions'][-max_history:]
-                    track_data['detections'] = track_data['detections'][-max_history:]
-                    
-                matched_tracks.add(best_track_id)
-            else:
-                unmatched_detections.append(detection)
-        
-        # Create new tracks for unmatched detections
-        for detection in unmatched_detections:
-            track_id = self.next_track_id
-            self.next_track_id += 1
-            
-            self.tracks[track_id] = {
-                'positions': deque([detection['center']], maxlen=50),
-                'detections': deque([detection], maxlen=50),
-                'velocities': deque(maxlen=49),
-                'last_seen': current_time,
-                'created_at': current_time
-            }
-        
-        return self.tracks
-    
-    def _calculate_velocities(self, positions: deque) -> deque:
-        """Calculate velocities from position history."""
-        velocities = deque(maxlen=len(positions)-1)
-        for i in range(1, len(positions)):
-            pos_diff = np.array(positions[i]) - np.array(positions[i-1])
-            velocity = np.linalg.norm(pos_diff)
-            velocities.append(velocity)
-        return velocities
-
-
-class WaterDetector:
-    """Detect water areas in the frame for better context awareness."""
-    
-    def __init__(self):
-        self.water_mask = None
-        self.pool_boundaries = None
-        
-    def detect_water_areas(self, frame: np.ndarray) -> np.ndarray:
-        """Detect water/pool areas in the frame using color and texture analysis."""
-        # Convert to HSV for better water detection
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        
-        # Define water color ranges (blue/cyan tones)
-        lower_blue1 = np.array([100, 50, 50])
-        upper_blue1 = np.array([130, 255, 255])
-        
-        lower_blue2 = np.array([80, 30, 30])
-        upper_blue2 = np.array([120, 200, 200])
-        
-        # Create masks for water detection
-        mask1 = cv2.inRange(hsv, lower_blue1, upper_blue1)
-        mask2 = cv2.inRange(hsv, lower_blue2, upper_blue2)
-        water_mask = cv2.bitwise_or(mask1, mask2)
-        
-        # Apply morphological operations to clean up the mask
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        water_mask = cv2.morphologyEx(water_mask, cv2.MORPH_CLOSE, kernel)
-        water_mask = cv2.morphologyEx(water_mask, cv2.MORPH_OPEN, kernel)
-        
-        # Find the largest connected component (likely the pool)
-        contours, _ = cv2.findContours(water_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if contours:
-            largest_contour = max(contours, key=cv2.contourArea)
-            if cv2.contourArea(largest_contour) > 1000:  # Minimum pool size
-                self.pool_boundaries = largest_contour
-                water_mask = np.zeros_like(water_mask)
-                cv2.fillPoly(water_mask, [largest_contour], 255)
-        
-        self.water_mask = water_mask
-        return water_mask
-    
-    def is_in_water(self, center_point: Tuple[float, float]) -> bool:
-        """Check if a point is within the detected water area."""
-        if self.water_mask is None:
-            return True  # Assume in water if no detection
-            
-        x, y = int(center_point[0]), int(center_point[1])
-        if 0 <= x < self.water_mask.shape[1] and 0 <= y < self.water_mask.shape[0]:
-            return self.water_mask[y, x] > 0
-        return False
 
+class DrowningDetector(DetectorBase):
+    # Risk comes from boxes and tracks only; a loaded pose model is never run
+    analyzes_pose = False
 
-class DrowningDetector:
     def __init__(self, device: Optional[str] = None, fps: float = 25.0):
         """Create detector object. Model is not loaded until load_model() is called.
 
@@ -159,24 +22,16 @@ class DrowningDetector:
             device: torch device string, e.g. 'cpu' or 'cuda:0'. If None, let ultralytics pick.
             fps: Expected frames per second of the video stream for temporal analysis.
         """
-        self.model = None
-        self.pose_model = None
-        self.device = device
-        self.fps = fps
-        
-        # Advanced tracking and detection components
-        self.person_tracker = PersonTracker()
-        self.water_detector = WaterDetector()
+        super().__init__(device, fps)
         
         # Detection history for temporal analysis
         self.detection_history = []
         self.max_history_frames = int(fps * 15)  # Keep 15 seconds of history
         
         # Enhanced drowning detection parameters
-        self.drowning_config = {
+        self.drowning_config.update({
             # Basic detection
             'min_detection_confidence': 0.4,
-            'person_class_id': 0,
             
             # Movement thresholds
             'vertical_movement_threshold': 3.0,      # pixels per frame
@@ -195,8 +50,6 @@ class DrowningDetector:
             'normal_person_ratio': 2.0,              # normal height/width ratio
             
             # Advanced features
-            'water_detection_enabled': True,
-            'pose_estimation_enabled': False,        # Will enable when pose model is loaded
             'multi_person_tracking': True,
             
             # Alert thresholds
@@ -207,94 +60,43 @@ class DrowningDetector:
             # Environmental factors
             'pool_edge_safety_margin': 20,           # pixels from pool edge
             'minimum_person_size': 400,              # minimum bbox area for valid detection
-        }
+        })
 
-    def load_model(self, model_path: str = "yolov8n.pt", enable_pose: bool = False) -> None:
-        """Load a YOLO model from a local path or one of the Ultralytics short names."""
-        try:
-            from ultralytics import YOLO
-        except Exception as e:
-            raise RuntimeError("ultralytics package is required. Install with pip install ultralytics") from e
-
-        self.model = YOLO(model_path)
-        if self.device:
-            try:
-                self.model.to(self.device)
-            except Exception:
-                pass
-        
-        # Load pose estimation model if requested
-        if enable_pose:
-            try:
-                self.pose_model = YOLO('yolov8n-pose.pt')
-                if self.device:
-                    self.pose_model.to(self.device)
-                self.drowning_config['pose_estimation_enabled'] = True
-                print("✅ Pose estimation model loaded successfully")
-            except Exception as e:
-                print(f"⚠️ Could not load pose model: {e}")
-                self.drowning_config['pose_estimation_enabled'] = False
+    def load_model(self, model_path: str = "yolov8n.pt", enable_pose: bool = False, backend: str = 'pytorch',
+                   imgsz: int = 640, cache_dir: Optional[str] = None, shared: bool = True,
+                   warmup: bool = False) -> None:
+        """Load a YOLO model from a local path or one of the Ultralytics short names.
 
-    def predict_frame(self, frame) -> Tuple[List[Dict], Optional[np.ndarray]]:
-        """Run inference on a single frame and return detections with environmental context."""
-        if self.model is None:
-            raise RuntimeError("Model not loaded. Call load_model() first.")
-
-        # Detect water areas for context
-        water_mask = None
-        if self.drowning_config['water_detection_enabled']:
-            water_mask = self.water_detector.detect_water_areas(frame)
+        With backend='onnx' or 'openvino' the weights are exported once for `imgsz`
+        and the artifact is cached on disk (see src.models.load_yolo). Exported
+        models (.onnx, *_openvino_model, including INT8 ones) are loaded as is.
+        With shared=True (default) the weights come from the process-wide model
+        registry, so detectors loading the same model share one copy; pass
+        shared=False for a private model that may be modified in place.
+        warmup=True runs warmup() with its defaults before returning.
+        """
+        super().load_model(model_path, enable_pose, backend=backend, imgsz=imgsz, cache_dir=cache_dir,
+                           shared=shared, warmup=warmup)
 
-        # Run YOLO detection
-        results = self.model.predict(source=frame, imgsz=640, conf=0.25, verbose=False)
+    def advanced_drowning_detection(self, current_detections: Union[DetectionBatch, List[Dict]], water_mask: np.ndarray = None,
+                                    timestamp: Optional[float] = None,
+                                    camera_id: Optional[Hashable] = None) -> Dict:
+        """State-of-the-art drowning detection using multiple AI techniques.
 
-        if not results:
-            return [], water_mask
-            
-        r = results[0]
-        detections = []
-        
-        for det in r.boxes.data.tolist() if hasattr(r.boxes, 'data') else []:
-            xmin, ymin, xmax, ymax, score, cls = det[:6]
-            
-            # Enhanced detection data
-            detection = {
-                "class_id": int(cls),
-                "name": r.names[int(cls)] if hasattr(r, 'names') else str(int(cls)),
-                "confidence": float(score),
-                "bbox": [float(xmin), float(ymin), float(xmax), float(ymax)],
-                "timestamp": time.time(),
-                "center": [(xmin + xmax) / 2, (ymin + ymax) / 2],
-                "width": xmax - xmin,
-                "height": ymax - ymin,
-                "area": (xmax - xmin) * (ymax - ymin),
-                "aspect_ratio": (xmax - xmin) / (ymax - ymin) if (ymax - ymin) > 0 else 0,
-                
-                # Environmental context
-                "in_water": self.water_detector.is_in_water([(xmin + xmax) / 2, (ymin + ymax) / 2]),
-                "distance_to_pool_edge": self._calculate_pool_distance([(xmin + xmax) / 2, (ymin + ymax) / 2]),
-                
-                # Additional metrics
-                "visibility_score": score,  # Simplified for now
-            }
-            
-            detections.append(detection)
+        Args:
+            current_detections: Detections of the current frame from predict_frame()
+                (a DetectionBatch, or a list of detection dicts).
+            water_mask: Water mask of the current frame, if available.
+            timestamp: Stream time of the frame in seconds. Defaults to the timestamp
+                of the detections, or one frame after the previous call.
+            camera_id: Camera the detections come from; each camera has its own tracks.
+        """
+        current_detections = DetectionBatch.from_dicts(current_detections)
+        if timestamp is None:
+            timestamp = current_detections.timestamp
         
-        return detections, water_mask
-    
-    def _calculate_pool_distance(self, center_point: Tuple[float, float]) -> float:
-        """Calculate distance from person to pool edge."""
-        if self.water_detector.pool_boundaries is None:
-            return 0.0
-            
-        distance = cv2.pointPolygonTest(self.water_detector.pool_boundaries, 
-                                      (center_point[0], center_point[1]), True)
-        return abs(distance)
-
-    def advanced_drowning_detection(self, current_detections: List[Dict], water_mask: np.ndarray = None) -> Dict:
-        """State-of-the-art drowning detection using multiple AI techniques."""
         # Update tracking
-        tracks = self.person_tracker.update_tracks(current_detections)
+        tracks = self.camera(camera_id).person_tracker.update_tracks(current_detections, timestamp)
         
         result = {
             'drowning_detected': False,
@@ -305,7 +107,7 @@ class DrowningDetector:
             'environmental_context': {
                 'water_detected': water_mask is not None,
                 'pool_area': np.sum(water_mask > 0) if water_mask is not None else 0,
-                'total_persons': len([d for d in current_detections if d['class_id'] == 0])
+                'total_persons': int(np.count_nonzero(current_detections.class_ids == 0))
             },
             'tracking_info': {
                 'active_tracks': len(tracks),
@@ -315,16 +117,12 @@ class DrowningDetector:
         if not tracks:
             return result
         
-        # Analyze each tracked person
-        for track_id, track_data in tracks.items():
-            if len(track_data['detections']) == 0:
-                continue
-                
-            current_detection = track_data['detections'][-1]
-            if current_detection['class_id'] != 0:  # Only analyze persons
-                continue
-            
-            person_analysis = self._analyze_person_comprehensive(track_data, track_id)
+        # Analyze each tracked person, with the risk of all of them scored in one vectorized pass
+        persons = [(track_id, track) for track_id, track in tracks.items()
+                   if len(track) and track.detection['class_id'] == 0]  # Only analyze persons
+        scores = self._score_tracks([track for _, track in persons]) if persons else None
+        for index, (track_id, track) in enumerate(persons):
+            person_analysis = self._scored_person_analysis(track, track_id, scores, index)
             result['person_analyses'].append(person_analysis)
             
             # Update overall result based on highest risk person
@@ -338,9 +136,9 @@ class DrowningDetector:
         
         return result
     
-    def _analyze_person_comprehensive(self, track_data: Dict, track_id: int) -> Dict:
+    def _analyze_person_comprehensive(self, track: Track, track_id: int) -> Dict:
         """Comprehensive analysis of a single person's behavior."""
-        current_detection = track_data['detections'][-1]
+        current_detection = track.detection
         
         analysis = {
             'track_id': track_id,
@@ -354,8 +152,8 @@ class DrowningDetector:
         risk_score = 0.0
         
         # Movement analysis
-        if len(track_data['positions']) > 3:
-            positions = np.array(list(track_data['positions']))
+        if len(track) > 3:
+            positions = track.positions
             
             # Check for rapid vertical movement (sinking)
             if len(positions) >= 5:
@@ -367,8 +165,8 @@ class DrowningDetector:
                     analysis['alerts'].append("Rapid downward movement detected")
             
             # Check for movement variance (struggling)
-            if len(track_data['velocities']) > 3:
-                velocities = list(track_data['velocities'])
+            velocities = track.velocities
+            if len(velocities) > 3:
                 velocity_std = np.std(velocities)
                 if velocity_std > self.drowning_config['struggling_motion_variance']:
                     risk_score += 0.3
@@ -381,8 +179,8 @@ class DrowningDetector:
             analysis['alerts'].append("Horizontal body position detected")
         
         # Confidence drop analysis (submersion indicator)
-        if len(track_data['detections']) > 3:
-            recent_confidences = [d['confidence'] for d in list(track_data['detections'])[-3:]]
+        if len(track) > 3:
+            recent_confidences = track.confidences[-3:]
             confidence_trend = np.polyfit(range(len(recent_confidences)), recent_confidences, 1)[0]
             
             if confidence_trend < -self.drowning_config['submersion_confidence_drop']:
@@ -405,13 +203,53 @@ class DrowningDetector:
         
         return analysis
 
+    def _score_tracks(self, track_list: Sequence[Track]) -> Dict[str, np.ndarray]:
+        """Risk indicators and scores of many person tracks at once.
+
+        Vectorized over TrackWindows; gives the same values as running
+        _analyze_person_comprehensive() per track (trends up to rounding, see
+        risk_scoring.trend).
+        """
+        config = self.drowning_config
+        windows = TrackWindows.from_tracks(track_list)
+        lengths = windows.lengths
+
+        scores = {
+            'rapid_sinking': (lengths >= 5) & (trend(windows.centers[:, -5:, 1]) > config['rapid_sinking_threshold']),
+            'erratic_movement': (lengths - 1 > 3) & (masked_mean_std(
+                windows.velocities, windows.newest(windows.history, offset=1))[1] > config['struggling_motion_variance']),
+            'horizontal': windows.aspect_ratio < config['aspect_ratio_threshold'],
+            'fading': (lengths > 3) & (trend(windows.confidences[:, -3:]) < -config['submersion_confidence_drop']),
+        }
+        # Summed in the order of _analyze_person_comprehensive() so the scores match exactly
+        risk = np.where(scores['rapid_sinking'], 0.4, 0.0)
+        risk = np.where(scores['erratic_movement'], risk + 0.3, risk)
+        risk = np.where(scores['horizontal'], risk + 0.4, risk)
+        risk = np.where(scores['fading'], risk + 0.3, risk)
+        scores['risk'] = np.where(windows.in_water, risk, 0.0)  # Not in water = no drowning risk
+        return scores
+
+    def _scored_person_analysis(self, track: Track, track_id: int, scores: Dict[str, np.ndarray],
+                                index: int) -> Dict:
+        """_analyze_person_comprehensive() result of one track from its row of _score_tracks()."""
+        messages = (('rapid_sinking', "Rapid downward movement detected"),
+                    ('erratic_movement', "Erratic movement patterns detected"),
+                    ('horizontal', "Horizontal body position detected"),
+                    ('fading', "Detection confidence decreasing (possible submersion)"))
+        risk_score = float(scores['risk'][index])
+        return {
+            'track_id': track_id,
+            'detection': track.detection,
+            'risk_score': min(risk_score, 1.0),
+            'risk_level': self._risk_level(risk_score),  # from the unclamped score, as per track
+            'alerts': [message for name, message in messages if scores[name][index]],
+        }
+
     # Legacy methods for backward compatibility
     def comprehensive_drowning_detection(self, current_detections: List[Dict]) -> Dict:
         """Legacy method - redirects to advanced detection system."""
         # Ensure detections have required fields
         for detection in current_detections:
-            if 'timestamp' not in detection:
-                detection['timestamp'] = time.time()
             if 'center' not in detection:
                 bbox = detection['bbox']
                 detection['center'] = [(bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2]
@@ -0,0 +1,51 @@
+"""
+Stream-time clock for the detection pipeline.
+
+All temporal logic (track expiry, immobility and distress durations) runs on
+the time of the video stream rather than on wall-clock time, so a recorded
+clip gives identical results whether it is processed faster or slower than
+real time.
+"""
+from typing import Optional
+
+
+class FrameClock:
+    """Derive frame timestamps from the source's frame index and container PTS."""
+
+    def __init__(self, fps: float = 25.0):
+        """
+        Args:
+            fps: Nominal frame rate, used when the source does not provide usable PTS.
+        """
+        self.fps = fps if fps and fps > 0 else 25.0
+        self.frame_index = -1
+        self.timestamp = 0.0
+
+    @property
+    def frame_interval(self) -> float:
+        return 1.0 / self.fps
+
+    def tick(self, pts_msec: Optional[float] = None) -> float:
+        """Advance to the next frame and return its stream time in seconds.
+
+        Args:
+            pts_msec: Presentation timestamp of the frame in milliseconds, e.g.
+                cap.get(cv2.CAP_PROP_POS_MSEC). Webcams usually report 0 or -1
+                here; in that case the time is derived from the frame index.
+        """
+        self.frame_index += 1
+        if pts_msec is not None and pts_msec > 0:
+            timestamp = pts_msec / 1000.0
+        else:
+            timestamp = self.frame_index * self.frame_interval
+
+        # Keep time strictly increasing even if the container PTS jumps backwards
+        if self.frame_index > 0 and timestamp <= self.timestamp:
+            timestamp = self.timestamp + self.frame_interval
+
+        self.timestamp = timestamp
+        return timestamp
+
+    def reset(self) -> None:
+        self.frame_index = -1
+        self.timestamp = 0.0
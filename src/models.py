@@ -0,0 +1,427 @@
+"""
+Model helpers for the detection pipeline.
+
+The drowning detectors only look at the COCO person class. A stock YOLO head
+still scores all 80 classes for every anchor before NMS; slicing the
+classification head down to the person channel gives a single-class model
+with identical person boxes and a cheaper head and NMS.
+
+On CPU-only machines the PyTorch weights are the slowest way to run the same
+network. load_yolo() can export them once to ONNX Runtime or OpenVINO and
+keeps the artifact in an on-disk cache keyed by the weights' content hash
+and the input size, so restarts load the compiled model directly.
+quantize_onnx_int8() turns such an ONNX export into an INT8 model calibrated
+on our own pool frames (see scripts/quantize_int8.py).
+
+Detectors get their models from the process-wide `model_registry`, so several
+cameras, detectors or Streamlit reruns in one process share one copy of the
+weights instead of loading their own.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+import ast
+import hashlib
+import os
+import re
+import shutil
+import threading
+from typing import Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+PERSON_CLASS_ID = 0
+
+# Inference backends accepted by load_yolo(); the value is the ultralytics export format
+BACKENDS = {'pytorch': None, 'onnx': 'onnx', 'openvino': 'openvino'}
+
+DEFAULT_MODEL_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'drowning-detector', 'models')
+
+
+def model_class_names(model) -> Dict[int, str]:
+    """Class index -> name mapping of an ultralytics model (empty if unknown)."""
+    names = getattr(model, 'names', None) or {}
+    if isinstance(names, (list, tuple)):
+        names = dict(enumerate(names))
+    return dict(names)
+
+
+def is_single_class(model) -> bool:
+    return len(model_class_names(model)) == 1
+
+
+def slice_detection_head(model, class_ids: Sequence[int] = (PERSON_CLASS_ID,)):
+    """Keep only `class_ids` in the classification head of an ultralytics YOLO model.
+
+    Works for Detect heads and their subclasses (Pose, Segment): the last 1x1
+    conv of every classification branch is replaced by one with only the kept
+    output channels, so box regression and the kept class scores are unchanged.
+    The model is modified in place and returned; class ids are renumbered from 0
+    in the given order.
+
+    Args:
+        model: ultralytics.YOLO instance (PyTorch weights, not an exported backend).
+        class_ids: Classes to keep, e.g. (0,) for a person-only head.
+    """
+    try:
+        import torch
+        from torch import nn
+    except Exception as e:
+        raise RuntimeError("torch is required to edit the model head. Install with pip install torch") from e
+
+    net = getattr(model, 'model', None)
+    head = net.model[-1] if net is not None and hasattr(net, 'model') else None
+    if head is None or not hasattr(head, 'cv3') or not hasattr(head, 'nc'):
+        raise ValueError("Model has no YOLO detection head to slice (exported models cannot be edited)")
+
+    class_ids = [int(c) for c in class_ids]
+    if not class_ids or max(class_ids) >= head.nc or min(class_ids) < 0:
+        raise ValueError(f"class_ids {class_ids} out of range for a head with {head.nc} classes")
+    keep = torch.tensor(class_ids, dtype=torch.long)
+
+    def _slice(branch: nn.Module) -> None:
+        conv = branch[-1]
+        sliced = nn.Conv2d(conv.in_channels, len(class_ids), conv.kernel_size, conv.stride,
+                           conv.padding, bias=conv.bias is not None)
+        with torch.no_grad():
+            sliced.weight.copy_(conv.weight[keep])
+            if conv.bias is not None:
+                sliced.bias.copy_(conv.bias[keep])
+        branch[-1] = sliced.to(conv.weight.device, conv.weight.dtype)
+
+    for branch in head.cv3:
+        _slice(branch)
+    for branch in getattr(head, 'one2one_cv3', None) or []:  # end-to-end (NMS-free) heads
+        _slice(branch)
+
+    old_names = model_class_names(model)
+    head.nc = len(class_ids)
+    head.no = head.nc + head.reg_max * 4
+    names = {i: old_names.get(c, str(c)) for i, c in enumerate(class_ids)}
+    net.names = names
+    if isinstance(getattr(net, 'yaml', None), dict):
+        net.yaml['nc'] = head.nc
+    return model
+
+
+def person_classes(model, person_class_id: int = PERSON_CLASS_ID) -> Optional[list]:
+    """`classes` argument restricting predict() to persons, or None if the model has no other classes."""
+    if is_single_class(model):
+        return None
+    return [person_class_id]
+
+
+@lru_cache(maxsize=32)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_digest(path: str) -> str:
+    """SHA-256 of a weights file (memoized per path, modification time and size)."""
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def is_exported_model(path: str) -> bool:
+    """True for ONNX files and OpenVINO model directories, which ultralytics loads as is."""
+    path = str(path).rstrip('/\\')
+    return path.endswith('.onnx') or path.endswith('_openvino_model')
+
+
+def artifact_path(model_path: str, backend: str, imgsz: int = 640, cache_dir: Optional[str] = None) -> str:
+    """Cache location of the `backend` export of `model_path` at input size `imgsz`."""
+    if BACKENDS.get(backend) is None:
+        raise ValueError(f"Unknown export backend {backend!r}; expected one of "
+                         f"{[b for b, fmt in BACKENDS.items() if fmt]}")
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    name = f"{stem}-{model_digest(model_path)[:16]}-{int(imgsz)}"
+    suffix = '.onnx' if backend == 'onnx' else '_openvino_model'
+    return os.path.join(cache_dir or DEFAULT_MODEL_CACHE, name + suffix)
+
+
+def export_model(model_path: str, backend: str, imgsz: int = 640, cache_dir: Optional[str] = None) -> str:
+    """Path of the cached `backend` export of `model_path`, exporting it on a cache miss.
+
+    Args:
+        model_path: .pt weights or ultralytics short name (downloaded on first use).
+        backend: 'onnx' or 'openvino'.
+        imgsz: Input size the export is compiled for; predict() must use the same size.
+        cache_dir: Export cache directory (default ~/.cache/drowning-detector/models).
+    """
+    try:
+        from ultralytics import YOLO
+    except Exception as e:
+        raise RuntimeError("ultralytics package is required. Install with pip install ultralytics") from e
+
+    model = None
+    if not os.path.isfile(model_path):
+        # Short names ('yolov8n.pt') are downloaded by ultralytics on first use
+        model = YOLO(model_path)
+        model_path = getattr(model, 'ckpt_path', None) or model_path
+    target = artifact_path(model_path, backend, imgsz, cache_dir)
+    if os.path.exists(target):
+        return target
+
+    model = model or YOLO(model_path)
+    exported = model.export(format=BACKENDS[backend], imgsz=imgsz, verbose=False)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Move into place under a temporary name first so a crash never leaves a partial artifact
+    staging = f"{target}.tmp{os.getpid()}"
+    shutil.move(str(exported), staging)
+    try:
+        os.replace(staging, target)
+    except OSError:
+        if not os.path.exists(target):
+            raise
+        # Another process exported the same model concurrently; keep its copy
+        if os.path.isdir(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+        else:
+            os.remove(staging)
+    return target
+
+
+def load_yolo(model_path: str, backend: str = 'pytorch', imgsz: int = 640, cache_dir: Optional[str] = None,
+              task: Optional[str] = None, device: Optional[str] = None):
+    """Load an ultralytics YOLO model for the given inference backend.
+
+    Args:
+        model_path: .pt weights or ultralytics short name. Already exported models
+            (.onnx, *_openvino_model) are loaded directly whatever the backend.
+        backend: 'pytorch', 'onnx' or 'openvino'.
+        imgsz, cache_dir: See export_model().
+        task: ultralytics task ('detect', 'pose'); read from the export metadata if None.
+        device: torch device to move PyTorch weights to (exported backends ignore it).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {list(BACKENDS)}")
+    try:
+        from ultralytics import YOLO
+    except Exception as e:
+        raise RuntimeError("ultralytics package is required. Install with pip install ultralytics") from e
+
+    if backend != 'pytorch' and not is_exported_model(model_path):
+        model_path = export_model(model_path, backend, imgsz, cache_dir)
+    model = YOLO(model_path, task=task)
+    if device:
+        try:
+            model.to(device)
+        except Exception:
+            # ultralytics will usually handle device selection; ignore on failure
+            pass
+    return model
+
+
+class SharedModel:
+    """A registry model shared by several detectors.
+
+    predict() and __call__ are serialized with a per-model lock (ultralytics
+    predictors keep per-call state and are not thread-safe); every other
+    attribute is passed through to the wrapped YOLO object.
+    """
+
+    def __init__(self, model, key: Tuple):
+        self.yolo = model
+        self.key = key
+        self._lock = threading.Lock()
+
+    def predict(self, *args, **kwargs):
+        with self._lock:
+            return self.yolo.predict(*args, **kwargs)
+
+    def __call__(self, *args, **kwargs):
+        return self.predict(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name == 'yolo':  # not set yet (copy/unpickle)
+            raise AttributeError(name)
+        return getattr(self.yolo, name)
+
+    def __repr__(self) -> str:
+        return f"SharedModel({self.key!r})"
+
+
+class _RegistryEntry:
+    __slots__ = ('model', 'refs', 'loading')
+
+    def __init__(self):
+        self.model: Optional[SharedModel] = None
+        self.refs = 0
+        self.loading = threading.Lock()
+
+
+class ModelRegistry:
+    """Process-wide, thread-safe cache of loaded YOLO models with reference counting.
+
+    Models are keyed by (path, backend, device, imgsz, task) and loaded once;
+    every acquire() returns the same SharedModel until all holders have
+    released it. Unreferenced models are kept in a small LRU (`max_idle`) so a
+    detector that is torn down and recreated (a Streamlit rerun, a restarted
+    camera) gets its model back without reloading. Loads of different models
+    run in parallel; concurrent acquires of the same model wait for one load.
+    """
+
+    def __init__(self, max_idle: int = 2, loader=load_yolo):
+        self.max_idle = max_idle
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple, _RegistryEntry] = {}
+        self._idle: 'OrderedDict[Tuple, None]' = OrderedDict()
+
+    @staticmethod
+    def key(model_path: str, backend: str = 'pytorch', device: Optional[str] = None, imgsz: int = 640,
+            task: Optional[str] = None) -> Tuple:
+        path = os.path.abspath(model_path) if os.path.exists(model_path) else str(model_path)
+        # PyTorch graphs run at any input size, so one copy serves every imgsz
+        size = None if backend == 'pytorch' and not is_exported_model(model_path) else int(imgsz)
+        return path, backend, str(device) if device else None, size, task
+
+    def acquire(self, model_path: str, backend: str = 'pytorch', device: Optional[str] = None,
+                imgsz: int = 640, cache_dir: Optional[str] = None, task: Optional[str] = None) -> SharedModel:
+        """Return the shared model for these settings, loading it on first use."""
+        key = self.key(model_path, backend, device, imgsz, task)
+        with self._lock:
+            entry = self._entries.setdefault(key, _RegistryEntry())
+            entry.refs += 1
+            self._idle.pop(key, None)
+
+        with entry.loading:
+            if entry.model is None:
+                try:
+                    entry.model = SharedModel(self._loader(model_path, backend, imgsz, cache_dir, task, device),
+                                              key)
+                except Exception:
+                    with self._lock:
+                        entry.refs -= 1
+                        if entry.refs == 0 and self._entries.get(key) is entry:
+                            del self._entries[key]
+                    raise
+        return entry.model
+
+    def release(self, model) -> None:
+        """Drop one reference to a model returned by acquire(); other objects are ignored."""
+        if not isinstance(model, SharedModel):
+            return
+        with self._lock:
+            entry = self._entries.get(model.key)
+            if entry is None or entry.model is not model or entry.refs == 0:
+                return
+            entry.refs -= 1
+            if entry.refs == 0:
+                self._idle[model.key] = None
+                while len(self._idle) > self.max_idle:
+                    stale, _ = self._idle.popitem(last=False)
+                    del self._entries[stale]
+
+    def references(self) -> Dict[Hashable, int]:
+        """Reference count of every cached model (0 = idle)."""
+        with self._lock:
+            return {key: entry.refs for key, entry in self._entries.items() if entry.model is not None}
+
+    def clear(self) -> None:
+        """Forget every idle model; models still in use stay cached."""
+        with self._lock:
+            for key in self._idle:
+                del self._entries[key]
+            self._idle.clear()
+
+
+model_registry = ModelRegistry()
+
+
+def exported_imgsz(model_path: str) -> Optional[int]:
+    """Input size an exported model was compiled for, from its ultralytics metadata.
+
+    Returns None for PyTorch weights or when the metadata cannot be read.
+    """
+    model_path = str(model_path).rstrip('/\\')
+    imgsz = None
+    try:
+        if model_path.endswith('_openvino_model'):
+            import yaml
+            with open(os.path.join(model_path, 'metadata.yaml')) as f:
+                imgsz = (yaml.safe_load(f) or {}).get('imgsz')
+        elif model_path.endswith('.onnx'):
+            import onnx
+            props = {p.key: p.value for p in onnx.load(model_path, load_external_data=False).metadata_props}
+            imgsz = ast.literal_eval(props['imgsz']) if 'imgsz' in props else None
+    except Exception:
+        return None
+    if isinstance(imgsz, (list, tuple)):
+        imgsz = max(imgsz) if imgsz else None
+    return int(imgsz) if imgsz else None
+
+
+def letterbox(frame: np.ndarray, imgsz: int = 640) -> np.ndarray:
+    """Preprocess a BGR frame like ultralytics does for a fixed-size export.
+
+    Resizes with the aspect ratio kept, pads to imgsz x imgsz with grey (114),
+    and returns a (1, 3, imgsz, imgsz) float32 RGB tensor in [0, 1].
+    """
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top = int(round((imgsz - new_h) / 2 - 0.1))
+    left = int(round((imgsz - new_w) / 2 - 0.1))
+    padded = cv2.copyMakeBorder(frame, top, imgsz - new_h - top, left, imgsz - new_w - left,
+                                cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return np.ascontiguousarray(padded[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def quantize_onnx_int8(onnx_path: str, calibration_frames: Iterable[np.ndarray], output_path: str,
+                       imgsz: int = 640, exclude_head: bool = True) -> str:
+    """Post-training static INT8 quantization of a YOLO ONNX export.
+
+    Activation ranges are calibrated on `calibration_frames` (BGR images of the
+    target scene), weights are quantized per channel. The detection head's
+    box decoding is left in FP32 by default: it mixes pixel-scale box
+    coordinates with 0-1 scores in one tensor, which a single INT8 scale
+    cannot represent without losing either.
+
+    The ultralytics metadata (class names, imgsz, task) is copied over, so the
+    result loads with DrowningDetector.load_model() like any ONNX export.
+    """
+    try:
+        import onnx
+        from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                              quantize_static)
+    except Exception as e:
+        raise RuntimeError("INT8 quantization requires onnx and onnxruntime. "
+                           "Install with pip install onnx onnxruntime") from e
+
+    model = onnx.load(onnx_path)
+    input_name = model.graph.input[0].name
+
+    class _Frames(CalibrationDataReader):
+        def __init__(self):
+            self._frames = iter(calibration_frames)
+
+        def get_next(self):
+            frame = next(self._frames, None)
+            return None if frame is None else {input_name: letterbox(frame, imgsz)}
+
+    nodes_to_exclude = []
+    if exclude_head:
+        # ultralytics names nodes '/model.<layer>/...'; the last layer is the head
+        layers = [int(m.group(1)) for m in (re.match(r'/model\.(\d+)/', n.name) for n in model.graph.node) if m]
+        if layers:
+            head = f'/model.{max(layers)}/'
+            nodes_to_exclude = [n.name for n in model.graph.node if n.name.startswith(head)]
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    quantize_static(onnx_path, output_path, _Frames(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    nodes_to_exclude=nodes_to_exclude)
+
+    quantized = onnx.load(output_path)
+    del quantized.metadata_props[:]
+    for prop in model.metadata_props:
+        quantized.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(quantized, output_path)
+    return output_path
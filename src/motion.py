@@ -0,0 +1,104 @@
+"""
+Motion gate for idle cameras.
+
+At night or during closed hours a pool camera sees an empty, unchanging
+scene, and running YOLO and water detection on every frame is wasted CPU.
+The MotionGate compares a small blurred colour thumbnail of each frame
+against a running-average background. While nothing moves and no track is
+alive it lets only one frame per `idle_interval` through to the detector;
+the first frame with motion, and every frame while any track exists, run at
+full rate.
+"""
+from typing import Dict, Tuple
+import numpy as np
+import cv2
+
+
+class MotionGate:
+    """Decide per frame whether the detector has to run."""
+
+    def __init__(self, probe_size: Tuple[int, int] = (160, 90), pixel_threshold: float = 15.0,
+                 min_motion_fraction: float = 0.002, learning_rate: float = 0.05,
+                 hold_frames: int = 25, idle_interval: int = 25):
+        """
+        Args:
+            probe_size: (width, height) of the thumbnail compared with the background.
+            pixel_threshold: Absolute difference (0-255) in any colour channel at
+                which a thumbnail pixel counts as changed.
+            min_motion_fraction: Fraction of changed thumbnail pixels that counts as motion.
+            learning_rate: Weight of each new frame in the running background.
+            hold_frames: Frames to keep running at full rate after the last motion.
+            idle_interval: While idle, run the detector on every Nth frame
+                (0 skips all idle frames).
+        """
+        self.probe_size = probe_size
+        self.pixel_threshold = pixel_threshold
+        self.min_motion_fraction = min_motion_fraction
+        self.learning_rate = learning_rate
+        self.hold_frames = hold_frames
+        self.idle_interval = idle_interval
+
+        self.background = None  # float32 running-average thumbnail
+        self.motion_fraction = 0.0
+        self.frames = 0
+        self.processed = 0
+        self._since_motion = None  # frames since motion was last seen; None before the first frame
+        self._since_processed = 0
+
+    def _probe(self, frame: np.ndarray) -> np.ndarray:
+        """Small blurred thumbnail of the frame (colour: swimmers and water can share a grey level)."""
+        width, height = self.probe_size
+        # Subsample first so INTER_AREA only averages a few thousand pixels
+        step = max(1, min(frame.shape[1] // (width * 4), frame.shape[0] // (height * 4)))
+        thumb = cv2.resize(frame[::step, ::step], (width, height), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(thumb, (5, 5), 0).astype(np.float32)
+
+    def motion(self, frame: np.ndarray) -> bool:
+        """Compare the frame with the background, then blend it in. True if it moved."""
+        probe = self._probe(frame)
+        if self.background is None or self.background.shape != probe.shape:
+            self.background = probe
+            self.motion_fraction = 1.0
+            return True
+        difference = cv2.absdiff(probe, self.background)
+        changed = (difference.max(axis=2) if difference.ndim == 3 else difference) > self.pixel_threshold
+        self.motion_fraction = float(np.count_nonzero(changed)) / changed.size
+        cv2.accumulateWeighted(probe, self.background, self.learning_rate)
+        return self.motion_fraction >= self.min_motion_fraction
+
+    def should_process(self, frame: np.ndarray, active_tracks: int = 0) -> bool:
+        """Whether the detector has to run on this frame.
+
+        Args:
+            frame: Current BGR (or grayscale) frame.
+            active_tracks: Tracks the camera's tracker currently holds, including
+                ones waiting to be re-associated. Never gated while non-zero.
+        """
+        self.frames += 1
+        if self.motion(frame):
+            self._since_motion = 0
+        elif self._since_motion is not None:
+            self._since_motion += 1
+
+        run = (active_tracks > 0 or self._since_motion is None or self._since_motion <= self.hold_frames or
+               (self.idle_interval > 0 and self._since_processed + 1 >= self.idle_interval))
+        if run:
+            self.processed += 1
+            self._since_processed = 0
+        else:
+            self._since_processed += 1
+        return run
+
+    @property
+    def idle(self) -> bool:
+        """True while the gate is skipping frames."""
+        return self._since_processed > 0
+
+    def metrics(self) -> Dict:
+        """Frames seen and processed, and the fraction of frames skipped."""
+        return {
+            'frames': self.frames,
+            'processed': self.processed,
+            'skipped_fraction': 1.0 - self.processed / self.frames if self.frames else 0.0,
+            'motion_fraction': self.motion_fraction,
+        }
@@ -0,0 +1,68 @@
+"""
+Risk-gated pose estimation schedule for one camera.
+
+A whole-frame pose pass costs as much as detection itself, yet keypoints only
+change the outcome for the few swimmers whose movement or body position
+already looks wrong. The PoseScheduler keeps the cheap (movement and
+position) risk of every track from the last analysis and picks the tracks
+that are due for a pose refresh: above the risk threshold and not refreshed
+within the last `interval` seconds. The detector runs the pose model on
+batched crops of those tracks only, and the analysis reuses each track's
+latest pose for up to `max_age` seconds on the frames in between.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class PoseScheduler:
+    """Decide which tracks of a camera get a crop pose pass, and keep their latest poses."""
+
+    def __init__(self, risk_threshold: float = 0.3, interval: float = 0.5, max_age: float = 1.0,
+                 max_tracks: int = 8):
+        """
+        Args:
+            risk_threshold: Cheap risk (0-1) at or above which a track gets pose.
+            interval: Minimum seconds between two pose passes of one track.
+            max_age: Seconds a track's latest pose is reused on frames without one.
+            max_tracks: Most tracks per pose pass; the riskiest go first.
+        """
+        self.risk_threshold = risk_threshold
+        self.interval = interval
+        self.max_age = max_age
+        self.max_tracks = max_tracks
+
+        self.risk: Dict[int, float] = {}                             # track id -> cheap risk of the last analysis
+        self.requested: Dict[int, float] = {}                        # track id -> time of its last pose pass
+        self.poses: Dict[int, Tuple[float, Optional[Dict]]] = {}     # track id -> (time, pose data or None)
+        self.passes = 0
+
+    def due(self, timestamp: float) -> List[int]:
+        """Tracks to run pose on at `timestamp`, riskiest first; marks them as requested."""
+        candidates = [(risk, track_id) for track_id, risk in self.risk.items()
+                      if risk >= self.risk_threshold
+                      and timestamp - self.requested.get(track_id, float('-inf')) >= self.interval]
+        track_ids = [track_id for _, track_id in sorted(candidates, reverse=True)[:self.max_tracks]]
+        for track_id in track_ids:
+            self.requested[track_id] = timestamp
+        self.passes += len(track_ids)
+        return track_ids
+
+    def store(self, track_id: int, timestamp: float, pose: Optional[Dict]) -> None:
+        """Record the pose found for a track (None if the crop had no usable skeleton)."""
+        self.poses[track_id] = (timestamp, pose)
+
+    def pose(self, track_id: int, timestamp: float) -> Optional[Dict]:
+        """The track's latest pose if it is at most `max_age` seconds old."""
+        entry = self.poses.get(track_id)
+        if entry is None or entry[1] is None or timestamp - entry[0] > self.max_age:
+            return None
+        return entry[1]
+
+    def update_risk(self, track_id: int, risk: float) -> None:
+        self.risk[track_id] = risk
+
+    def prune(self, track_ids: Iterable[int]) -> None:
+        """Forget tracks that no longer exist."""
+        live = set(track_ids)
+        for table in (self.risk, self.requested, self.poses):
+            for track_id in [t for t in table if t not in live]:
+                del table[track_id]
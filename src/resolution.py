@@ -0,0 +1,108 @@
+"""
+Adaptive inference resolution for one camera.
+
+The detector input size trades small-object recall against latency. Close-up
+cameras with large swimmers waste time at 640px, while a wide-angle camera
+over a long pool needs more pixels to see distant swimmers at all. The
+ResolutionController watches the person heights the detector returns and the
+time each inference takes, and moves the input size up or down a ladder of
+sizes between frames.
+"""
+from collections import deque
+from typing import Deque, Dict, List, Sequence, Tuple
+import numpy as np
+
+
+class ResolutionController:
+    """Choose the detector input size of one camera from person sizes and the latency budget.
+
+    Rules, checked after every detector run (at most one step per `cooldown` runs):
+      * raise when the smallest recent person is below `min_person_px` at the
+        network input; distant swimmers take priority over the budget,
+      * lower when inference is over budget and every recent person would
+        still be at least `1.5 * min_person_px` at the lower size (always, down
+        to the smallest size, when nobody was in view),
+      * return towards `initial` when the next size, extrapolated by pixel
+        count from the current latency, fits in 80% of the budget.
+    """
+
+    def __init__(self, sizes: Sequence[int] = (320, 416, 512, 640, 768, 960), initial: int = 640,
+                 budget_ms: float = 40.0, min_person_px: float = 32.0, window: int = 15, cooldown: int = 10):
+        """
+        Args:
+            sizes: Allowed input sizes (multiples of the model stride, 32).
+            initial: Starting size; also the size returned to when load drops.
+            budget_ms: Inference time available per frame (e.g. 1000 / fps).
+            min_person_px: Smallest person height, in network input pixels, that
+                the detector finds reliably.
+            window: Detector runs over which latency and person sizes are pooled.
+            cooldown: Minimum detector runs between two size changes.
+        """
+        self.sizes: List[int] = sorted(int(s) for s in sizes)
+        if initial not in self.sizes:
+            self.sizes = sorted(set(self.sizes) | {int(initial)})
+        self.initial = int(initial)
+        self.imgsz = self.initial
+        self.budget_ms = budget_ms
+        self.min_person_px = min_person_px
+        self.cooldown = cooldown
+
+        self.latencies: Deque[float] = deque(maxlen=window)
+        # Per run, smallest person height / source size (inf when nobody was detected)
+        self.smallest_scaled: Deque[float] = deque(maxlen=window)
+        self.runs = 0
+        self._last_change = -cooldown
+        self.changes: Deque[Dict] = deque(maxlen=100)
+        self.latency_by_size: Dict[int, float] = {}  # running mean latency per input size
+
+    def update(self, latency_ms: float, person_heights: np.ndarray, source_shape: Tuple[int, int]) -> int:
+        """Record one detector run and return the input size for the next one.
+
+        Args:
+            latency_ms: Time of the model call(s) for this frame.
+            person_heights: Heights of the detected persons in source pixels.
+            source_shape: (height, width) of the image given to the model.
+        """
+        self.runs += 1
+        self.latencies.append(latency_ms)
+        mean = self.latency_by_size.get(self.imgsz)
+        self.latency_by_size[self.imgsz] = latency_ms if mean is None else 0.9 * mean + 0.1 * latency_ms
+
+        person_heights = np.asarray(person_heights, dtype=np.float64)
+        self.smallest_scaled.append(float(person_heights.min()) / max(source_shape[:2]) if len(person_heights)
+                                    else np.inf)
+
+        if self.runs - self._last_change < self.cooldown:
+            return self.imgsz
+
+        index = self.sizes.index(self.imgsz)
+        latency = float(np.mean(self.latencies))
+        smallest = min(self.smallest_scaled, default=np.inf)
+
+        if smallest * self.imgsz < self.min_person_px and index + 1 < len(self.sizes):
+            self._change(self.sizes[index + 1], 'small persons', latency)
+        elif latency > self.budget_ms and index > 0 and smallest * self.sizes[index - 1] >= 1.5 * self.min_person_px:
+            self._change(self.sizes[index - 1], 'over budget', latency)
+        elif self.imgsz < self.initial and \
+                latency * (self.sizes[index + 1] / self.imgsz) ** 2 <= 0.8 * self.budget_ms:
+            # Inference cost grows with the pixel count; step up only with headroom left
+            self._change(self.sizes[index + 1], 'under budget', latency)
+        return self.imgsz
+
+    def _change(self, imgsz: int, reason: str, latency_ms: float) -> None:
+        self.changes.append({'run': self.runs, 'from': self.imgsz, 'to': imgsz, 'reason': reason,
+                             'latency_ms': latency_ms})
+        self.imgsz = imgsz
+        self._last_change = self.runs
+        self.latencies.clear()
+        self.smallest_scaled.clear()
+
+    def metrics(self) -> Dict:
+        """Current size, recent latency, per-size mean latency and the recent size changes."""
+        return {
+            'imgsz': self.imgsz,
+            'budget_ms': self.budget_ms,
+            'latency_ms': float(np.mean(self.latencies)) if self.latencies else None,
+            'latency_by_size': dict(sorted(self.latency_by_size.items())),
+            'changes': list(self.changes),
+        }
@@ -0,0 +1,94 @@
+"""
+Stacked track windows for scoring every track of a frame at once.
+
+The risk analysis reads the same few statistics of every track (means,
+standard deviations and linear trends over the newest samples of its
+history). Computing them track by track costs a handful of small NumPy calls
+per person per frame. TrackWindows instead gathers the ring-buffer rows of
+all tracks from the TrackStore into (tracks, history) arrays, oldest sample
+first and right-aligned, so the newest sample of every track is the last
+column and shorter tracks are padded on the left. The statistics are then
+masked reductions over those arrays, one call for all tracks.
+"""
+from typing import Sequence, Tuple
+import numpy as np
+
+from src.tracking import Track, TrackStore
+
+
+class TrackWindows:
+    """History of many tracks as right-aligned (tracks, history) arrays."""
+
+    def __init__(self, store: TrackStore, slots: Sequence[int]):
+        """
+        Args:
+            store: TrackStore holding the tracks.
+            slots: Store slot of each track, in output order.
+        """
+        slots = np.asarray(slots, dtype=np.int64).reshape(-1)
+        history = store.history
+        self.history = history
+        self.lengths = np.minimum(store.samples[slots], history)
+        # Oldest sample first: a full ring starts at the write head; shorter tracks end up right-aligned
+        index = (store.heads[slots, None] + np.arange(history)) % history
+        rows = slots[:, None]
+        self.centers = store.centers[rows, index]
+        self.bboxes = store.bboxes[rows, index]
+        self.confidences = store.confidences[rows, index]
+        self.timestamps = store.timestamps[rows, index]
+        self.velocities = store.velocities[rows, index]  # the first sample of a track has none
+        # Columns of each track's current detection, set by from_tracks()
+        self.aspect_ratio = self.area = self.in_water = self.distance_to_pool_edge = None
+
+    @classmethod
+    def from_tracks(cls, tracks: Sequence[Track]) -> 'TrackWindows':
+        """Windows of tracks sharing one TrackStore, plus columns of their current detections."""
+        windows = cls(tracks[0].store, [track.slot for track in tracks])
+        detections = [track.detection for track in tracks]
+        windows.aspect_ratio = np.array([d['aspect_ratio'] for d in detections], dtype=np.float64)
+        windows.area = np.array([d['area'] for d in detections], dtype=np.float64)
+        windows.in_water = np.array([bool(d.get('in_water', True)) for d in detections])
+        windows.distance_to_pool_edge = np.array([d.get('distance_to_pool_edge', 0) for d in detections],
+                                                 dtype=np.float64)
+        return windows
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def newest(self, count, offset: int = 0) -> np.ndarray:
+        """(tracks, history) mask of the newest `count` samples of each track.
+
+        Args:
+            count: Samples to take (scalar or per track); capped at the track length.
+            offset: Samples at the start of each track without a value (1 for velocities).
+        """
+        available = np.maximum(self.lengths - offset, 0)
+        count = np.minimum(count, available)
+        return np.arange(self.history) >= self.history - count[:, None]
+
+    def areas(self) -> np.ndarray:
+        return (self.bboxes[..., 2] - self.bboxes[..., 0]) * (self.bboxes[..., 3] - self.bboxes[..., 1])
+
+    def aspect_ratios(self) -> np.ndarray:
+        width = self.bboxes[..., 2] - self.bboxes[..., 0]
+        height = self.bboxes[..., 3] - self.bboxes[..., 1]
+        return np.divide(width, height, out=np.zeros_like(width), where=height > 0)
+
+
+def masked_mean_std(values: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise mean and population standard deviation of the masked entries (0 for empty rows)."""
+    count = np.maximum(mask.sum(axis=1), 1)
+    mean = np.where(mask, values, 0.0).sum(axis=1) / count
+    variance = np.where(mask, (values - mean[:, None]) ** 2, 0.0).sum(axis=1) / count
+    return mean, np.sqrt(variance)
+
+
+def trend(values: np.ndarray) -> np.ndarray:
+    """Least-squares slope of each row against 0, 1, ...
+
+    Same as np.polyfit(range(k), row, 1)[0] per row, up to rounding (polyfit's
+    SVD solve can be a few ulp off an exact slope).
+    """
+    k = values.shape[1]
+    x = np.arange(k) - (k - 1) / 2
+    return ((values - values.mean(axis=1, keepdims=True)) * x).sum(axis=1) / max(float((x ** 2).sum()), 1e-12)
@@ -10,7 +10,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.detections import DetectionBatch
 from src.drowning_detector_advanced import DrowningDetector
+from src.motion import MotionGate
 
 
 def draw_advanced_detection_info(frame, detection_result, show_detailed=True):
@@ -104,8 +106,43 @@ def main():
                        help='Save output video to specified path')
     parser.add_argument('--pose', action='store_true',
                        help='Enable pose estimation for enhanced detection')
+    parser.add_argument('--backend', choices=['pytorch', 'onnx', 'openvino'], default='pytorch',
+                       help='Inference backend; onnx/openvino exports are cached on disk')
+    parser.add_argument('--imgsz', type=int, default=640,
+                       help='Inference input size')
+    parser.add_argument('--model-cache', type=str, default=None,
+                       help='Directory for exported models (default ~/.cache/drowning-detector/models)')
+    parser.add_argument('--adaptive-imgsz', action='store_true',
+                       help='Adapt the input size to person sizes and the latency budget (PyTorch backend)')
+    parser.add_argument('--tiled', action='store_true',
+                       help='Run the detector on overlapping tiles of the water region (high-resolution cameras)')
+    parser.add_argument('--warmup', action='store_true',
+                       help='Warm the model up on synthetic frames before the stream starts')
+    parser.add_argument('--person-only', action='store_true',
+                       help='Only detect persons (class filter in the model call); '
+                            'implied by single-class models')
     parser.add_argument('--water-detection', action='store_true', default=True,
                        help='Enable automatic water area detection')
+    parser.add_argument('--stride', type=int, default=1,
+                       help='Run YOLO every Nth frame and Kalman-predict tracks in between')
+    parser.add_argument('--track-crops', action='store_true',
+                       help='With --stride, re-detect tracked persons in small crops between full-frame passes')
+    parser.add_argument('--water-interval', type=int, default=250,
+                       help='Frames between water mask recomputations (1 = every frame); '
+                            'lighting/scene changes always trigger a recompute')
+    parser.add_argument('--water-scale', type=float, default=1.0,
+                       help='Segment water on the frame resized by this factor (e.g. 0.5 for 1080p/4K)')
+    parser.add_argument('--pool-roi', type=str, default=None,
+                       help='JSON/YAML file with per-camera pool (and exclusion) polygons; '
+                            'replaces automatic water detection')
+    parser.add_argument('--camera-id', type=str, default=None,
+                       help='Camera name; selects the entry of the --pool-roi file')
+    parser.add_argument('--water-crop', action='store_true',
+                       help='Run YOLO only on the padded bounding box of the water area')
+    parser.add_argument('--motion-gate', action='store_true',
+                       help='Skip YOLO and water detection on static frames while no track is active')
+    parser.add_argument('--idle-interval', type=float, default=1.0,
+                       help='With --motion-gate, seconds between detector runs on an idle camera (0 = none)')
     
     args = parser.parse_args()
 
@@ -125,15 +162,44 @@ def main():
     
     # Initialize advanced detector
     detector = DrowningDetector(fps=actual_fps)
-    detector.load_model(args.model, enable_pose=args.pose)
+    detector.load_model(args.model, enable_pose=args.pose, backend=args.backend, imgsz=args.imgsz,
+                        cache_dir=args.model_cache)
+    if args.person_only:
+        detector.drowning_config['person_only'] = True
+    detector.drowning_config['detection_stride'] = max(1, args.stride)
+    detector.drowning_config['track_crop_redetection'] = args.track_crops
+    detector.water_detector.recompute_interval = args.water_interval
+    detector.water_detector.segmentation_scale = args.water_scale
+    if args.pool_roi:
+        detector.load_pool_roi(args.pool_roi, args.camera_id)
+    detector.drowning_config['water_roi_crop'] = args.water_crop
+    detector.drowning_config['adaptive_resolution'] = args.adaptive_imgsz
+    detector.drowning_config['tiled_inference'] = args.tiled
+    camera = detector.camera(args.camera_id)
+    motion_gate = MotionGate(hold_frames=int(round(actual_fps)),
+                             idle_interval=int(round(args.idle_interval * actual_fps))) if args.motion_gate else None
     
-    print(f"🤖 YOLO model: {args.model}")
+    print(f"🤖 YOLO model: {args.model} ({args.backend}, {args.imgsz}px)")
     print(f"🧠 Advanced features enabled:")
     print(f"   • Multi-person tracking: ✓")
-    print(f"   • Water area detection: {'✓' if args.water_detection else '✗'}")
+    if args.pool_roi:
+        print(f"   • Water area: fixed ROI from {args.pool_roi}" + (f" ({args.camera_id})" if args.camera_id else ""))
+    else:
+        print(f"   • Water area detection: {'✓' if args.water_detection else '✗'}")
     print(f"   • Pose estimation: {'✓' if args.pose else '✗'}")
     print(f"   • Temporal analysis: ✓")
+    print(f"   • Detection stride: every {max(1, args.stride)} frame(s)"
+          + (", track crops in between" if args.track_crops and args.stride > 1 else ""))
+    print(f"   • Person-only inference: {'✓' if detector.drowning_config['person_only'] else '✗'}")
+    print(f"   • Water-ROI cropped inference: {'✓' if args.water_crop else '✗'}")
+    print(f"   • Motion gate: {'✓' if args.motion_gate else '✗'}")
     print(f"   • Environmental context: ✓")
+
+    if args.warmup:
+        report = detector.warmup(frame_size=(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 1280,
+                                             int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 720))
+        print(f"🔥 Warm-up: {report['warmup_s']:.2f}s, first call {report['first_ms'][1]:.0f} ms, "
+              f"steady-state {report['steady_ms'][1]:.1f} ms/frame")
     print("\n🚀 Starting detection... Press 'q' to quit, 'SPACE' to pause\n")
 
     # Video writer setup
@@ -158,9 +224,17 @@ def main():
             frame_count += 1
             t0 = time.time()
             
-            # Run advanced detection
-            detections, water_mask = detector.predict_frame(frame)
-            drowning_result = detector.advanced_drowning_detection(detections, water_mask)
+            # Stream time from the container PTS (or frame index), so offline
+            # replay at full CPU speed matches live operation
+            timestamp = camera.clock.tick(cap.get(cv2.CAP_PROP_POS_MSEC))
+            
+            # Run advanced detection; an idle camera (no motion, no tracks) skips YOLO and water detection
+            if motion_gate is None or motion_gate.should_process(frame, len(camera.person_tracker.tracks)):
+                detections, water_mask = detector.predict_frame(frame, timestamp, camera_id=args.camera_id)
+            else:
+                detections, water_mask = DetectionBatch.empty(timestamp), camera.water_detector.water_mask
+            drowning_result = detector.advanced_drowning_detection(detections, water_mask, timestamp,
+                                                                   camera_id=args.camera_id)
             
             t1 = time.time()
             processing_time = (t1 - t0) * 1000
@@ -184,7 +258,9 @@ def main():
                 display_frame = draw_advanced_detection_info(frame, drowning_result, args.detailed)
                 
                 # Add performance info
-                perf_text = f"FPS: {1000/processing_time:.1f} | Frame: {frame_count} | Alerts: {drowning_alerts}"
+                perf_text = f"FPS: {1000/max(processing_time, 1e-3):.1f} | Frame: {frame_count} | Alerts: {drowning_alerts}"
+                if motion_gate is not None and motion_gate.idle:
+                    perf_text += " | IDLE"
                 cv2.putText(display_frame, perf_text, 
                            (10, display_frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
                 
@@ -235,6 +311,15 @@ def main():
             print(f"   Total frames: {frame_count}")
             print(f"   Average processing: {avg_processing_time:.2f} ms/frame")
             print(f"   Average FPS: {avg_fps:.1f}")
+            resolution = detector.resolution_metrics(args.camera_id)
+            if resolution:
+                latency = ', '.join(f"{size}px {ms:.1f} ms" for size, ms in resolution['latency_by_size'].items())
+                print(f"   Input size: {resolution['imgsz']}px after {len(resolution['changes'])} change(s) "
+                      f"(budget {resolution['budget_ms']:.1f} ms; {latency})")
+            if motion_gate is not None:
+                gate = motion_gate.metrics()
+                print(f"   Motion gate: detector ran on {gate['processed']}/{gate['frames']} frames "
+                      f"({gate['skipped_fraction'] * 100:.1f}% skipped)")
             
             print(f"\n🎯 Detection Results:")
             print(f"   Total drowning alerts: {drowning_alerts}")
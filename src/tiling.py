@@ -0,0 +1,176 @@
+"""
+Tiled inference for high-resolution cameras.
+
+Letterboxing a 4K frame down to a 640px network input leaves distant
+swimmers a few pixels tall. Tiled inference instead cuts the water region
+into overlapping tiles at (close to) native resolution, runs them through the
+model as one batch and merges the per-tile boxes back into frame coordinates.
+
+A box cut by a tile seam shows up twice: cut off in one tile and whole in the
+neighbouring one (the overlap is chosen larger than a swimmer). The merge
+therefore compares boxes by intersection over the smaller box as well as IoU,
+and prefers boxes that do not touch an inner tile edge over higher-scoring
+truncated ones. The same merge serves the crops around predicted track
+positions that are re-detected between full-frame passes (track_crops).
+"""
+import math
+from typing import Optional, Sequence, Tuple, Union
+import numpy as np
+
+
+def tile_grid(region: Tuple[int, int, int, int], tile_size: int = 640, overlap: float = 0.2) -> np.ndarray:
+    """Overlapping tiles covering `region`.
+
+    Args:
+        region: (x0, y0, x1, y1) area to cover, in frame pixels.
+        tile_size: Tile side in pixels; regions narrower than a tile get one
+            tile of the region's size along that axis.
+        overlap: Minimum overlap between neighbouring tiles, as a fraction of the tile.
+
+    Returns:
+        (T, 4) int array of xyxy tiles, row-major.
+    """
+    x0, y0, x1, y1 = (int(v) for v in region)
+
+    def _starts(lo: int, hi: int) -> Tuple[np.ndarray, int]:
+        length = hi - lo
+        if length <= tile_size:
+            return np.array([lo]), length
+        step = tile_size * (1.0 - overlap)
+        count = math.ceil((length - tile_size) / step) + 1
+        return np.round(np.linspace(lo, hi - tile_size, count)).astype(np.int64), tile_size
+
+    xs, width = _starts(x0, x1)
+    ys, height = _starts(y0, y1)
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    starts = np.stack([grid_x.ravel(), grid_y.ravel()], axis=1)
+    return np.concatenate([starts, starts + [width, height]], axis=1)
+
+
+class TileLayout:
+    """Tiles of one camera, computed once per frame size and water region."""
+
+    def __init__(self, frame_shape: Tuple[int, ...], region: Optional[Tuple[int, int, int, int]] = None,
+                 tile_size: int = 640, overlap: float = 0.2, water_mask: Optional[np.ndarray] = None,
+                 min_water_fraction: float = 0.01):
+        """
+        Args:
+            frame_shape: Shape of the camera frames.
+            region: Area to tile (e.g. the padded water bounding box); whole frame if None.
+            tile_size, overlap: See tile_grid().
+            water_mask: If given, tiles with less than `min_water_fraction` water are dropped.
+        """
+        height, width = frame_shape[:2]
+        self.region = tuple(int(v) for v in region) if region is not None else (0, 0, width, height)
+        self.key = (tuple(frame_shape[:2]), self.region, tile_size, overlap)
+        self.tiles = tile_grid(self.region, tile_size, overlap)
+        if water_mask is not None and len(self.tiles) > 1:
+            water = np.array([np.count_nonzero(water_mask[ty0:ty1, tx0:tx1]) / max(1, (tx1 - tx0) * (ty1 - ty0))
+                              for tx0, ty0, tx1, ty1 in self.tiles.tolist()])
+            if (water >= min_water_fraction).any():
+                self.tiles = self.tiles[water >= min_water_fraction]
+
+    def matches(self, frame_shape: Tuple[int, ...], region: Optional[Tuple[int, int, int, int]],
+                tile_size: int, overlap: float) -> bool:
+        """Whether this layout is the one for these settings (the region None = whole frame)."""
+        height, width = frame_shape[:2]
+        region = tuple(int(v) for v in region) if region is not None else (0, 0, width, height)
+        return self.key == ((height, width), region, tile_size, overlap)
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def crops(self, frame: np.ndarray):
+        """Contiguous tile images of a frame, in layout order."""
+        return [np.ascontiguousarray(frame[y0:y1, x0:x1]) for x0, y0, x1, y1 in self.tiles.tolist()]
+
+
+def track_crops(boxes: np.ndarray, frame_shape: Tuple[int, ...], scale: float = 2.5,
+                min_size: int = 96) -> np.ndarray:
+    """Square crops around (predicted) person boxes for re-detection between full-frame passes.
+
+    Args:
+        boxes: (N, 4) xyxy boxes in frame pixels.
+        frame_shape: Shape of the frame the crops are cut from.
+        scale: Crop side as a multiple of the larger box side, leaving room for motion.
+        min_size: Smallest crop side in pixels.
+
+    Returns:
+        (N, 4) int xyxy crops, shifted (not shrunk) to stay inside the frame where possible.
+    """
+    height, width = frame_shape[:2]
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    sides = np.maximum(np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]) * scale, min_size)
+    sides = np.minimum(np.round(sides), min(width, height)).astype(np.int64)
+    x0 = np.clip(np.round(centers[:, 0] - sides / 2).astype(np.int64), 0, width - sides)
+    y0 = np.clip(np.round(centers[:, 1] - sides / 2).astype(np.int64), 0, height - sides)
+    return np.stack([x0, y0, x0 + sides, y0 + sides], axis=1)
+
+
+def merge_tile_detections(detections: Sequence[np.ndarray], offsets: Sequence[Tuple[int, int]],
+                          tile_shapes: Sequence[Optional[Tuple[int, int]]] = None, iou_threshold: float = 0.5,
+                          ios_threshold: float = 0.7, edge_margin: float = 2.0,
+                          return_index: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """Merge per-tile YOLO detections into one set of frame detections.
+
+    Args:
+        detections: Per tile, an (N, 6) array of xyxy, score, class in tile pixels.
+        offsets: (x, y) of each tile in the frame.
+        tile_shapes: (height, width) of each tile, used to find boxes cut by an
+            inner tile edge; None entries (e.g. a whole-frame pass) are never truncated.
+        iou_threshold: Same-class boxes overlapping more than this are duplicates.
+        ios_threshold: ... as are boxes whose intersection covers this fraction of the smaller one.
+        edge_margin: Distance in pixels from a tile edge that counts as touching it.
+        return_index: Also return the row of each merged box in the concatenated
+            inputs, to carry per-box data such as keypoints along.
+
+    Returns:
+        (M, 6) array in frame pixels, best first, and with return_index the (M,)
+        input rows.
+    """
+    parts, truncated = [], []
+    tile_shapes = tile_shapes if tile_shapes is not None else [None] * len(detections)
+    for data, (x0, y0), shape in zip(detections, offsets, tile_shapes):
+        data = np.asarray(data, dtype=np.float64).reshape(-1, 6)
+        cut = np.zeros(len(data), dtype=bool)
+        if shape is not None:
+            height, width = shape
+            cut = ((data[:, 0] <= edge_margin) | (data[:, 1] <= edge_margin) |
+                   (data[:, 2] >= width - edge_margin) | (data[:, 3] >= height - edge_margin))
+        parts.append(data + [x0, y0, x0, y0, 0, 0])
+        truncated.append(cut)
+    if not parts:
+        parts, truncated = [np.zeros((0, 6))], [np.zeros(0, dtype=bool)]
+    data = np.concatenate(parts)
+    truncated = np.concatenate(truncated)
+    if len(data) == 0:
+        return (data, np.zeros(0, dtype=np.int64)) if return_index else data
+
+    # Whole boxes first, then by score. Truncated boxes without a whole duplicate are kept.
+    order = np.lexsort((-data[:, 4], truncated))
+    boxes = data[:, :4]
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+
+    keep = []
+    suppressed = np.zeros(len(data), dtype=bool)
+    for i in order.tolist():
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        others = order[~suppressed[order]]
+        box, rest = boxes[i], boxes[others]
+        inter_w = np.clip(np.minimum(box[2], rest[:, 2]) - np.maximum(box[0], rest[:, 0]), 0, None)
+        inter_h = np.clip(np.minimum(box[3], rest[:, 3]) - np.maximum(box[1], rest[:, 1]), 0, None)
+        intersection = inter_w * inter_h
+        union = areas[i] + areas[others] - intersection
+        smaller = np.minimum(areas[i], areas[others])
+        iou = np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+        ios = np.where(smaller > 0, intersection / np.maximum(smaller, 1e-9), 0.0)
+        duplicate = (data[others, 5] == data[i, 5]) & ((iou > iou_threshold) | (ios > ios_threshold))
+        suppressed[others[duplicate]] = True
+        suppressed[i] = True
+
+    keep = np.asarray(keep, dtype=np.int64)
+    keep = keep[np.argsort(-data[keep, 4], kind='stable')]
+    return (data[keep], keep) if return_index else data[keep]
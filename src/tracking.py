@@ -0,0 +1,667 @@
+"""
+Multi-person tracking shared by the drowning detectors.
+
+Detections are associated with existing tracks by solving a single global
+assignment problem per frame over a NumPy cost matrix, instead of matching
+each detection greedily against every track in Python. Track histories live
+in preallocated NumPy ring buffers (TrackStore) indexed by track slot.
+"""
+from typing import List, Dict, Tuple, Optional, Sequence, Union
+import numpy as np
+import math
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from src.detections import DetectionBatch
+
+
+# Cost given to pairs rejected by the gate. Large enough that the solver never
+# prefers it over a valid pair, finite so linear_sum_assignment accepts it.
+GATED_COST = 1e6
+
+# Cost of leaving a track or detection unmatched in the sparse solver. Half of
+# GATED_COST so a matched pair is always preferred over two unmatched nodes.
+UNMATCHED_COST = GATED_COST / 2
+
+
+def pairwise_distances(track_centers: np.ndarray, det_centers: np.ndarray) -> np.ndarray:
+    """Euclidean distance between every track centre and every detection centre.
+
+    Returns:
+        Array of shape (num_tracks, num_detections).
+    """
+    diff = track_centers[:, None, :] - det_centers[None, :, :]
+    return np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+
+
+def pairwise_iou(track_boxes: np.ndarray, det_boxes: np.ndarray) -> np.ndarray:
+    """IoU between every track box and every detection box (xyxy format).
+
+    Returns:
+        Array of shape (num_tracks, num_detections).
+    """
+    tx1, ty1, tx2, ty2 = (track_boxes[:, i:i + 1] for i in range(4))
+    dx1, dy1, dx2, dy2 = (det_boxes[:, i] for i in range(4))
+
+    inter_w = np.clip(np.minimum(tx2, dx2) - np.maximum(tx1, dx1), 0, None)
+    inter_h = np.clip(np.minimum(ty2, dy2) - np.maximum(ty1, dy1), 0, None)
+    intersection = inter_w * inter_h
+
+    track_area = (tx2 - tx1) * (ty2 - ty1)
+    det_area = (dx2 - dx1) * (dy2 - dy1)
+    union = track_area + det_area - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+def build_cost_matrix(track_centers: np.ndarray, det_centers: np.ndarray,
+                      track_boxes: np.ndarray = None, det_boxes: np.ndarray = None,
+                      metric: str = 'distance', max_distance: float = 50.0,
+                      min_iou: float = 0.1) -> np.ndarray:
+    """Build the gated track/detection cost matrix for one frame.
+
+    Args:
+        track_centers: (T, 2) last known track centres.
+        det_centers: (D, 2) detection centres.
+        track_boxes: (T, 4) last known track boxes, required for metric='iou'.
+        det_boxes: (D, 4) detection boxes, required for metric='iou'.
+        metric: 'distance' (centre distance in pixels) or 'iou' (1 - IoU).
+        max_distance: Pairs further apart than this are never matched.
+        min_iou: With metric='iou', pairs overlapping less than this are never matched.
+
+    Returns:
+        (T, D) cost matrix where gated pairs hold GATED_COST.
+    """
+    distances = pairwise_distances(track_centers, det_centers)
+
+    if metric == 'distance':
+        cost = distances
+        gate = distances < max_distance
+    elif metric == 'iou':
+        if track_boxes is None or det_boxes is None:
+            raise ValueError("IoU matching requires track and detection boxes")
+        iou = pairwise_iou(track_boxes, det_boxes)
+        cost = 1.0 - iou
+        gate = (iou >= min_iou) & (distances < max_distance)
+    else:
+        raise ValueError(f"Unknown matching metric: {metric}")
+
+    return np.where(gate, cost, GATED_COST)
+
+
+def solve_assignment(cost: np.ndarray) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    """Solve the global assignment for a gated cost matrix.
+
+    Returns:
+        Tuple of (matches as (track_index, detection_index) pairs,
+        unmatched detection indices, unmatched track indices).
+    """
+    num_tracks, num_dets = cost.shape
+    if num_tracks == 0 or num_dets == 0:
+        return [], list(range(num_dets)), list(range(num_tracks))
+
+    rows, cols = linear_sum_assignment(cost)
+    valid = cost[rows, cols] < GATED_COST
+    matches = list(zip(rows[valid].tolist(), cols[valid].tolist()))
+
+    matched_tracks = set(rows[valid].tolist())
+    matched_dets = set(cols[valid].tolist())
+    unmatched_dets = [d for d in range(num_dets) if d not in matched_dets]
+    unmatched_tracks = [t for t in range(num_tracks) if t not in matched_tracks]
+    return matches, unmatched_dets, unmatched_tracks
+
+
+def pair_costs(track_centers: np.ndarray, det_centers: np.ndarray,
+               track_idx: np.ndarray, det_idx: np.ndarray,
+               track_boxes: np.ndarray = None, det_boxes: np.ndarray = None,
+               metric: str = 'distance', max_distance: float = 50.0,
+               min_iou: float = 0.1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gated costs for an explicit list of candidate (track, detection) pairs.
+
+    Same metrics and gating as build_cost_matrix, but only the given pairs are
+    evaluated. Pairs rejected by the gate are dropped from the result.
+
+    Returns:
+        Tuple of (track_idx, det_idx, cost) for the pairs that pass the gate.
+    """
+    diff = track_centers[track_idx] - det_centers[det_idx]
+    distances = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+
+    if metric == 'distance':
+        cost = distances
+        gate = distances < max_distance
+    elif metric == 'iou':
+        if track_boxes is None or det_boxes is None:
+            raise ValueError("IoU matching requires track and detection boxes")
+        tb, db = track_boxes[track_idx], det_boxes[det_idx]
+        inter_w = np.clip(np.minimum(tb[:, 2], db[:, 2]) - np.maximum(tb[:, 0], db[:, 0]), 0, None)
+        inter_h = np.clip(np.minimum(tb[:, 3], db[:, 3]) - np.maximum(tb[:, 1], db[:, 1]), 0, None)
+        intersection = inter_w * inter_h
+        union = ((tb[:, 2] - tb[:, 0]) * (tb[:, 3] - tb[:, 1]) +
+                 (db[:, 2] - db[:, 0]) * (db[:, 3] - db[:, 1]) - intersection)
+        iou = np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+        cost = 1.0 - iou
+        gate = (iou >= min_iou) & (distances < max_distance)
+    else:
+        raise ValueError(f"Unknown matching metric: {metric}")
+
+    return track_idx[gate], det_idx[gate], cost[gate]
+
+
+def grid_candidate_pairs(track_centers: np.ndarray, det_centers: np.ndarray,
+                         cell_size: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Candidate (track, detection) pairs from a uniform grid over track centres.
+
+    Track centres are bucketed into square cells of `cell_size` pixels. Each
+    detection is paired only with tracks in its own and the eight neighbouring
+    cells, which contains every track within `cell_size` of it. The lookup is
+    a sort plus searchsorted per neighbour offset, so it stays vectorized.
+
+    Returns:
+        Tuple of (track_idx, det_idx) integer arrays.
+    """
+    track_cells = np.floor(track_centers / cell_size).astype(np.int64)
+    det_cells = np.floor(det_centers / cell_size).astype(np.int64)
+
+    # Pack (cx, cy) into one sortable int64 key
+    offset = 1 << 31
+    track_keys = ((track_cells[:, 0] + offset) << 32) | (track_cells[:, 1] + offset)
+    order = np.argsort(track_keys, kind='stable')
+    sorted_keys = track_keys[order]
+
+    track_parts, det_parts = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            keys = ((det_cells[:, 0] + dx + offset) << 32) | (det_cells[:, 1] + dy + offset)
+            lo = np.searchsorted(sorted_keys, keys, side='left')
+            hi = np.searchsorted(sorted_keys, keys, side='right')
+            counts = hi - lo
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            det_idx = np.repeat(np.arange(len(keys)), counts)
+            # Position of each pair within its detection's run of tracks
+            run_start = np.repeat(np.cumsum(counts) - counts, counts)
+            track_pos = np.repeat(lo, counts) + (np.arange(total) - run_start)
+            track_parts.append(order[track_pos])
+            det_parts.append(det_idx)
+
+    if not track_parts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(track_parts), np.concatenate(det_parts)
+
+
+def solve_sparse_assignment(num_tracks: int, num_dets: int, track_idx: np.ndarray,
+                            det_idx: np.ndarray, cost: np.ndarray
+                            ) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    """Global assignment over a sparse set of gated candidate pairs.
+
+    Every track gets a private "unmatched" detection and every detection a
+    private "unmatched" track, each costing UNMATCHED_COST, so a full matching
+    always exists and scipy's sparse LAPJV solver can be used. The result equals
+    solving the full gated cost matrix, without ever building it.
+
+    Returns:
+        Same as solve_assignment.
+    """
+    matches = []
+    if len(cost):
+        track_range = np.arange(num_tracks)
+        det_range = np.arange(num_dets)
+        # Costs are shifted by +1 so that no real edge has weight zero
+        rows = np.concatenate([track_idx, track_range, num_tracks + det_range, num_tracks + det_idx])
+        cols = np.concatenate([det_idx, num_dets + track_range, det_range, num_dets + track_idx])
+        weights = np.concatenate([cost + 1.0, np.full(num_tracks, UNMATCHED_COST),
+                                  np.full(num_dets, UNMATCHED_COST), np.ones(len(cost))])
+        graph = csr_matrix((weights, (rows, cols)), shape=(num_tracks + num_dets,) * 2)
+        row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+        real = (row_ind < num_tracks) & (col_ind < num_dets)
+        matches = list(zip(row_ind[real].tolist(), col_ind[real].tolist()))
+
+    matched_tracks = {t for t, _ in matches}
+    matched_dets = {d for _, d in matches}
+    unmatched_dets = [d for d in range(num_dets) if d not in matched_dets]
+    unmatched_tracks = [t for t in range(num_tracks) if t not in matched_tracks]
+    return matches, unmatched_dets, unmatched_tracks
+
+
+def match_detections(track_centers: np.ndarray, det_centers: np.ndarray,
+                     track_boxes: np.ndarray = None, det_boxes: np.ndarray = None,
+                     metric: str = 'distance', max_distance: float = 50.0,
+                     min_iou: float = 0.1, use_spatial_index: bool = True
+                     ) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    """Match detections to tracks for one frame.
+
+    Args:
+        use_spatial_index: Compare each detection only with tracks in neighbouring
+            grid cells (cell size = max_distance) instead of with every track.
+        Other arguments as for build_cost_matrix.
+
+    Returns:
+        Same as solve_assignment.
+    """
+    if not use_spatial_index:
+        cost = build_cost_matrix(track_centers, det_centers, track_boxes, det_boxes,
+                                 metric=metric, max_distance=max_distance, min_iou=min_iou)
+        return solve_assignment(cost)
+
+    track_idx, det_idx = grid_candidate_pairs(track_centers, det_centers, max_distance)
+    track_idx, det_idx, cost = pair_costs(track_centers, det_centers, track_idx, det_idx,
+                                          track_boxes, det_boxes, metric=metric,
+                                          max_distance=max_distance, min_iou=min_iou)
+    return solve_sparse_assignment(len(track_centers), len(det_centers), track_idx, det_idx, cost)
+
+
+class TrackStore:
+    """Columnar ring-buffer storage for the history of every live track.
+
+    Each track owns one slot (row) in a set of preallocated arrays. Appending a
+    sample writes one row position and derives velocity and acceleration from
+    the previous sample, so updates are O(1) and per-track memory is fixed.
+
+    Every slot also carries a constant-velocity Kalman filter over
+    [x, y, vx, vy] (pixels, pixels/second), predicted and corrected for many
+    slots at once.
+    """
+
+    def __init__(self, capacity: int = 64, history: int = 50,
+                 process_noise: float = 300.0, measurement_noise: float = 5.0):
+        """
+        Args:
+            capacity: Initial number of track slots; grows on demand.
+            history: Samples kept per track.
+            process_noise: Std of unmodelled acceleration, pixels/second^2.
+            measurement_noise: Std of detection centre error, pixels.
+        """
+        self.history = history
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.capacity = 0
+        self.centers = np.zeros((0, history, 2))
+        self.bboxes = np.zeros((0, history, 4))
+        self.confidences = np.zeros((0, history))
+        self.timestamps = np.zeros((0, history))
+        self.velocities = np.zeros((0, history))
+        self.accelerations = np.zeros((0, history))
+        self.predicted = np.zeros((0, history), dtype=bool)  # sample came from the Kalman filter
+        self.kf_state = np.zeros((0, 4))
+        self.kf_cov = np.zeros((0, 4, 4))
+        self.kf_time = np.zeros(0)
+        self.heads = np.zeros(0, dtype=np.int64)    # next write position per slot
+        self.samples = np.zeros(0, dtype=np.int64)  # total samples appended per slot
+        self._free_slots = []
+        self._grow(capacity)
+
+    def _grow(self, capacity: int) -> None:
+        """Enlarge every column to hold `capacity` slots."""
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        h = self.history
+        self.centers = np.concatenate([self.centers, np.zeros((extra, h, 2))])
+        self.bboxes = np.concatenate([self.bboxes, np.zeros((extra, h, 4))])
+        self.confidences = np.concatenate([self.confidences, np.zeros((extra, h))])
+        self.timestamps = np.concatenate([self.timestamps, np.zeros((extra, h))])
+        self.velocities = np.concatenate([self.velocities, np.zeros((extra, h))])
+        self.accelerations = np.concatenate([self.accelerations, np.zeros((extra, h))])
+        self.predicted = np.concatenate([self.predicted, np.zeros((extra, h), dtype=bool)])
+        self.kf_state = np.concatenate([self.kf_state, np.zeros((extra, 4))])
+        self.kf_cov = np.concatenate([self.kf_cov, np.zeros((extra, 4, 4))])
+        self.kf_time = np.concatenate([self.kf_time, np.zeros(extra)])
+        self.heads = np.concatenate([self.heads, np.zeros(extra, dtype=np.int64)])
+        self.samples = np.concatenate([self.samples, np.zeros(extra, dtype=np.int64)])
+        self._free_slots.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def allocate(self) -> int:
+        """Reserve an empty slot for a new track."""
+        if not self._free_slots:
+            self._grow(max(1, self.capacity * 2))
+        slot = self._free_slots.pop()
+        self.heads[slot] = 0
+        self.samples[slot] = 0
+        return slot
+
+    def release(self, slot: int) -> None:
+        """Return a slot to the free list."""
+        self._free_slots.append(slot)
+
+    def append(self, slot: int, center, bbox, confidence: float, timestamp: float,
+               predicted: bool = False) -> None:
+        """Append one sample to a track and update its derived motion columns."""
+        head = self.heads[slot]
+        prev = (head - 1) % self.history
+        self.centers[slot, head] = center
+        self.bboxes[slot, head] = bbox
+        self.confidences[slot, head] = confidence
+        self.timestamps[slot, head] = timestamp
+        self.predicted[slot, head] = predicted
+
+        samples = self.samples[slot]
+        if samples >= 1:
+            dx = self.centers[slot, head, 0] - self.centers[slot, prev, 0]
+            dy = self.centers[slot, head, 1] - self.centers[slot, prev, 1]
+            self.velocities[slot, head] = math.hypot(dx, dy)
+        if samples >= 2:
+            self.accelerations[slot, head] = self.velocities[slot, head] - self.velocities[slot, prev]
+
+        self.heads[slot] = (head + 1) % self.history
+        self.samples[slot] = samples + 1
+
+    def append_many(self, slots: np.ndarray, centers: np.ndarray, bboxes: np.ndarray,
+                    confidences: np.ndarray, timestamp: float, predicted: bool = False) -> None:
+        """Vectorized append() of one sample to each of `slots` (all distinct)."""
+        slots = np.asarray(slots, dtype=np.int64)
+        if len(slots) == 0:
+            return
+        heads = self.heads[slots]
+        prev = (heads - 1) % self.history
+        self.centers[slots, heads] = centers
+        self.bboxes[slots, heads] = bboxes
+        self.confidences[slots, heads] = confidences
+        self.timestamps[slots, heads] = timestamp
+        self.predicted[slots, heads] = predicted
+
+        samples = self.samples[slots]
+        step = self.centers[slots, heads] - self.centers[slots, prev]
+        velocities = np.where(samples >= 1, np.hypot(step[:, 0], step[:, 1]), 0.0)
+        self.velocities[slots, heads] = velocities
+        self.accelerations[slots, heads] = np.where(samples >= 2, velocities - self.velocities[slots, prev], 0.0)
+
+        self.heads[slots] = (heads + 1) % self.history
+        self.samples[slots] = samples + 1
+
+    def length(self, slot: int) -> int:
+        """Number of samples currently held for a slot."""
+        return int(min(self.samples[slot], self.history))
+
+    def window(self, column: np.ndarray, slot: int, count: int) -> np.ndarray:
+        """Return the newest `count` entries of a column in chronological order."""
+        if count <= 0:
+            return column[slot, :0]
+        idx = (self.heads[slot] - count + np.arange(count)) % self.history
+        return column[slot, idx]
+
+    def last_centers(self, slots: np.ndarray) -> np.ndarray:
+        """Most recent centre of each slot, shape (len(slots), 2)."""
+        return self.centers[slots, (self.heads[slots] - 1) % self.history]
+
+    def last_bboxes(self, slots: np.ndarray) -> np.ndarray:
+        """Most recent box of each slot, shape (len(slots), 4)."""
+        return self.bboxes[slots, (self.heads[slots] - 1) % self.history]
+
+    def last_predicted(self, slots: np.ndarray) -> np.ndarray:
+        """Whether the most recent sample of each slot came from the Kalman filter."""
+        return self.predicted[slots, (self.heads[slots] - 1) % self.history]
+
+    def kalman_init(self, slot: int, center, timestamp: float) -> None:
+        """Start a slot's filter at a measured centre with unknown velocity."""
+        self.kf_state[slot] = [center[0], center[1], 0.0, 0.0]
+        r = self.measurement_noise ** 2
+        v = (4 * self.process_noise) ** 2  # velocity is unknown at track birth
+        self.kf_cov[slot] = np.diag([r, r, v, v])
+        self.kf_time[slot] = timestamp
+
+    def kalman_predict(self, slots: np.ndarray, timestamp: float) -> np.ndarray:
+        """Advance the filters of `slots` to `timestamp` and return predicted centres.
+
+        Safe to call repeatedly for the same timestamp; a zero time step is a no-op.
+        """
+        dt = np.maximum(timestamp - self.kf_time[slots], 0.0)
+        n = len(slots)
+
+        F = np.tile(np.eye(4), (n, 1, 1))
+        F[:, 0, 2] = dt
+        F[:, 1, 3] = dt
+
+        # Discrete white-noise acceleration model
+        q = self.process_noise ** 2
+        dt2, dt3, dt4 = dt ** 2, dt ** 3, dt ** 4
+        Q = np.zeros((n, 4, 4))
+        Q[:, 0, 0] = Q[:, 1, 1] = dt4 / 4 * q
+        Q[:, 0, 2] = Q[:, 2, 0] = Q[:, 1, 3] = Q[:, 3, 1] = dt3 / 2 * q
+        Q[:, 2, 2] = Q[:, 3, 3] = dt2 * q
+
+        self.kf_state[slots] = np.einsum('nij,nj->ni', F, self.kf_state[slots])
+        self.kf_cov[slots] = F @ self.kf_cov[slots] @ F.transpose(0, 2, 1) + Q
+        self.kf_time[slots] = np.maximum(self.kf_time[slots], timestamp)
+        return self.kf_state[slots, :2]
+
+    def kalman_update(self, slots: np.ndarray, centers: np.ndarray) -> None:
+        """Correct the filters of `slots` with measured centres, shape (len(slots), 2)."""
+        P = self.kf_cov[slots]
+        # H selects the position components, so H P H^T is the top-left 2x2 block
+        S = P[:, :2, :2] + np.eye(2) * self.measurement_noise ** 2
+        K = P[:, :, :2] @ np.linalg.inv(S)
+        innovation = centers - self.kf_state[slots, :2]
+        self.kf_state[slots] += np.einsum('nij,nj->ni', K, innovation)
+        self.kf_cov[slots] = P - K @ P[:, :2, :]
+
+
+class Track:
+    """View of one track's history inside a TrackStore.
+
+    History columns are returned oldest-first as NumPy arrays. Only the most
+    recent detection dict is kept, for fields such as pose and water context.
+    """
+
+    __slots__ = ('store', 'slot', 'track_id', 'detection', 'last_seen', 'created_at')
+
+    def __init__(self, store: TrackStore, slot: int, track_id: int, detection: Dict, timestamp: float):
+        self.store = store
+        self.slot = slot
+        self.track_id = track_id
+        self.detection = detection
+        self.last_seen = timestamp
+        self.created_at = timestamp
+
+    @classmethod
+    def from_detection(cls, detection: Dict, timestamp: Optional[float] = None) -> 'Track':
+        """Build a standalone single-sample track, e.g. for legacy per-detection analysis."""
+        timestamp = detection.get('timestamp', 0.0) if timestamp is None else timestamp
+        store = TrackStore(capacity=1)
+        track = cls(store, store.allocate(), 0, detection, timestamp)
+        track.append(detection, timestamp)
+        return track
+
+    def append(self, detection: Dict, timestamp: float) -> None:
+        self.store.append(self.slot, detection['center'], detection['bbox'],
+                          detection['confidence'], timestamp)
+        self.detection = detection
+        self.last_seen = timestamp
+
+    def append_prediction(self, detection: Dict, timestamp: float) -> None:
+        """Append a Kalman-predicted sample. Does not count as the track being seen."""
+        self.store.append(self.slot, detection['center'], detection['bbox'],
+                          detection['confidence'], timestamp, predicted=True)
+        self.detection = detection
+
+    def __len__(self) -> int:
+        return self.store.length(self.slot)
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.store.window(self.store.centers, self.slot, len(self))
+
+    @property
+    def bboxes(self) -> np.ndarray:
+        return self.store.window(self.store.bboxes, self.slot, len(self))
+
+    @property
+    def confidences(self) -> np.ndarray:
+        return self.store.window(self.store.confidences, self.slot, len(self))
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.store.window(self.store.timestamps, self.slot, len(self))
+
+    @property
+    def velocities(self) -> np.ndarray:
+        return self.store.window(self.store.velocities, self.slot, len(self) - 1)
+
+    @property
+    def accelerations(self) -> np.ndarray:
+        return self.store.window(self.store.accelerations, self.slot, len(self) - 2)
+
+    @property
+    def predicted(self) -> np.ndarray:
+        return self.store.window(self.store.predicted, self.slot, len(self))
+
+    @property
+    def areas(self) -> np.ndarray:
+        boxes = self.bboxes
+        return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    @property
+    def aspect_ratios(self) -> np.ndarray:
+        boxes = self.bboxes
+        width = boxes[:, 2] - boxes[:, 0]
+        height = boxes[:, 3] - boxes[:, 1]
+        return np.divide(width, height, out=np.zeros_like(width), where=height > 0)
+
+
+class PersonTracker:
+    """Advanced person tracking for multi-person drowning detection."""
+
+    def __init__(self, max_tracking_distance: float = 50.0, max_tracking_frames: int = 30,
+                 match_metric: str = 'distance', min_match_iou: float = 0.1,
+                 history: int = 50, fps: float = 25.0, use_spatial_index: bool = True,
+                 spatial_index_min_pairs: int = 20000, process_noise: float = 300.0,
+                 measurement_noise: float = 5.0):
+        """
+        Args:
+            max_tracking_distance: Maximum centre distance (pixels) for a detection to continue a track.
+            max_tracking_frames: Frames a track may go unseen before it is dropped.
+            match_metric: 'distance' to match on centre distance, 'iou' to match on box overlap.
+            min_match_iou: Minimum IoU for a match when match_metric is 'iou'.
+            history: Samples of history kept per track.
+            fps: Frame rate of the stream, used to convert max_tracking_frames to stream time.
+            use_spatial_index: Use a uniform grid over track centres so each detection is
+                only compared with nearby tracks. Results are identical to brute force.
+            spatial_index_min_pairs: Below this many track/detection pairs the dense
+                cost matrix is cheaper than the grid, so it is used instead.
+            process_noise: Kalman process noise, see TrackStore.
+            measurement_noise: Kalman measurement noise, see TrackStore.
+        """
+        self.tracks = {}  # track_id -> Track
+        self.store = TrackStore(history=history, process_noise=process_noise,
+                                measurement_noise=measurement_noise)
+        self.next_track_id = 1
+        self.max_tracking_distance = max_tracking_distance
+        self.max_tracking_frames = max_tracking_frames
+        self.match_metric = match_metric
+        self.min_match_iou = min_match_iou
+        self.fps = fps
+        self.use_spatial_index = use_spatial_index
+        self.spatial_index_min_pairs = spatial_index_min_pairs
+        self.current_time = None  # stream time of the last update
+
+    def update_tracks(self, detections: Union[DetectionBatch, Sequence[Dict]],
+                      timestamp: Optional[float] = None) -> Dict[int, Track]:
+        """Update person tracks with new detections.
+
+        Args:
+            detections: Detections of the current frame, as a DetectionBatch or a
+                list of detection dicts.
+            timestamp: Stream time of the frame in seconds. If None, the frame is
+                assumed to follow the previous update by one frame interval.
+        """
+        batch = DetectionBatch.from_dicts(detections)
+        if timestamp is None:
+            timestamp = 0.0 if self.current_time is None else self.current_time + 1.0 / self.fps
+        # More than one frame interval since the last update: the caller skipped frames
+        skipped = self.current_time is not None and timestamp - self.current_time > 1.5 / self.fps
+        current_time = self.current_time = timestamp
+
+        # Remove old tracks
+        max_unseen_time = self.max_tracking_frames / self.fps
+        tracks_to_remove = []
+        for track_id, track in self.tracks.items():
+            if current_time - track.last_seen > max_unseen_time:
+                tracks_to_remove.append(track_id)
+
+        for track_id in tracks_to_remove:
+            self.store.release(self.tracks.pop(track_id).slot)
+
+        persons = batch.class_ids == 0  # Only track persons
+
+        # Detections synthesized by predict_detections() continue their own track
+        predicted = np.flatnonzero(persons & batch.predicted & np.isin(batch.track_ids, list(self.tracks)))
+        predicted_ids = set(batch.track_ids[predicted].tolist())
+        measured = np.flatnonzero(persons & ~batch.predicted)
+
+        # Match detections to the track positions with one global assignment. Tracks
+        # bridged over skipped frames are matched at their Kalman prediction, the
+        # others at their last centre, as before the filter existed.
+        track_list = [t for t in self.tracks.values() if t.track_id not in predicted_ids]
+        if track_list and len(measured):
+            slots = np.array([t.slot for t in track_list])
+            predicted_centers = self.store.kalman_predict(slots, current_time)
+            last_centers = self.store.last_centers(slots)
+            bridged = self.store.last_predicted(slots) | skipped
+            centers = np.where(bridged[:, None], predicted_centers, last_centers)
+            shift = centers - last_centers
+            matches, unmatched, _ = match_detections(
+                centers,
+                batch.centers[measured],
+                track_boxes=self.store.last_bboxes(slots) + np.tile(shift, 2),
+                det_boxes=batch.boxes[measured],
+                metric=self.match_metric,
+                max_distance=self.max_tracking_distance,
+                min_iou=self.min_match_iou,
+                use_spatial_index=(self.use_spatial_index and
+                                   len(track_list) * len(measured) >= self.spatial_index_min_pairs),
+            )
+        else:
+            matches, unmatched = [], list(range(len(measured)))
+
+        if matches:
+            matched_slots = np.array([track_list[t].slot for t, _ in matches])
+            rows = measured[[d for _, d in matches]]
+            self.store.append_many(matched_slots, batch.centers[rows], batch.boxes[rows],
+                                   batch.confidences[rows], current_time)
+            self.store.kalman_update(matched_slots, batch.centers[rows])
+            for (track_index, _), row in zip(matches, rows.tolist()):
+                track = track_list[track_index]
+                track.detection = batch[row]
+                track.last_seen = current_time
+
+        for row in predicted.tolist():
+            self.tracks[int(batch.track_ids[row])].append_prediction(batch[row], current_time)
+
+        # Create new tracks for unmatched detections
+        for det_index in unmatched:
+            detection = batch[int(measured[det_index])]
+            track_id = self.next_track_id
+            self.next_track_id += 1
+
+            track = Track(self.store, self.store.allocate(), track_id, detection, current_time)
+            track.append(detection, current_time)
+            self.store.kalman_init(track.slot, detection['center'], current_time)
+            self.tracks[track_id] = track
+
+        return self.tracks
+
+    def predict_detections(self, timestamp: float) -> DetectionBatch:
+        """Synthesize detections for every live track at `timestamp` from its Kalman filter.
+
+        Used on frames where the detector is skipped. Each row copies the track's
+        latest detection moved to the predicted centre, flagged as predicted with
+        the owning track id so update_tracks() extends that track instead of
+        matching it.
+        """
+        track_list = list(self.tracks.values())
+        if not track_list:
+            return DetectionBatch.empty(timestamp)
+
+        slots = np.array([t.slot for t in track_list])
+        centers = self.store.kalman_predict(slots, timestamp)
+        shifts = centers - self.store.last_centers(slots)
+
+        batch = DetectionBatch.from_dicts([t.detection for t in track_list], timestamp)
+        batch.boxes = self.store.last_bboxes(slots) + np.tile(shifts, 2)  # same size, so derived sizes hold
+        batch.centers = centers.copy()
+        batch.predicted[:] = True
+        batch.track_ids = np.array([t.track_id for t in track_list], dtype=np.int64)
+        return batch
@@ -0,0 +1,394 @@
+"""
+Water / pool area detection shared by the drowning detectors.
+
+Pool cameras are fixed, so the water mask is cached and only recomputed on a
+configurable frame interval or when a cheap downscaled frame-difference test
+detects a lighting or scene change. Each mask update also builds a
+distance-transform map, so pool-edge distance and in-water checks for every
+detection in a frame are plain array lookups.
+
+Water colours are classified with an HSV conversion plus one inRange pass per
+(per-camera configurable) range. For large frames the segmentation can run on a
+downscaled frame (segmentation_scale), with the pool contour scaled back to
+full resolution.
+
+For fixed installations the pool can instead be given as hand-drawn polygons
+per camera (see load_pool_roi_config). The HSV segmentation is then skipped
+entirely and the mask is only rasterised when the frame size changes.
+"""
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import cv2
+
+
+# (lower, upper) HSV bounds of water colours (blue/cyan tones)
+DEFAULT_WATER_HSV_RANGES = (
+    ((100, 50, 50), (130, 255, 255)),  # Lower blue range
+    ((80, 30, 30), (120, 200, 200)),   # Upper blue range (for different lighting)
+)
+
+
+def _normalize_hsv_ranges(hsv_ranges) -> Tuple:
+    ranges = tuple((tuple(int(v) for v in lower), tuple(int(v) for v in upper)) for lower, upper in hsv_ranges)
+    for lower, upper in ranges:
+        if len(lower) != 3 or len(upper) != 3:
+            raise ValueError(f"HSV range bounds need 3 values, got {lower} / {upper}")
+    if not ranges:
+        raise ValueError("At least one HSV range is required")
+    return ranges
+
+
+def load_pool_roi_config(path: str, camera_id: Optional[str] = None) -> Dict:
+    """Load the pool ROI of one camera from a JSON or YAML file.
+
+    Expected layout (a single-camera file may omit the ``cameras`` level)::
+
+        cameras:
+          pool_north:
+            frame_size: [1920, 1080]      # optional, polygons are scaled to the live frame
+            pool:                         # one or more polygons of [x, y] points
+              - [[102, 310], [1830, 295], [1880, 1040], [60, 1060]]
+            exclude:                      # optional: deck, lifeguard chair, stands...
+              - [[900, 280], [1010, 280], [1010, 420], [900, 420]]
+            hsv_ranges:                   # optional water colours for automatic detection
+              - [[100, 50, 50], [130, 255, 255]]
+
+    A camera needs at least a pool polygon or its own hsv_ranges.
+
+    Returns:
+        Dict with 'pool', 'exclude' (lists of (N, 2) float arrays), 'frame_size'
+        and 'hsv_ranges' (None when not configured).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except Exception as e:
+                raise RuntimeError("pyyaml is required for YAML ROI files. Install with pip install pyyaml") from e
+            config = yaml.safe_load(f) or {}
+        else:
+            config = json.load(f)
+
+    cameras = config.get('cameras')
+    if cameras is not None:
+        if camera_id is None:
+            if len(cameras) != 1:
+                raise ValueError(f"{path} defines {len(cameras)} cameras; pass camera_id to pick one")
+            camera_id = next(iter(cameras))
+        if str(camera_id) not in {str(k) for k in cameras}:
+            raise KeyError(f"Camera '{camera_id}' not found in {path}")
+        config = next(v for k, v in cameras.items() if str(k) == str(camera_id))
+
+    def _polygons(key: str) -> List[np.ndarray]:
+        polygons = [np.asarray(poly, dtype=np.float64).reshape(-1, 2) for poly in config.get(key) or []]
+        for poly in polygons:
+            if len(poly) < 3:
+                raise ValueError(f"ROI polygon in '{key}' needs at least 3 points, got {len(poly)}")
+        return polygons
+
+    pool = _polygons('pool')
+    hsv_ranges = config.get('hsv_ranges')
+    if not pool and not hsv_ranges:
+        raise ValueError(f"No pool polygon or hsv_ranges defined in {path}")
+    frame_size = config.get('frame_size')
+    return {
+        'pool': pool,
+        'exclude': _polygons('exclude'),
+        'frame_size': tuple(int(v) for v in frame_size) if frame_size else None,
+        'hsv_ranges': _normalize_hsv_ranges(hsv_ranges) if hsv_ranges else None,
+    }
+
+
+class WaterDetector:
+    """Detect water areas in the frame for better context awareness."""
+
+    def __init__(self, recompute_interval: int = 250, scene_change_threshold: float = 12.0,
+                 probe_size: Tuple[int, int] = (64, 36), hsv_ranges: Optional[Sequence] = None,
+                 segmentation_scale: float = 1.0):
+        """
+        Args:
+            recompute_interval: Frames between forced mask recomputations. 1 recomputes
+                every frame (no caching); 0 only recomputes on scene change.
+            scene_change_threshold: Mean absolute difference (0-255) between the
+                downscaled current frame and the frame the mask was computed from
+                above which the mask is recomputed immediately.
+            probe_size: (width, height) of the downscaled frame used for the change test.
+            hsv_ranges: (lower, upper) HSV bounds of water colours; defaults to
+                DEFAULT_WATER_HSV_RANGES.
+            segmentation_scale: Run colour classification and mask clean-up on the
+                frame resized by this factor (e.g. 0.5), then scale the pool
+                contour back up. 1.0 segments at full resolution.
+        """
+        self.water_mask = None
+        self.pool_boundaries = None
+        self.edge_distance_map = None  # float32 distance (pixels) to the pool boundary
+        self.recompute_interval = recompute_interval
+        self.scene_change_threshold = scene_change_threshold
+        self.probe_size = probe_size
+        self.segmentation_scale = segmentation_scale
+        self.hsv_ranges = _normalize_hsv_ranges(hsv_ranges or DEFAULT_WATER_HSV_RANGES)
+
+        self.frames_since_update = 0
+        self.mask_updates = 0
+        self._reference_probe = None
+        self._rect_mask = None  # water mask the cached bounding rectangle belongs to
+        self._rect = None
+
+        # Static pool ROI (fixed cameras); when set, HSV segmentation never runs
+        self.roi_pool = None
+        self.roi_exclude = []
+        self.roi_frame_size = None
+
+    def clone_settings(self) -> 'WaterDetector':
+        """New detector with the same settings (no mask, pool ROI or cached state)."""
+        return WaterDetector(recompute_interval=self.recompute_interval,
+                             scene_change_threshold=self.scene_change_threshold,
+                             probe_size=self.probe_size, hsv_ranges=self.hsv_ranges,
+                             segmentation_scale=self.segmentation_scale)
+
+    @classmethod
+    def from_roi_file(cls, path: str, camera_id: Optional[str] = None, **kwargs) -> 'WaterDetector':
+        """Create a detector that uses the pool polygons of `camera_id` from `path`."""
+        detector = cls(**kwargs)
+        detector.load_pool_roi(path, camera_id)
+        return detector
+
+    def load_pool_roi(self, path: str, camera_id: Optional[str] = None) -> None:
+        """Apply the water configuration of `camera_id` from a JSON/YAML file.
+
+        Pool polygons replace HSV detection; hsv_ranges only change the colours
+        the automatic detection looks for.
+        """
+        roi = load_pool_roi_config(path, camera_id)
+        if roi['hsv_ranges']:
+            self.set_water_colour_ranges(roi['hsv_ranges'])
+        if roi['pool']:
+            self.set_pool_roi(roi['pool'], roi['exclude'], roi['frame_size'])
+
+    def set_water_colour_ranges(self, hsv_ranges: Sequence) -> None:
+        """Change the (lower, upper) HSV bounds used to classify water pixels."""
+        self.hsv_ranges = _normalize_hsv_ranges(hsv_ranges)
+        self.invalidate()
+
+    def set_pool_roi(self, pool_polygons: Sequence, exclude_polygons: Optional[Sequence] = None,
+                     frame_size: Optional[Tuple[int, int]] = None) -> None:
+        """Fix the water area to the given polygons.
+
+        Args:
+            pool_polygons: Polygons ((N, 2) points) covering the water.
+            exclude_polygons: Polygons removed from the water area (deck, chairs, stands).
+            frame_size: (width, height) the polygons were drawn on. If given, they are
+                scaled to the size of the processed frames.
+        """
+        self.roi_pool = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in pool_polygons]
+        self.roi_exclude = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in exclude_polygons or []]
+        self.roi_frame_size = tuple(frame_size) if frame_size else None
+        self.water_mask = None
+        self.invalidate()
+
+    def clear_pool_roi(self) -> None:
+        """Go back to automatic HSV water detection."""
+        self.roi_pool = None
+        self.roi_exclude = []
+        self.roi_frame_size = None
+        self.water_mask = None
+        self.invalidate()
+
+    @property
+    def uses_static_roi(self) -> bool:
+        return self.roi_pool is not None
+
+    def detect_water_areas(self, frame: np.ndarray) -> np.ndarray:
+        """Return the water mask for this frame, recomputing it only when needed."""
+        if self.uses_static_roi:
+            if self.water_mask is None or self.water_mask.shape[:2] != frame.shape[:2]:
+                self._rasterize_roi(frame.shape[:2])
+                self.mask_updates += 1
+                self.frames_since_update = 0
+            else:
+                self.frames_since_update += 1
+            return self.water_mask
+
+        probe = self._probe(frame)
+        if self._needs_update(frame, probe):
+            self._segment(frame)
+            self._update_edge_distance_map()
+            self._reference_probe = probe
+            self.frames_since_update = 0
+            self.mask_updates += 1
+        else:
+            self.frames_since_update += 1
+        return self.water_mask
+
+    def invalidate(self) -> None:
+        """Force the mask to be recomputed on the next frame (e.g. after moving a camera)."""
+        self._reference_probe = None
+
+    def _probe(self, frame: np.ndarray) -> np.ndarray:
+        """Small blurred thumbnail of the frame used for the scene-change test."""
+        width, height = self.probe_size
+        # Subsample first so INTER_AREA only averages a few thousand pixels
+        step = max(1, min(frame.shape[1] // (width * 4), frame.shape[0] // (height * 4)))
+        thumb = cv2.resize(frame[::step, ::step], (width, height), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(thumb, (3, 3), 0).astype(np.float32)
+
+    def _needs_update(self, frame: np.ndarray, probe: np.ndarray) -> bool:
+        if self.water_mask is None or self._reference_probe is None:
+            return True
+        if self.water_mask.shape[:2] != frame.shape[:2]:
+            return True
+        if self.recompute_interval and self.frames_since_update + 1 >= self.recompute_interval:
+            return True
+        change = float(np.mean(np.abs(probe - self._reference_probe)))
+        return change > self.scene_change_threshold
+
+    def _classify_colours(self, frame: np.ndarray) -> np.ndarray:
+        """Water colour mask (0/255) of a BGR frame."""
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        water_mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+        for lower, upper in self.hsv_ranges:
+            water_mask |= cv2.inRange(hsv, np.array(lower), np.array(upper))
+        return water_mask
+
+    def _segment(self, frame: np.ndarray) -> np.ndarray:
+        """Detect water/pool areas in the frame using color and texture analysis."""
+        height, width = frame.shape[:2]
+        scale = self.segmentation_scale
+        small = frame
+        if 0 < scale < 1.0:
+            small = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        ratio = np.array([width / small.shape[1], height / small.shape[0]])
+
+        water_mask = self._classify_colours(small)
+
+        # Apply morphological operations to clean up the mask (kernel scaled with the frame)
+        size = 5 if small is frame else max(3, int(round(5 * scale)) | 1)
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (size, size))
+        water_mask = cv2.morphologyEx(water_mask, cv2.MORPH_CLOSE, kernel)
+        water_mask = cv2.morphologyEx(water_mask, cv2.MORPH_OPEN, kernel)
+
+        # Find the largest connected component (likely the pool)
+        contours, _ = cv2.findContours(water_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if contours:
+            largest_contour = max(contours, key=cv2.contourArea)
+            if cv2.contourArea(largest_contour) * ratio[0] * ratio[1] > 1000:  # Minimum pool size
+                if small is not frame:
+                    # Map pixel centres of the small mask back to the full frame
+                    largest_contour = np.round((largest_contour + 0.5) * ratio - 0.5).astype(np.int32)
+                self.pool_boundaries = largest_contour
+                water_mask = np.zeros((height, width), dtype=np.uint8)
+                cv2.fillPoly(water_mask, [largest_contour], 255)
+
+        if water_mask.shape[:2] != (height, width):
+            water_mask = cv2.resize(water_mask, (width, height), interpolation=cv2.INTER_NEAREST)
+
+        self.water_mask = water_mask
+        return water_mask
+
+    def _rasterize_roi(self, shape: Tuple[int, int]) -> None:
+        """Build the water mask and edge map from the configured ROI polygons."""
+        height, width = shape
+        scale = np.ones(2)
+        if self.roi_frame_size:
+            scale = np.array([width / self.roi_frame_size[0], height / self.roi_frame_size[1]])
+        pool = [np.round(p * scale).astype(np.int32).reshape(-1, 1, 2) for p in self.roi_pool]
+        exclude = [np.round(p * scale).astype(np.int32).reshape(-1, 1, 2) for p in self.roi_exclude]
+
+        water_mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(water_mask, pool, 255)
+        if exclude:
+            cv2.fillPoly(water_mask, exclude, 0)
+
+        # Edge distance is measured to the pool outline; excluded regions such as a
+        # lifeguard chair are not in the water but do not move the pool edge
+        self.pool_boundaries = max(pool, key=cv2.contourArea)
+        self.water_mask = water_mask
+        pool_mask = np.zeros_like(water_mask)
+        cv2.fillPoly(pool_mask, pool, 255)
+        self._update_edge_distance_map(pool_mask)
+
+    def _update_edge_distance_map(self, pool: Optional[np.ndarray] = None) -> None:
+        """Precompute the distance of every pixel to the pool boundary polygon.
+
+        Matches abs(cv2.pointPolygonTest(pool_boundaries, p, True)) to within a
+        pixel: inside the polygon the distance is to the nearest outside pixel
+        minus one (the boundary pixels themselves lie on the contour), outside it
+        is the distance to the nearest polygon pixel.
+
+        Args:
+            pool: Optional uint8 pool mask to measure against instead of the
+                filled pool_boundaries contour (used for multi-polygon ROIs).
+        """
+        if pool is None:
+            if self.pool_boundaries is None or self.water_mask is None:
+                self.edge_distance_map = None
+                return
+            pool = np.zeros(self.water_mask.shape[:2], dtype=np.uint8)
+            cv2.fillPoly(pool, [self.pool_boundaries], 255)
+
+        inside = cv2.distanceTransform(pool, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        outside = cv2.distanceTransform(cv2.bitwise_not(pool), cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        self.edge_distance_map = np.where(pool > 0, np.maximum(inside - 1.0, 0.0), outside).astype(np.float32)
+
+    def water_rect(self, margin: float = 0.1) -> Optional[Tuple[int, int, int, int]]:
+        """Bounding rectangle (x0, y0, x1, y1) of the water mask, padded by `margin`.
+
+        The margin is a fraction of the rectangle's width/height added on each side,
+        so swimmers at the pool edge are not cut off. Returns None if there is no mask
+        or it is empty. The unpadded rectangle is cached per mask.
+        """
+        if self.water_mask is None:
+            return None
+        if self._rect_mask is not self.water_mask:
+            self._rect = cv2.boundingRect(self.water_mask) if cv2.countNonZero(self.water_mask) else None
+            self._rect_mask = self.water_mask
+        if self._rect is None:
+            return None
+
+        x, y, w, h = self._rect
+        height, width = self.water_mask.shape[:2]
+        pad_x, pad_y = int(round(w * margin)), int(round(h * margin))
+        return (max(0, x - pad_x), max(0, y - pad_y),
+                min(width, x + w + pad_x), min(height, y + h + pad_y))
+
+    def distance_to_edge(self, points: np.ndarray) -> np.ndarray:
+        """Distance (pixels) from each point to the pool edge, shape (N,) for (N, 2) points.
+
+        Points are clamped to the frame (detection centres always lie inside it).
+        Returns zeros when no pool boundary has been detected.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.edge_distance_map is None:
+            return np.zeros(len(points))
+
+        height, width = self.edge_distance_map.shape
+        x = np.clip(points[:, 0], 0, width - 1).astype(np.intp)
+        y = np.clip(points[:, 1], 0, height - 1).astype(np.intp)
+        return self.edge_distance_map[y, x].astype(np.float64)
+
+    def points_in_water(self, points: np.ndarray) -> np.ndarray:
+        """Vectorized is_in_water for (N, 2) points, returns a bool array."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.water_mask is None:
+            return np.ones(len(points), dtype=bool)  # Assume in water if no detection
+
+        height, width = self.water_mask.shape[:2]
+        x = points[:, 0].astype(np.intp)
+        y = points[:, 1].astype(np.intp)
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        result = np.zeros(len(points), dtype=bool)
+        result[inside] = self.water_mask[y[inside], x[inside]] > 0
+        return result
+
+    def is_in_water(self, center_point: Tuple[float, float]) -> bool:
+        """Check if a point is within the detected water area."""
+        if self.water_mask is None:
+            return True  # Assume in water if no detection
+
+        x, y = int(center_point[0]), int(center_point[1])
+        if 0 <= x < self.water_mask.shape[1] and 0 <= y < self.water_mask.shape[0]:
+            return self.water_mask[y, x] > 0
+        return False
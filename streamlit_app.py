@@ -2,7 +2,7 @@ import streamlit as st
 import cv2
 import tempfile
 import numpy as np
-from ultralytics import YOLO
+from src.models import model_registry
 import os
 
 # Set page configuration
@@ -111,7 +111,7 @@ if uploaded_file and run_detection:
     # Load YOLOv8 model
     try:
         status_text.info("Loading YOLOv8 model...")
-        model = YOLO('yolov8n.pt')  # Will download if not present
+        model = model_registry.acquire('yolov8n.pt')  # Will download if not present; shared across reruns
         status_text.success("Model loaded successfully!")
         
         # Open video
@@ -237,6 +237,7 @@ if uploaded_file and run_detection:
         
         # Cleanup
         cap.release()
+        model_registry.release(model)
         os.unlink(video_path)  # Remove temporary file
         
         # Final results
@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+
+from src.detections import DetectionBatch
+from src.tracking import TrackStore
+
+
+def test_yolo_rows_get_vectorized_geometry_and_lazy_views():
+    data = np.array([[10, 20, 30, 60, 0.9, 0], [0, 0, 50, 25, 0.4, 2]], dtype=np.float32)
+    batch = DetectionBatch.from_yolo(data, timestamp=1.5, names={0: 'person', 2: 'car'})
+
+    np.testing.assert_allclose(batch.centers, [[20, 40], [25, 12.5]])
+    np.testing.assert_allclose(batch.areas, [800, 1250])
+    np.testing.assert_allclose(batch.aspect_ratios, [0.5, 2.0])
+
+    row = batch[1]
+    assert row['name'] == 'car'
+    assert row['bbox'] == [0.0, 0.0, 50.0, 25.0]
+    assert row.get('pose') is None and 'predicted' not in row
+
+    row['alert'] = 'checked'  # writes stay on this row only
+    assert batch[1]['alert'] == 'checked' and 'alert' not in batch[0]
+    assert json.loads(json.dumps(batch.to_dicts()))[0]['timestamp'] == 1.5
+
+
+def test_store_append_many_matches_sequential_appends():
+    rng = np.random.default_rng(0)
+    single, batched = TrackStore(capacity=4, history=5), TrackStore(capacity=4, history=5)
+    slots = np.array([single.allocate() for _ in range(3)])
+    for _ in range(3):
+        batched.allocate()
+
+    for t in range(8):  # wraps the ring buffer
+        centers = rng.uniform(0, 100, size=(3, 2))
+        boxes = np.concatenate([centers - 5, centers + 5], axis=1)
+        for slot, center, box in zip(slots, centers, boxes):
+            single.append(slot, center, box, 0.5, t)
+        batched.append_many(slots, centers, boxes, np.full(3, 0.5), t)
+
+    for column in ('centers', 'bboxes', 'timestamps', 'velocities', 'accelerations'):
+        np.testing.assert_allclose(getattr(batched, column), getattr(single, column))
+    np.testing.assert_array_equal(batched.heads, single.heads)
+
+
+def test_concatenate_keeps_rows_columns_and_overrides_in_order():
+    first = DetectionBatch.from_yolo(np.array([[10, 20, 30, 60, 0.9, 0]]), timestamp=2.0, names={0: 'person'})
+    first.set_column('bbox_stability', np.ones(1))
+    second = DetectionBatch.from_dicts([{'bbox': [0, 0, 10, 10], 'class_id': 0, 'predicted': True, 'track_id': 7,
+                                         'pose': {'keypoints': []}}], timestamp=2.0)
+    second[0]['note'] = 'kalman'
+
+    batch = DetectionBatch.concatenate([first, second])
+    assert len(batch) == 2 and batch.timestamp == 2.0
+    assert batch.predicted.tolist() == [False, True] and batch.track_ids.tolist() == [-1, 7]
+    assert batch[0]['bbox_stability'] == 1.0 and 'bbox_stability' not in batch[1]
+    assert 'pose' not in batch[0] and batch[1]['pose'] == {'keypoints': []}
+    assert batch[1]['note'] == 'kalman'
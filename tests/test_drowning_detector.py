@@ -0,0 +1,373 @@
+import time
+
+import numpy as np
+
+from src.drowning_detector import DrowningDetector
+from src.resolution import ResolutionController
+
+
+class _Boxes:
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 6)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self
+
+
+class _Result:
+    def __init__(self, data, names):
+        self.boxes = _Boxes(data)
+        self.names = names
+
+
+class _FakeModel:
+    """Stands in for YOLO: a person box at the red blob of the frame, plus a chair."""
+
+    def __init__(self, names=None):
+        self.names = names or {0: 'person', 56: 'chair'}
+        self.calls = []
+        self.kwargs = []
+
+    def predict(self, source=None, classes=None, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        self.calls.append(len(frames))
+        self.kwargs.append(dict(kwargs, classes=classes))
+        results = []
+        for frame in frames:
+            ys, xs = np.nonzero((frame[:, :, 2] > 180) & (frame[:, :, 0] < 80))
+            data = [[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1, 0.9, 0]] if len(xs) else []
+            if len(self.names) > 1:
+                data.append([10, 10, 40, 60, 0.8, 56])
+            results.append(_Result([d for d in data if classes is None or int(d[5]) in classes], self.names))
+        return results
+
+
+def _frame(swimmer_x):
+    frame = np.full((360, 640, 3), 90, dtype=np.uint8)
+    frame[80:300, 100:540] = (200, 120, 30)
+    frame[150:190, swimmer_x:swimmer_x + 20] = (40, 60, 220)
+    return frame
+
+
+def test_predict_batch_uses_one_model_call_and_separate_camera_state():
+    detector = DrowningDetector()
+    detector.model = _FakeModel()
+
+    for t in range(5):
+        outputs = detector.predict_batch([_frame(200 + 5 * t), _frame(400 - 5 * t)], camera_ids=['a', 'b'])
+        assert list(outputs) == ['a', 'b']
+        for camera_id, (detections, water_mask) in outputs.items():
+            detector.advanced_drowning_detection(detections, water_mask, camera_id=camera_id)
+
+    assert detector.model.calls == [2] * 5
+    tracks_a = detector.camera('a').person_tracker.tracks
+    tracks_b = detector.camera('b').person_tracker.tracks
+    assert len(tracks_a) == len(tracks_b) == 1
+    assert next(iter(tracks_a.values())).positions[-1][0] == 230
+    assert next(iter(tracks_b.values())).positions[-1][0] == 390
+    assert not detector.person_tracker.tracks  # default camera untouched
+
+
+def test_person_only_mode_filters_in_the_model_call():
+    detector = DrowningDetector()
+    detector.model = _FakeModel()
+    detections, _ = detector.predict_frame(_frame(200))
+    assert sorted(detections.class_ids.tolist()) == [0, 56]
+
+    detector.drowning_config['person_only'] = True
+    detections, _ = detector.predict_frame(_frame(200))
+    assert detector.model.kwargs[-1]['classes'] == [0]
+    assert detections.class_ids.tolist() == [0]
+
+    # A single-class (person) head needs no class filter
+    detector.model = _FakeModel(names={0: 'person'})
+    detections, _ = detector.predict_frame(_frame(200))
+    assert detector.model.kwargs[-1]['classes'] is None
+    assert detections.class_ids.tolist() == [0]
+
+
+class _Keypoints:
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32)
+
+
+def _with_keypoints(results):
+    """Give every box of the results 17 keypoints spread over the box."""
+    for result in results:
+        keypoints = np.zeros((len(result.boxes.data), 17, 3), dtype=np.float32)
+        for i, (x1, y1, x2, y2) in enumerate(result.boxes.data[:, :4]):
+            keypoints[i, :, 0] = np.linspace(x1, x2, 17)
+            keypoints[i, :, 1] = np.linspace(y1, y2, 17)
+            keypoints[i, :, 2] = 0.9
+        result.keypoints = _Keypoints(keypoints)
+    return results
+
+
+class _FakePoseModel(_FakeModel):
+    """Single-class pose model: every person box carries its own 17 keypoints."""
+
+    def __init__(self):
+        super().__init__({0: 'person'})
+
+    def predict(self, source=None, classes=None, **kwargs):
+        return _with_keypoints(super().predict(source, classes, **kwargs))
+
+
+def test_pose_model_as_detector_attaches_keypoints_in_one_pass():
+    detector = DrowningDetector()
+    detector.model = _FakePoseModel()
+    detector.drowning_config.update(pose_as_detector=True, pose_estimation_enabled=True, person_only=True)
+
+    detections, _ = detector.predict_frame(_frame(200))
+    assert detector.model.calls == [1]
+    assert detector.pose_model is None
+    pose = detections[0]['pose']
+    assert len(pose['keypoints']) == 17
+    assert pose['keypoints'][0][:2] == [200.0, 150.0]
+    assert abs(pose['pose_confidence'] - 0.9) < 1e-6
+
+
+def test_pose_model_as_detector_keeps_keypoints_through_tile_and_crop_merges():
+    detector = DrowningDetector()
+    detector.model = _FakePoseModel()
+    detector.drowning_config.update(pose_as_detector=True, pose_estimation_enabled=True, person_only=True,
+                                    tiled_inference=True, imgsz=192, detection_stride=2, track_crop_redetection=True)
+
+    for t, crop in ((0, False), (1, True)):
+        detections, water_mask = detector.predict_frame(_frame(200 + 5 * t))
+        detector.advanced_drowning_detection(detections, water_mask)
+        assert detections.boxes.tolist() == [[200.0 + 5 * t, 150.0, 220.0 + 5 * t, 190.0]]
+        assert detector.model.kwargs[-1]['imgsz'] == (256 if crop else 192)
+        keypoints = detections[0]['pose']['keypoints']
+        assert keypoints[0][:2] == [200.0 + 5 * t, 150.0]  # in frame pixels, not tile or crop pixels
+        assert keypoints[-1][:2] == [220.0 + 5 * t, 190.0]
+
+
+def test_pose_association_gives_each_person_one_skeleton():
+    rng = np.random.default_rng(0)
+    centers = np.stack([np.arange(60) * 80.0 + 40, np.full(60, 200.0)], axis=1)
+    order = rng.permutation(60)
+    skeletons = np.zeros((60, 17, 3), dtype=np.float32)
+    skeletons[:, :, :2] = centers[order, None, :] + rng.normal(0, 5, size=(60, 17, 2))
+    skeletons[:, :, 2] = 0.9
+
+    detector = DrowningDetector()
+    assigned = detector._match_poses(skeletons, centers)
+    assert (order[assigned] == np.arange(60)).all()
+
+    # Two people next to a single skeleton: only the closer one receives it
+    assigned = detector._match_poses(skeletons[:1], np.array([centers[order[0]] + 20, centers[order[0]] + 5]))
+    assert assigned.tolist() == [-1, 0]
+
+
+def test_warmup_runs_every_batch_size_and_reports_latency():
+    detector = DrowningDetector()
+    detector.model = _FakeModel()
+    report = detector.warmup(frame_size=(320, 180), batch_sizes=(1, 3), runs=3)
+
+    assert detector.model.calls == [1, 1, 1, 3, 3, 3]
+    assert set(report['first_ms']) == set(report['steady_ms']) == {1, 3}
+    assert report['warmup_s'] > 0
+    assert detector.frames_processed == 0  # no stream state touched
+
+
+def test_warmup_covers_crop_sizes_and_pose_crops():
+    detector = DrowningDetector()
+    detector.model = _FakeModel()
+    detector.pose_model = _FakePoseModel()
+    detector.drowning_config.update(pose_estimation_enabled=True, pose_risk_gated=True, track_crop_redetection=True,
+                                    detection_stride=3)
+    report = detector.warmup(frame_size=(320, 180), runs=2)
+
+    assert [kwargs['imgsz'] for kwargs in detector.model.kwargs] == [640, 640, 256]
+    assert [kwargs['imgsz'] for kwargs in detector.pose_model.kwargs] == [256]
+    assert report['sizes'] == [640, 256] and report['pose_sizes'] == [256]
+
+
+def test_adaptive_resolution_raises_input_size_for_small_persons():
+    detector = DrowningDetector()
+    detector.model = _FakeModel()
+    detector.drowning_config['adaptive_resolution'] = True
+    # The swimmer is 40 px tall in a 640 px frame: 40 px at 640, 48 px at 768
+    detector.camera().resolution = ResolutionController(min_person_px=48, cooldown=2)
+
+    for t in range(4):
+        detector.predict_frame(_frame(200))
+    assert [kwargs['imgsz'] for kwargs in detector.model.kwargs] == [640, 768, 768, 768]
+    assert detector.resolution_metrics()['changes'][0]['to'] == 768
+    assert detector.resolution_metrics('other camera')['imgsz'] == 640
+
+
+def test_predict_batch_runs_one_call_per_input_size_and_splits_latency():
+    class _SlowModel(_FakeModel):
+        def predict(self, source=None, classes=None, **kwargs):
+            time.sleep(0.05 * len(source))
+            return super().predict(source, classes, **kwargs)
+
+    detector = DrowningDetector()
+    detector.model = _SlowModel()
+    detector.drowning_config['adaptive_resolution'] = True
+    detector.camera('a').resolution = ResolutionController(initial=320, cooldown=100)
+
+    detector.predict_batch([_frame(200), _frame(300), _frame(400)], camera_ids=['a', 'b', 'c'])
+    assert sorted(zip(detector.model.calls, [kwargs['imgsz'] for kwargs in detector.model.kwargs])) == \
+        [(1, 320), (2, 640)]
+    # Each camera is charged its share of its own call, filed under the size that ran
+    for camera_id, imgsz in (('a', 320), ('b', 640), ('c', 640)):
+        latency_by_size = detector.camera(camera_id).resolution.latency_by_size
+        assert list(latency_by_size) == [imgsz]
+        assert 45 <= latency_by_size[imgsz] < 90
+
+
+def test_tiled_inference_merges_tiles_in_one_call_with_a_cached_layout():
+    detector = DrowningDetector()
+    detector.model = _FakeModel()
+    detector.drowning_config.update(tiled_inference=True, imgsz=192, person_only=True)
+
+    detections, _ = detector.predict_frame(_frame(200))
+    layout = detector.camera().tile_layout
+    assert len(layout) > 1
+    assert detector.model.calls == [len(layout) + 1]  # tiles + whole frame, one batch
+    assert detections.boxes.tolist() == [[200.0, 150.0, 220.0, 190.0]]
+
+    detector.predict_frame(_frame(205))
+    assert detector.camera().tile_layout is layout
+
+
+def test_track_crops_redetect_between_full_frame_passes():
+    detector = DrowningDetector()
+    detector.model = _FakeModel()
+    detector.drowning_config.update(detection_stride=3, track_crop_redetection=True, person_only=True)
+
+    for t in range(7):
+        detections, water_mask = detector.predict_frame(_frame(200 + 5 * t))
+        detector.advanced_drowning_detection(detections, water_mask)
+        if t % 3:
+            assert detector.model.kwargs[-1]['imgsz'] == 256
+            assert detections.boxes.tolist() == [[205.0 + 5 * t - 5, 150.0, 225.0 + 5 * t - 5, 190.0]]
+            assert not detections.predicted.any()
+
+    assert detector.model.calls == [1] * 7  # one whole frame or one crop per frame
+    track, = detector.person_tracker.tracks.values()
+    assert track.positions[:, 0].tolist() == [210.0 + 5 * t for t in range(7)]
+
+    # A track its crop no longer finds continues on its Kalman prediction
+    empty = _frame(200)
+    empty[150:190, 200:220] = (200, 120, 30)
+    detections, _ = detector.predict_frame(empty)
+    assert detections.predicted.tolist() == [True]
+
+
+def test_risk_gated_pose_runs_on_crops_of_risky_tracks_only():
+    def swimmer(x, width):
+        frame = _frame(x)
+        frame[150:190, x:x + 20] = (200, 120, 30)
+        frame[150:190, x:x + width] = (40, 60, 220)
+        return frame
+
+    for width, expected_calls in ((10, [1, 1, 1]), (20, [])):  # aspect ratio 0.25 is risky, 0.5 is not
+        detector = DrowningDetector()
+        detector.model = _FakeModel()
+        detector.pose_model = _FakePoseModel()
+        detector.drowning_config.update(person_only=True, pose_estimation_enabled=True, pose_risk_gated=True)
+
+        with_pose = []
+        for t in range(30):
+            detections, water_mask = detector.predict_frame(swimmer(200 + t, width))
+            result = detector.advanced_drowning_detection(detections, water_mask)
+            with_pose.append(bool(result['person_analyses'][0]['pose_analysis']))
+
+        assert detector.pose_model.calls == expected_calls  # one crop per pass, never a whole frame
+        if expected_calls:
+            assert detector.pose_model.kwargs[0]['imgsz'] == 256
+            assert with_pose == [False] + [True] * 29  # risk is known from frame 2; poses are reused in between
+        else:
+            assert not any(with_pose)
+
+
+class _BlobModel(_FakeModel):
+    """Person box per red blob (column run) of the frame, so several swimmers can be seen."""
+
+    def predict(self, source=None, classes=None, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        self.calls.append(len(frames))
+        self.kwargs.append(dict(kwargs, classes=classes))
+        results = []
+        for frame in frames:
+            red = ((frame[:, :, 2] > 180) & (frame[:, :, 0] < 80)).any(axis=0)
+            edges = np.flatnonzero(np.diff(np.concatenate([[0], red.astype(np.int8), [0]])))
+            ys = np.flatnonzero(((frame[:, :, 2] > 180) & (frame[:, :, 0] < 80)).any(axis=1))
+            results.append(_Result([[x0, ys.min(), x1, ys.max() + 1, 0.9, 0]
+                                    for x0, x1 in zip(edges[::2], edges[1::2])], self.names))
+        return results
+
+
+class _BlobPoseModel(_BlobModel):
+    def predict(self, source=None, classes=None, **kwargs):
+        return _with_keypoints(super().predict(source, classes, **kwargs))
+
+
+def test_crop_pose_pairing_is_the_same_for_predict_frame_and_predict_batch():
+    def swimmers(t):
+        frame = np.full((360, 640, 3), 90, dtype=np.uint8)
+        frame[80:300, 100:540] = (200, 120, 30)
+        for x in (200 - t - t * t // 4, 224 + t):  # side by side in each other's crops, one accelerating
+            frame[150:190, x:x + 10] = (40, 60, 220)
+        return frame
+
+    paired = []
+    for batch in (False, True):
+        detector = DrowningDetector()
+        detector.model = _BlobModel({0: 'person'})
+        detector.pose_model = _BlobPoseModel({0: 'person'})
+        detector.drowning_config.update(person_only=True, pose_estimation_enabled=True, pose_risk_gated=True,
+                                        pose_interval=0.08)
+        poses = []
+        for t in range(12):
+            frame = swimmers(t)
+            if batch:
+                detections, water_mask = detector.predict_batch([frame], camera_ids=[None])[None]
+            else:
+                detections, water_mask = detector.predict_frame(frame)
+            detector.advanced_drowning_detection(detections, water_mask)
+            scheduler = detector.camera().pose_scheduler
+            poses.append({track_id: pose['keypoints'][0][0] for track_id, (when, pose) in scheduler.poses.items()
+                          if pose is not None and when == detector.camera().person_tracker.current_time})
+        paired.append(poses)
+
+    assert paired[0] == paired[1]
+    assert sum(map(len, paired[0])) >= 4
+    for poses in paired[0]:
+        assert len(set(poses.values())) == len(poses)  # each track got its own swimmer's skeleton
+
+
+def test_vectorized_risk_scoring_matches_the_per_track_analysis():
+    from src.detections import DetectionBatch
+    from src.drowning_detector_advanced import DrowningDetector as AdvancedDetector
+
+    for detector_class in (DrowningDetector, AdvancedDetector):
+        rng = np.random.default_rng(0)
+        detector = detector_class()
+        centers = rng.uniform(100, 900, size=(30, 2))
+        sinking = np.arange(30) % 3 == 0
+        analyses = 0
+        for frame in range(40):
+            centers += np.where(sinking[:, None], [0.0, 18.0], 0.0) + rng.normal(0, 12, centers.shape)
+            widths = np.where(sinking, 8.0, rng.uniform(15, 40, 30))
+            half = np.stack([widths / 2, np.full(30, 20.0)], axis=1)
+            boxes = np.concatenate([centers - half, centers + half], axis=1)
+            batch = DetectionBatch(boxes, rng.uniform(0.3, 0.95, 30) - sinking * 0.015 * frame,
+                                   np.zeros(30, dtype=np.int64), frame / 25)
+            batch.in_water = rng.random(30) < 0.9
+            result = detector.advanced_drowning_detection(batch, None, frame / 25)
+            for analysis in result['person_analyses']:
+                track_id = analysis['track_id']
+                expected = detector._analyze_person_comprehensive(detector.person_tracker.tracks[track_id], track_id)
+                assert analysis['risk_score'] == expected['risk_score']
+                assert analysis['risk_level'] == expected['risk_level']
+                assert analysis['alerts'] == expected['alerts']
+                analyses += 1
+        assert analyses > 1000
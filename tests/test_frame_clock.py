@@ -0,0 +1,16 @@
+from src.frame_clock import FrameClock
+
+
+def test_falls_back_to_frame_index_without_pts():
+    clock = FrameClock(fps=25.0)
+    times = [clock.tick(pts) for pts in (0.0, -1.0, 0.0)]
+
+    assert times == [0.0, 0.04, 0.08]
+
+
+def test_uses_container_pts_and_stays_monotonic():
+    clock = FrameClock(fps=25.0)
+    times = [clock.tick(pts) for pts in (0.0, 40.0, 120.0, 100.0)]
+
+    assert times[:3] == [0.0, 0.04, 0.12]
+    assert times[3] > times[2]
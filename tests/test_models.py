@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src.models import ModelRegistry, artifact_path, exported_imgsz, is_exported_model, letterbox, model_digest
+
+
+def test_artifact_path_is_keyed_by_content_and_input_size(tmp_path):
+    weights = tmp_path / 'yolov8n.pt'
+    weights.write_bytes(b'weights v1')
+    cache = str(tmp_path / 'cache')
+
+    onnx_640 = artifact_path(str(weights), 'onnx', 640, cache)
+    assert os.path.dirname(onnx_640) == cache
+    assert os.path.basename(onnx_640).startswith('yolov8n-') and onnx_640.endswith('-640.onnx')
+    assert is_exported_model(onnx_640)
+    assert artifact_path(str(weights), 'onnx', 640, cache) == onnx_640
+    assert artifact_path(str(weights), 'onnx', 480, cache) != onnx_640
+    assert artifact_path(str(weights), 'openvino', 640, cache).endswith('-640_openvino_model')
+
+    digest = model_digest(str(weights))
+    weights.write_bytes(b'weights v2, retrained')
+    assert model_digest(str(weights)) != digest
+    assert artifact_path(str(weights), 'onnx', 640, cache) != onnx_640
+
+    with pytest.raises(ValueError):
+        artifact_path(str(weights), 'pytorch', 640, cache)
+
+
+def test_letterbox_matches_fixed_size_export_input():
+    frame = np.zeros((360, 640, 3), dtype=np.uint8)
+    frame[..., 2] = 255  # red in BGR
+    tensor = letterbox(frame, 320)
+    assert tensor.shape == (1, 3, 320, 320) and tensor.dtype == np.float32
+    assert tensor[0, 0, 160, 160] == 1.0 and tensor[0, 2, 160, 160] == 0.0  # RGB order
+    assert np.allclose(tensor[0, :, 0, 0], 114 / 255)  # grey padding above the image
+    assert np.allclose(tensor[0, :, 80:240, :], [[[1.0]], [[0.0]], [[0.0]]])
+
+
+def test_exported_imgsz_reads_openvino_metadata(tmp_path):
+    model_dir = tmp_path / 'yolov8n-int8_openvino_model'
+    model_dir.mkdir()
+    (model_dir / 'metadata.yaml').write_text("task: detect\nimgsz:\n- 480\n- 480\nnames:\n  0: person\n")
+    assert exported_imgsz(str(model_dir)) == 480
+    assert exported_imgsz(str(tmp_path / 'yolov8n.pt')) is None
+
+
+class _Loaded:
+    names = {0: 'person'}
+
+    def __init__(self, path):
+        self.path = path
+
+    def predict(self, source=None, **kwargs):
+        return [self.path]
+
+
+def test_model_registry_shares_and_refcounts_models():
+    loads = []
+
+    def loader(path, backend, imgsz, cache_dir, task, device):
+        loads.append((path, backend, device))
+        time.sleep(0.01)
+        return _Loaded(path)
+
+    registry = ModelRegistry(max_idle=1, loader=loader)
+    with ThreadPoolExecutor(8) as pool:
+        models = list(pool.map(lambda _: registry.acquire('yolov8n.pt', device='cpu'), range(8)))
+    assert len(loads) == 1 and all(m is models[0] for m in models)
+    assert models[0].names == {0: 'person'} and models[0].predict('frame') == ['yolov8n.pt']
+    assert registry.acquire('yolov8n.pt', device='cpu', imgsz=320) is models[0]  # PyTorch: any imgsz
+    assert registry.acquire('yolov8n.pt', 'onnx', 'cpu', 320) is not models[0]
+    assert registry.references()[models[0].key] == 9
+
+    for model in models + [models[0]]:
+        registry.release(model)
+    assert registry.references()[models[0].key] == 0  # idle, still cached
+    assert registry.acquire('yolov8n.pt', device='cpu') is models[0]
+    assert len(loads) == 2
+
+    registry.release(models[0])
+    registry.release(registry.acquire('yolov8s.pt'))  # evicts the older idle model
+    assert models[0].key not in registry.references()
+    registry.release(object())  # not a registry model: ignored
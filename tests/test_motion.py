@@ -0,0 +1,27 @@
+import numpy as np
+
+from src.motion import MotionGate
+
+
+def _scene(person_x=None):
+    frame = np.full((360, 640, 3), (200, 130, 40), dtype=np.uint8)
+    if person_x is not None:
+        frame[150:230, person_x:person_x + 30] = (40, 60, 220)
+    return frame
+
+
+def test_static_scene_is_throttled_and_motion_resumes_full_rate():
+    gate = MotionGate(hold_frames=5, idle_interval=10)
+    runs = [gate.should_process(_scene()) for _ in range(60)]
+    assert all(runs[:6])  # first frame and the hold period
+    assert sum(runs[6:]) == 5  # one frame in ten while idle
+
+    runs = [gate.should_process(_scene(100 + 8 * i)) for i in range(20)]
+    assert all(runs)
+    assert gate.metrics()['frames'] == 80
+
+
+def test_never_gates_while_a_track_exists():
+    gate = MotionGate(hold_frames=0, idle_interval=0)
+    assert all(gate.should_process(_scene(), active_tracks=1) for _ in range(30))
+    assert not any(gate.should_process(_scene()) for _ in range(10))
@@ -0,0 +1,54 @@
+from src.resolution import ResolutionController
+
+
+def _run(controller, runs, latency_ms, person_height, source=(1080, 1920)):
+    for _ in range(runs):
+        controller.update(latency_ms, [person_height] if person_height else [], source)
+    return controller.imgsz
+
+
+def test_raises_for_small_distant_swimmers_even_over_budget():
+    controller = ResolutionController(budget_ms=40.0, cooldown=5)
+    # 40 px tall in a 1920 px frame is ~13 px at 640
+    assert _run(controller, 5, 60.0, 40) == 768
+    assert _run(controller, 5, 60.0, 40) == 960
+    assert [c['reason'] for c in controller.metrics()['changes']] == ['small persons'] * 2
+
+
+def test_lowers_for_large_swimmers_when_over_budget_and_recovers():
+    controller = ResolutionController(budget_ms=40.0, cooldown=5)
+    assert _run(controller, 20, 20.0, 400) == 640  # within budget: keep
+    assert _run(controller, 30, 80.0, 400) == 320
+    assert _run(controller, 40, 5.0, 400) == 640  # load dropped: back up to the initial size, no further
+
+    metrics = controller.metrics()
+    assert metrics['imgsz'] == 640 and metrics['budget_ms'] == 40.0
+    assert [c['to'] for c in metrics['changes']] == [512, 416, 320, 416, 512, 640]
+    assert set(metrics['latency_by_size']) == {320, 416, 512, 640}
+
+
+def test_steps_up_only_when_the_larger_size_fits_the_budget():
+    controller = ResolutionController(sizes=(512, 640), initial=640, budget_ms=40.0, cooldown=5)
+    assert _run(controller, 20, 80.0, 400) == 512
+    # 25 ms at 512 extrapolates to 39 ms at 640, over 80% of the budget
+    assert _run(controller, 20, 25.0, 400) == 512
+    assert _run(controller, 20, 15.0, 400) == 640
+
+
+def test_never_lowers_below_what_keeps_persons_detectable():
+    controller = ResolutionController(budget_ms=40.0, cooldown=1)
+    # 150 px in 1920 px: 50 px at 640, 40 px at 512 (< 1.5 * 32)
+    assert _run(controller, 20, 80.0, 150) == 640
+
+
+def test_lowers_an_idle_camera_over_budget_down_to_the_smallest_size():
+    controller = ResolutionController(budget_ms=40.0, cooldown=5)
+    assert _run(controller, 20, 80.0, None) == 320
+    assert _run(controller, 20, 80.0, None) == 320
+    assert all(c['reason'] == 'over budget' for c in controller.metrics()['changes'])
+
+    # Swimmers that left the view stop holding the size up once out of the window
+    controller = ResolutionController(budget_ms=40.0, cooldown=1, window=5)
+    assert _run(controller, 10, 80.0, 150) == 640
+    assert _run(controller, 4, 80.0, None) == 640
+    assert _run(controller, 1, 80.0, None) == 512
@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.tiling import TileLayout, merge_tile_detections, tile_grid, track_crops
+
+
+def test_tile_grid_covers_region_with_overlap():
+    tiles = tile_grid((100, 50, 3940, 2210), tile_size=640, overlap=0.2)
+    assert (tiles[:, 2] - tiles[:, 0] == 640).all() and (tiles[:, 3] - tiles[:, 1] == 640).all()
+    assert tiles[:, 0].min() == 100 and tiles[:, 2].max() == 3940
+    assert tiles[:, 1].min() == 50 and tiles[:, 3].max() == 2210
+    xs = np.unique(tiles[:, 0])
+    assert (np.diff(xs) <= 640 * 0.8).all()
+
+    small = tile_grid((10, 20, 300, 200), tile_size=640)
+    assert small.tolist() == [[10, 20, 300, 200]]
+
+
+def test_merge_prefers_whole_box_over_seam_cut_duplicate():
+    # Swimmer at x 600..660: cut at the right edge of tile 0, whole in tile 1 (x0 = 512)
+    cut = np.array([[600, 100, 640, 180, 0.9, 0]])
+    whole = np.array([[88, 100, 148, 180, 0.8, 0]])
+    other = np.array([[300, 300, 330, 360, 0.7, 0]])
+    merged = merge_tile_detections([np.concatenate([cut, other]), whole], [(0, 0), (512, 0)],
+                                   [(640, 640), (640, 640)])
+    assert merged[:, :5].tolist() == [[600, 100, 660, 180, 0.8], [300, 300, 330, 360, 0.7]]
+
+
+def test_layout_drops_dry_tiles_and_matches_its_settings():
+    mask = np.zeros((720, 1280), dtype=np.uint8)
+    mask[:, :500] = 255
+    layout = TileLayout(mask.shape, None, 320, 0.2, water_mask=mask)
+    assert len(layout) < len(tile_grid((0, 0, 1280, 720), 320, 0.2))
+    assert (layout.tiles[:, 0] < 500).all()
+    assert layout.matches((720, 1280, 3), None, 320, 0.2)
+    assert not layout.matches((720, 1280, 3), (0, 0, 640, 720), 320, 0.2)
+
+
+def test_track_crops_are_square_and_shifted_inside_the_frame():
+    crops = track_crops([[10, 10, 30, 50], [600, 300, 640, 360], [300, 100, 304, 110]], (360, 640),
+                        scale=2.5, min_size=96)
+    assert crops.tolist() == [[0, 0, 100, 100], [490, 210, 640, 360], [254, 57, 350, 153]]
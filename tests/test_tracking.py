@@ -0,0 +1,144 @@
+import numpy as np
+
+from src.tracking import (PersonTracker, TrackStore, build_cost_matrix, grid_candidate_pairs,
+                          match_detections, solve_assignment)
+
+
+def _person(cx, cy, size=20.0):
+    half = size / 2
+    return {
+        'class_id': 0,
+        'confidence': 0.9,
+        'center': [cx, cy],
+        'bbox': [cx - half, cy - half, cx + half, cy + half],
+    }
+
+
+def test_global_assignment_avoids_greedy_id_swap():
+    tracker = PersonTracker(max_tracking_distance=50.0)
+    tracker.update_tracks([_person(0, 0), _person(40, 0)])
+
+    # Greedy matching would give the first detection to the nearer second track
+    # and spawn a new track for the second detection.
+    tracks = tracker.update_tracks([_person(25, 0), _person(65, 0)])
+
+    assert sorted(tracks) == [1, 2]
+    assert list(tracks[1].positions[-1]) == [25, 0]
+    assert list(tracks[2].positions[-1]) == [65, 0]
+
+
+def test_gated_pairs_are_never_matched():
+    cost = build_cost_matrix(np.array([[0.0, 0.0]]), np.array([[100.0, 0.0]]), max_distance=50.0)
+    matches, unmatched_dets, unmatched_tracks = solve_assignment(cost)
+
+    assert matches == []
+    assert unmatched_dets == [0]
+    assert unmatched_tracks == [0]
+
+
+def test_iou_metric_matches_overlapping_boxes():
+    tracker = PersonTracker(match_metric='iou', min_match_iou=0.3)
+    tracker.update_tracks([_person(100, 100, size=40)])
+    tracks = tracker.update_tracks([_person(105, 100, size=40)])
+
+    assert list(tracks) == [1]
+    assert len(tracks[1]) == 2
+
+
+def test_ring_buffer_derives_motion_incrementally():
+    store = TrackStore(capacity=1, history=8)
+    slot = store.allocate()
+    rng = np.random.default_rng(0)
+    centers = np.cumsum(rng.normal(size=(20, 2)) * 5, axis=0)
+    for i, center in enumerate(centers):
+        store.append(slot, center, [0, 0, 1, 1], 0.9, float(i))
+
+    # Only the newest `history` samples are kept, oldest first
+    kept = centers[-8:]
+    np.testing.assert_allclose(store.window(store.centers, slot, store.length(slot)), kept)
+
+    velocities = np.linalg.norm(np.diff(kept, axis=0), axis=1)
+    np.testing.assert_allclose(store.window(store.velocities, slot, 7), velocities)
+    np.testing.assert_allclose(store.window(store.accelerations, slot, 6), np.diff(velocities))
+
+
+def test_track_store_reuses_and_grows_slots():
+    store = TrackStore(capacity=2)
+    slots = [store.allocate() for _ in range(5)]
+
+    assert len(set(slots)) == 5
+    assert store.capacity >= 5
+    store.release(slots[0])
+    assert store.allocate() == slots[0]
+
+
+def test_tracks_expire_on_stream_time():
+    tracker = PersonTracker(max_tracking_frames=10, fps=10.0)
+    tracker.update_tracks([_person(0, 0)], timestamp=0.0)
+
+    assert list(tracker.update_tracks([], timestamp=1.0)) == [1]
+    assert tracker.update_tracks([], timestamp=1.01) == {}
+
+
+def test_grid_candidates_cover_every_pair_within_range():
+    rng = np.random.default_rng(1)
+    tracks = rng.uniform(-200, 600, size=(300, 2))
+    dets = rng.uniform(-200, 600, size=(300, 2))
+    track_idx, det_idx = grid_candidate_pairs(tracks, dets, cell_size=50.0)
+
+    close = np.argwhere(np.linalg.norm(tracks[:, None] - dets[None], axis=2) < 50.0)
+    candidates = set(zip(track_idx.tolist(), det_idx.tolist()))
+    assert set(map(tuple, close.tolist())) <= candidates
+
+
+def test_spatial_index_matches_brute_force():
+    rng = np.random.default_rng(2)
+    for metric in ('distance', 'iou'):
+        tracks = rng.uniform(0, 800, size=(250, 2))
+        dets = tracks[:200] + rng.normal(0, 15, size=(200, 2))
+        track_boxes = np.concatenate([tracks - 15, tracks + 15], axis=1)
+        det_boxes = np.concatenate([dets - 15, dets + 15], axis=1)
+
+        brute = match_detections(tracks, dets, track_boxes, det_boxes, metric=metric,
+                                 use_spatial_index=False)
+        indexed = match_detections(tracks, dets, track_boxes, det_boxes, metric=metric,
+                                   use_spatial_index=True)
+        assert sorted(brute[0]) == sorted(indexed[0])
+        assert brute[1] == indexed[1]
+
+
+def test_kalman_prediction_bridges_strided_detections():
+    tracker = PersonTracker(fps=25.0)
+    for frame in range(60):
+        timestamp = frame / 25.0
+        x = 100.0 + 8.0 * frame
+        if frame % 3 == 0:
+            detections = [_person(x, 200.0)]
+        else:
+            detections = tracker.predict_detections(timestamp)
+        tracks = tracker.update_tracks(detections, timestamp)
+
+    assert list(tracks) == [1]
+    track = tracks[1]
+    assert len(track) == 50  # one sample per frame, measured or predicted
+    assert track.predicted[-1] and not track.predicted[-3]
+    assert abs(track.positions[-1, 0] - (100.0 + 8.0 * 59)) < 5.0
+
+
+def test_stride_one_tracking_matches_last_centres():
+    rng = np.random.default_rng(0)
+    for velocity in (0.0, 3.0):  # stationary, then slowly moving (px per frame)
+        tracker = PersonTracker(fps=25.0)
+        for frame in range(40):
+            x = 200.0 + velocity * frame + rng.normal(0, 2.0)
+            tracks = tracker.update_tracks([_person(x, 200.0)], frame / 25.0)
+        assert list(tracks) == [1]
+        assert len(tracks[1]) == 40 and not tracks[1].predicted.any()
+
+    # A swimmer that turns around: 45 px from the last centre is within the 50 px
+    # gate, while the momentum of a Kalman prediction would put it 90 px away
+    tracker = PersonTracker(fps=25.0)
+    for frame, x in enumerate([100.0, 145.0, 190.0, 235.0, 280.0, 235.0]):
+        tracks = tracker.update_tracks([_person(x, 200.0)], frame / 25.0)
+    assert list(tracks) == [1]
+    assert tracks[1].positions[-1, 0] == 235.0
@@ -0,0 +1,113 @@
+import json
+
+import cv2
+import numpy as np
+
+from src.water_detection import WaterDetector
+
+
+def _pool_frame(brightness=1.0, height=360, width=640):
+    frame = np.full((height, width, 3), 90, dtype=np.uint8)
+    frame[80:300, 100:540] = (200, 120, 30)  # BGR pool blue
+    return np.clip(frame * brightness, 0, 255).astype(np.uint8)
+
+
+def test_mask_is_cached_between_frames():
+    detector = WaterDetector(recompute_interval=100)
+    frame = _pool_frame()
+    first = detector.detect_water_areas(frame)
+
+    # A swimmer moving through the pool does not invalidate the mask
+    moving = frame.copy()
+    moving[150:190, 300:320] = (40, 60, 200)
+    for _ in range(10):
+        assert detector.detect_water_areas(moving) is first
+    assert detector.mask_updates == 1
+    assert detector.is_in_water((320, 200))
+    assert not detector.is_in_water((20, 20))
+
+
+def test_lighting_change_and_interval_trigger_recompute():
+    detector = WaterDetector(recompute_interval=5)
+    detector.detect_water_areas(_pool_frame())
+    detector.detect_water_areas(_pool_frame(brightness=0.5))
+    assert detector.mask_updates == 2
+
+    for _ in range(5):
+        detector.detect_water_areas(_pool_frame(brightness=0.5))
+    assert detector.mask_updates == 3
+
+
+def test_edge_distance_map_matches_polygon_test():
+    frame = np.full((360, 640, 3), 90, dtype=np.uint8)
+    corners = np.array([[100, 80], [540, 60], [600, 300], [80, 320]], dtype=np.int32)
+    cv2.fillPoly(frame, [corners], (200, 120, 30))
+    detector = WaterDetector()
+    detector.detect_water_areas(frame)
+
+    points = np.random.default_rng(0).uniform([0, 0], [640, 360], size=(500, 2))
+    expected = [abs(cv2.pointPolygonTest(detector.pool_boundaries, (float(x), float(y)), True))
+                for x, y in points]
+    np.testing.assert_allclose(detector.distance_to_edge(points), expected, atol=1.5)
+
+    in_water = detector.points_in_water(points)
+    assert in_water.tolist() == [detector.is_in_water(p) for p in points]
+
+
+def test_pool_roi_file_replaces_hsv_segmentation(tmp_path, monkeypatch):
+    roi_file = tmp_path / "pool_roi.json"
+    roi_file.write_text(json.dumps({"cameras": {
+        "north": {
+            "frame_size": [320, 180],
+            "pool": [[[50, 40], [270, 40], [270, 150], [50, 150]]],
+            "exclude": [[[140, 40], [180, 40], [180, 70], [140, 70]]],
+        },
+        "south": {"pool": [[[0, 0], [10, 0], [10, 10]]]},
+    }}))
+
+    detector = WaterDetector.from_roi_file(str(roi_file), camera_id="north")
+    monkeypatch.setattr(detector, "_segment", lambda frame: (_ for _ in ()).throw(AssertionError))
+
+    # A grey frame with no water colour at all: the polygon alone defines the pool
+    frame = np.full((360, 640, 3), 90, dtype=np.uint8)
+    mask = detector.detect_water_areas(frame)
+    for _ in range(5):
+        assert detector.detect_water_areas(frame) is mask
+    assert detector.mask_updates == 1
+
+    # Polygons are scaled from 320x180 to the 640x360 frame
+    assert detector.is_in_water((300, 200))
+    assert not detector.is_in_water((60, 60))
+    assert not detector.is_in_water((320, 100))  # excluded lifeguard chair
+    np.testing.assert_allclose(detector.distance_to_edge([(300, 200)]), [100], atol=1.5)
+
+
+def test_water_rect_is_padded_and_clipped():
+    detector = WaterDetector()
+    assert detector.water_rect() is None
+
+    detector.detect_water_areas(_pool_frame())
+    assert detector.water_rect(margin=0.0) == (100, 80, 540, 300)
+    assert detector.water_rect(margin=0.1) == (56, 58, 584, 322)
+    assert detector.water_rect(margin=1.0) == (0, 0, 640, 360)
+
+
+def test_downscaled_segmentation_matches_full_resolution():
+    full = WaterDetector().detect_water_areas(_pool_frame()) > 0
+    half = WaterDetector(segmentation_scale=0.5).detect_water_areas(_pool_frame()) > 0
+    assert half.shape == full.shape
+    assert np.count_nonzero(half ^ full) < 0.01 * np.count_nonzero(full)
+
+
+def test_camera_config_can_override_water_colours(tmp_path):
+    roi_file = tmp_path / "cameras.json"
+    roi_file.write_text(json.dumps({"cameras": {"indoor": {"hsv_ranges": [[[0, 0, 0], [179, 255, 80]]]}}}))
+
+    detector = WaterDetector.from_roi_file(str(roi_file), camera_id="indoor")
+    assert not detector.uses_static_roi
+    assert detector.hsv_ranges == (((0, 0, 0), (179, 255, 80)),)
+    frame = np.full((360, 640, 3), 200, dtype=np.uint8)
+    frame[100:300, 150:500] = 40  # dark water
+    detector.detect_water_areas(frame)
+    assert detector.is_in_water((300, 200))
+    assert not detector.is_in_water((50, 50))